@@ -0,0 +1,107 @@
+###############################################################################
+#                                                                             #
+# bench_parse_line.py                                                         #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Micro-benchmark of the router line parser. It writes a         #
+#              synthetic capture file with the format of the WiFiScan        #
+#              program (10M lines by default) and compares the time of the   #
+#              old str.find() parser with the single pass parser from the    #
+#              right of wifi_data_parser.py, per line and for the full scan  #
+#              stream.                                                       #
+# To run it do in a terminal "python benchmarks/bench_parse_line.py".         #
+###############################################################################
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from wifi_data_parser import parse_line_router_name_and_signal_strength, iter_samples
+
+# The old parser, it doesn't support SSID's with "(" or ":" and raises on malformed lines.
+def parse_line_router_name_and_signal_strength_str_find(line):
+    pos = line.find(":")
+    num_router_in_sample = line[ : pos]
+    num_router_in_sample = int(num_router_in_sample)
+    pos_router_begin = pos + 2
+    pos = line.find("(")
+    pos_router_end = pos - 1
+    router_name = line[pos_router_begin : pos_router_end]
+    signal_strength_begin = pos + 1
+    pos_end = line.find(")")
+    signal_strength = line[signal_strength_begin : pos_end ]
+    signal_strength = int(signal_strength)
+    return (num_router_in_sample, router_name, signal_strength)
+
+def write_synthetic_capture(f, num_lines, num_routers, seed):
+    rnd = random.Random(seed)
+    router_names = ["Router_%04d_%s" % (i, rnd.choice(("MEO", "NOS", "Vodafone", "Home WiFi")))
+                        for i in range(num_routers)]
+    lines_written = 0
+    while lines_written < num_lines:
+        num_seen = rnd.randint(5, 24)
+        lines = ["scan start\n", "scan done\n", "%d networks found\n" % num_seen]
+        for i, router_name in enumerate(rnd.sample(router_names, num_seen)):
+            lines.append("%d: %s (%d)*\n" % (i + 1, router_name, -rnd.randint(40, 95)))
+        lines.append("\n")
+        f.writelines(lines)
+        lines_written += len(lines)
+    return lines_written
+
+def time_line_parser(filename, parse_line):
+    num_router_lines = 0
+    time_begin = time.perf_counter()
+    with open(filename, "r") as f:
+        for line in f:
+            if ":" in line:
+                parse_line(line)
+                num_router_lines += 1
+    return (time.perf_counter() - time_begin, num_router_lines)
+
+def time_iter_samples(filename):
+    num_samples = 0
+    time_begin = time.perf_counter()
+    with open(filename, "r") as f:
+        for _ in iter_samples(f):
+            num_samples += 1
+    return (time.perf_counter() - time_begin, num_samples)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Router line parser micro-benchmark.")
+    parser.add_argument("--num-lines", type = int, default = 10000000)
+    parser.add_argument("--num-routers", type = int, default = 2000)
+    parser.add_argument("--seed", type = int, default = 42)
+    args = parser.parse_args()
+
+    # SSID's with special characters, only the new parser gets them right.
+    for line in ('6: Frases e candeeiros (-89)*\n', '3: Cafe (2:nd floor) (-71)*\n', '4: garbage\n'):
+        print(repr(line), " -> ", parse_line_router_name_and_signal_strength(line))
+
+    fd, filename = tempfile.mkstemp(suffix = "_data.dat")
+    try:
+        with os.fdopen(fd, "w") as f:
+            num_lines = write_synthetic_capture(f, args.num_lines, args.num_routers, args.seed)
+        print("synthetic capture lines: ", num_lines, " bytes: ", os.path.getsize(filename))
+
+        for name, parse_line in (("str.find", parse_line_router_name_and_signal_strength_str_find),
+                                 ("rpartition", parse_line_router_name_and_signal_strength)):
+            elapsed, num_router_lines = time_line_parser(filename, parse_line)
+            print("%-12s %10.3f s  %8.1f ns/line  (%d router lines)"
+                  % (name, elapsed, elapsed * 1e9 / num_router_lines, num_router_lines))
+
+        elapsed, num_samples = time_iter_samples(filename)
+        print("%-12s %10.3f s  %8.1f ns/line  (%d samples)"
+              % ("iter_samples", elapsed, elapsed * 1e9 / num_lines, num_samples))
+    finally:
+        os.remove(filename)
+
+if __name__ == "__main__":
+    main()
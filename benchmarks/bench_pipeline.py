@@ -0,0 +1,140 @@
+###############################################################################
+#                                                                             #
+# bench_pipeline.py                                                           #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Benchmark of the generator pipeline at several scales, with    #
+#              the synthetic room data files of synthetic_capture.py, so the  #
+#              performance changes can be checked offline and reproduced, the #
+#              same seed writes the same files. For each scale it times:      #
+#     parse    - read_all_files_to_memory(), without the cache.               #
+#     features - The router vocabulary and the SparseFingerprints of          #
+#                create_all_samples_sparse_dataset(), like the generator.     #
+#     emit_*   - The .h file of the PC, the compact .h file and the model     #
+#                blob, of the 80 % / 20 % split of the shuffled scans.        #
+#     knn      - The sparse Python KNN of the test set (at most               #
+#                --max-knn-queries).                                          #
+# To run it do in a terminal "python benchmarks/bench_pipeline.py", or with   #
+# "--scales small medium" and "--json results.json" to save the results.     #
+###############################################################################
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from synthetic_capture import write_synthetic_data_files
+from wifi_data_parser import read_all_files_to_memory, sorted_router_names
+from wifi_train_data_generator.pipeline import (files, create_all_samples_sparse_dataset, split_train_test_arrays,
+                                                C_NOT_SEEN_ROUTER_SIGNAL_VALUE, C_PERCENTAGE_OF_TRAIN_CASES)
+from wifi_train_data_generator.emitters import write_dot_H_file_for_C_plus_plus, write_dot_H_file_compact
+from wifi_train_data_generator.model_blob import write_model_blob
+from indoor_localization_KNN import C_K
+from sparse_fingerprints import sparse_KNN_classifier
+
+# Each scale is (num_rooms, num_routers, num_visible, num_scans_per_room).
+DICT_SCALES = {
+    "small":  (6,    80, 16,   400),
+    "medium": (20,  500, 20,  2000),
+    "large":  (50, 2000, 24,  4000),
+}
+C_MAX_KNN_QUERIES = 2000
+
+def timed(function, *args, **kwargs):
+    # Returns the tuple (result, elapsed_s).
+    time_begin = time.perf_counter()
+    result = function(*args, **kwargs)
+    return (result, time.perf_counter() - time_begin)
+
+def bench_scale(scale_name, num_rooms, num_routers, num_visible, num_scans_per_room, seed,
+                num_workers, max_knn_queries):
+    """
+    Writes the synthetic data files of the scale in a temporary directory
+    and returns the list of tuples (stage, elapsed_s, num_items, unit).
+    """
+    temporary_dirname = tempfile.mkdtemp(prefix = "bench_pipeline_")
+    try:
+        data_files_path = os.path.join(temporary_dirname, "data_files", "")
+        write_synthetic_data_files(data_files_path, num_rooms, num_routers, num_visible, num_scans_per_room, seed)
+        data_files = sorted(files(data_files_path))
+        num_bytes = sum(os.path.getsize(data_files_path + file) for file in data_files)
+        list_results = [("data files", 0.0, num_bytes, "bytes")]
+
+        dict_router_vocabulary = {}
+        data_files_in_memory, elapsed = timed(read_all_files_to_memory, data_files_path, data_files,
+                                              dict_router_vocabulary, None, num_workers, None)
+        num_scans = sum(len(data_file[1]) for data_file in data_files_in_memory)
+        list_results.append(("parse", elapsed, num_scans, "scans"))
+
+        time_begin = time.perf_counter()
+        list_unique_router_names = sorted_router_names(dict_router_vocabulary)
+        list_of_y_target = [(data_file[0], target_int) for target_int, data_file in enumerate(data_files_in_memory)]
+        X_all, Y_all = create_all_samples_sparse_dataset(list_unique_router_names, list_of_y_target,
+                                                         data_files_in_memory)
+        list_results.append(("features", time.perf_counter() - time_begin, X_all.nnz, "readings"))
+
+        # The files are in the order of the rooms, shuffled before the split like read_dataset().
+        shuffled_indexes = np.random.RandomState(seed).permutation(len(Y_all))
+        X_train, Y_train, X_test, Y_test = split_train_test_arrays(X_all.take(shuffled_indexes),
+                                                                   Y_all[shuffled_indexes],
+                                                                   C_PERCENTAGE_OF_TRAIN_CASES)
+        for stage_name, filename, write in (
+                ("emit_pc",      "home_train_data.h", lambda filename: write_dot_H_file_for_C_plus_plus(
+                    filename, list_unique_router_names, list_of_y_target, X_train, Y_train, X_test, Y_test)),
+                ("emit_compact", "home_train_data_compact.h", lambda filename: write_dot_H_file_compact(
+                    filename, list_unique_router_names, list_of_y_target, X_train, Y_train, X_test, Y_test)),
+                ("emit_blob",    "home_train_data.bin", lambda filename: write_model_blob(
+                    filename, list_unique_router_names, list_of_y_target, X_train, Y_train, X_test, Y_test,
+                    C_NOT_SEEN_ROUTER_SIGNAL_VALUE))):
+            filename = os.path.join(temporary_dirname, filename)
+            _, elapsed = timed(write, filename)
+            list_results.append((stage_name, elapsed, os.path.getsize(filename), "bytes"))
+
+        X_query, Y_query = X_test[ : max_knn_queries], Y_test[ : max_knn_queries]
+        Y_pred, elapsed = timed(sparse_KNN_classifier, X_train, Y_train, C_K, X_query, len(list_of_y_target))
+        list_results.append(("knn", elapsed, len(X_query), "queries"))
+        print("%s: rooms: %d routers: %d (seen %d) visible: %d scans: %d  knn accuracy: %.2f %%"
+              % (scale_name, num_rooms, num_routers, len(list_unique_router_names), num_visible, num_scans,
+                 100.0 * float((Y_pred == Y_query).mean()) if len(Y_query) != 0 else 0.0))
+        return list_results
+    finally:
+        shutil.rmtree(temporary_dirname, ignore_errors = True)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark of the generator pipeline with synthetic data files.")
+    parser.add_argument("--scales", nargs = "+", choices = list(DICT_SCALES), default = ["small", "medium"])
+    parser.add_argument("--seed", type = int, default = 42)
+    parser.add_argument("--workers", type = int, default = 1, help = "processes of the parse")
+    parser.add_argument("--max-knn-queries", type = int, default = C_MAX_KNN_QUERIES)
+    parser.add_argument("--json", default = None, help = "file to save the results")
+    args = parser.parse_args()
+
+    dict_results = {}
+    for scale_name in args.scales:
+        list_results = bench_scale(scale_name, *DICT_SCALES[scale_name], seed = args.seed,
+                                   num_workers = args.workers, max_knn_queries = args.max_knn_queries)
+        for stage_name, elapsed, num_items, unit in list_results:
+            if elapsed == 0.0:
+                print("    %-14s %12d %s" % (stage_name, num_items, unit))
+            else:
+                print("    %-14s %10.3f s  %14.1f %s/s" % (stage_name, elapsed, num_items / elapsed, unit))
+        dict_results[scale_name] = {"scale": DICT_SCALES[scale_name],
+                                    "stages": [{"stage": stage_name, "elapsed_s": elapsed,
+                                                "num_items": num_items, "unit": unit}
+                                                   for stage_name, elapsed, num_items, unit in list_results]}
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump({"seed": args.seed, "workers": args.workers, "results": dict_results}, f, indent = 2)
+
+if __name__ == "__main__":
+    main()
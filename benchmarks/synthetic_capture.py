@@ -0,0 +1,145 @@
+###############################################################################
+#                                                                             #
+# synthetic_capture.py                                                        #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Generator of synthetic room data files, "<room>_data.dat",     #
+#              with the exact format that the WiFiScan program of the ESP32   #
+#              prints in the serial port and the collector saves, to measure  #
+#              the performance of the scripts without walking around with a   #
+#              ESP32. Each scan is a block:                                   #
+#     scan start                                                              #
+#     scan done                                                               #
+#     3 networks found                                                        #
+#     1: MEO-1A2B3C (-48)*                                                    #
+#     2: Vodafone Home (-71)*                                                 #
+#     3: Free WiFi (-88)                                                      #
+#     (empty line)                                                            #
+# the lines end in "\r\n" like the Serial.println() and the open networks end #
+# in " " instead of "*".                                                      #
+# The RSSI is realistic, the log distance path loss model: the rooms are a    #
+# grid in the floor, the routers are spread over the floor and around it (the #
+# neighbors), and each scan is a point of a random walk inside its room,      #
+#     RSSI = tx_power - 10 * n * log10(distance) - wall_loss * num_walls      #
+#            + shadowing + noise                                              #
+# only the routers above the sensitivity are seen, the strongest ones, about  #
+# num_visible of them.                                                        #
+# To write a dataset do in a terminal                                         #
+#     "python benchmarks/synthetic_capture.py --output-path ./bench_data/"    #
+###############################################################################
+
+import argparse
+import os
+
+import numpy as np
+
+C_ROOM_SIZE_M = 5.0
+C_PATH_LOSS_EXPONENT = 3.0
+C_WALL_LOSS_DB = 4.0
+C_SHADOWING_STD_DB = 4.0
+C_NOISE_STD_DB = 2.0
+C_SENSITIVITY_DBM = -95
+C_WALK_STEP_STD_M = 0.4
+C_SCAN_CHUNK_NUM_SCANS = 1024
+C_SSID_PREFIXES = ("MEO-", "NOS-", "Vodafone-", "Home WiFi ", "Free WiFi (", "Cafe: ")
+C_LINE_END = "\r\n"
+
+def synthetic_routers(rng, num_routers, floor_size_m):
+    """
+    Returns the tuple (router_names, positions, tx_powers, flag_open), the
+    routers are spread over the floor and a margin around it, the routers
+    of the neighbors. The SSID's have spaces, "(" and ":" like the real ones.
+    """
+    router_names = []
+    for i, prefix in enumerate(rng.choice(len(C_SSID_PREFIXES), num_routers)):
+        prefix = C_SSID_PREFIXES[prefix]
+        router_names.append("%s%06X%s" % (prefix, i * 7919 % 0xFFFFFF, ")" if prefix.endswith("(") else ""))
+    margin_m = C_ROOM_SIZE_M
+    positions = rng.uniform(-margin_m, floor_size_m + margin_m, (num_routers, 2))
+    tx_powers = rng.normal(-35.0, 4.0, num_routers)
+    flag_open = rng.random_sample(num_routers) < 0.1
+    return (router_names, positions, tx_powers, flag_open)
+
+def random_walk(rng, num_scans, room_origin):
+    # Positions of the scans of a room, a random walk that is reflected in the walls of the room.
+    steps = rng.normal(0.0, C_WALK_STEP_STD_M, (num_scans, 2))
+    steps[0] = rng.uniform(0.0, C_ROOM_SIZE_M, 2)
+    positions = np.cumsum(steps, axis = 0) % (2 * C_ROOM_SIZE_M)
+    positions = np.where(positions > C_ROOM_SIZE_M, 2 * C_ROOM_SIZE_M - positions, positions)
+    return room_origin + positions
+
+def scan_rssi(rng, scan_positions, router_positions, tx_powers, shadowing):
+    # Matrix (num_scans, num_routers) of the int RSSI of each router in each scan.
+    deltas = scan_positions[:, None, :] - router_positions[None, :, :]
+    distances = np.maximum(np.hypot(deltas[:, :, 0], deltas[:, :, 1]), 0.5)
+    # Walls of the grid of rooms between the scan and the router.
+    num_walls = (np.abs(np.floor(scan_positions[:, None, 0] / C_ROOM_SIZE_M) - np.floor(router_positions[None, :, 0] / C_ROOM_SIZE_M))
+                 + np.abs(np.floor(scan_positions[:, None, 1] / C_ROOM_SIZE_M) - np.floor(router_positions[None, :, 1] / C_ROOM_SIZE_M)))
+    rssi = (tx_powers[None, :] - 10.0 * C_PATH_LOSS_EXPONENT * np.log10(distances)
+            - C_WALL_LOSS_DB * num_walls + shadowing[None, :]
+            + rng.normal(0.0, C_NOISE_STD_DB, distances.shape))
+    return np.clip(np.rint(rssi), -127, -1).astype(np.int64)
+
+def format_scan(rssi_row, router_names, flag_open, num_visible, rng):
+    # Text of one scan, the num_visible strongest routers above the sensitivity, with some variation.
+    num_seen = max(1, int(rng.normal(num_visible, num_visible / 6.0)))
+    seen = np.nonzero(rssi_row >= C_SENSITIVITY_DBM)[0]
+    seen = seen[np.argsort(-rssi_row[seen], kind = "stable")][ : num_seen]
+    if len(seen) == 0:
+        return C_LINE_END.join(("scan start", "scan done", "no networks found", "", ""))
+    lines = ["scan start", "scan done", "%d networks found" % len(seen)]
+    for i, router_index in enumerate(seen.tolist()):
+        lines.append("%d: %s (%d)%s" % (i + 1, router_names[router_index], rssi_row[router_index],
+                                        " " if flag_open[router_index] else "*"))
+    lines.extend(("", ""))
+    return C_LINE_END.join(lines)
+
+def write_synthetic_data_files(data_files_path, num_rooms, num_routers, num_visible, num_scans_per_room,
+                               seed = 42):
+    """
+    Writes num_rooms files "room_NNN_data.dat" with num_scans_per_room scans
+    each to the directory data_files_path. The same arguments write the same
+    files. Returns the list of the filenames.
+    """
+    rng = np.random.RandomState(seed)
+    num_rooms_side = int(np.ceil(np.sqrt(num_rooms)))
+    floor_size_m = num_rooms_side * C_ROOM_SIZE_M
+    router_names, router_positions, tx_powers, flag_open = synthetic_routers(rng, num_routers, floor_size_m)
+    os.makedirs(data_files_path, exist_ok = True)
+
+    list_filenames = []
+    for room in range(num_rooms):
+        room_origin = np.array((room % num_rooms_side, room // num_rooms_side)) * C_ROOM_SIZE_M
+        scan_positions = random_walk(rng, num_scans_per_room, room_origin)
+        # The furniture and the people of the room, the same for all its scans.
+        shadowing = rng.normal(0.0, C_SHADOWING_STD_DB, num_routers)
+        filename = os.path.join(data_files_path, "room_%03d_data.dat" % room)
+        with open(filename, "w", newline = "") as f:
+            for begin in range(0, num_scans_per_room, C_SCAN_CHUNK_NUM_SCANS):
+                rssi = scan_rssi(rng, scan_positions[begin : begin + C_SCAN_CHUNK_NUM_SCANS],
+                                 router_positions, tx_powers, shadowing)
+                f.write("".join(format_scan(rssi_row, router_names, flag_open, num_visible, rng)
+                                    for rssi_row in rssi))
+        list_filenames.append(filename)
+    return list_filenames
+
+def main():
+    parser = argparse.ArgumentParser(description = "Writes synthetic WiFiScan room data files.")
+    parser.add_argument("--output-path", default = ".//bench_data_files//")
+    parser.add_argument("--rooms", type = int, default = 6)
+    parser.add_argument("--routers", type = int, default = 80, help = "router vocabulary size")
+    parser.add_argument("--visible", type = int, default = 16, help = "mean number of routers of a scan")
+    parser.add_argument("--scans", type = int, default = 400, help = "number of scans of each room")
+    parser.add_argument("--seed", type = int, default = 42)
+    args = parser.parse_args()
+
+    list_filenames = write_synthetic_data_files(args.output_path, args.rooms, args.routers, args.visible,
+                                                args.scans, args.seed)
+    print("files: ", len(list_filenames), " bytes: ", sum(os.path.getsize(filename) for filename in list_filenames))
+
+if __name__ == "__main__":
+    main()
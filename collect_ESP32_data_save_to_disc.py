@@ -12,15 +12,37 @@
 # ESP32 that should be running the program WiFiScan that is on this           #
 # repository and also comes with the ESP32 WIFI demo programs.                #
 # You have to configure the com port once and the name of the training        #
-# datafile for each room. Monitor the data_file that is generated and stop it #
-# when it reaches 20KB. To stop it press on the terminal a CTRL+C.            #
+# datafile for each room. The capture stops by itself when the data_file      #
+# reaches 20KB, or the configured number of scans or duration. It can also   #
+# be stopped at any time by pressing on the terminal a CTRL+C, the file is    #
+# closed with only complete scans.                                            #
+# To survey faster it can capture at the same time from several ESP32, each   #
+# one to its own room file, configure list_ESP32_ports_and_filenames and set  #
+# flag_multi_device = True . A port can also be a pseudo-terminal or          #
+# "replay://" followed by the path of a data file, that is sent again at the  #
+# speed of the serial port, to test without the ESP32.                        #
+# The values below are the defaults of the options of the command line, so    #
+# it doesn't have to be edited for each room, for example:                    #
+#     python collect_ESP32_data_save_to_disc.py --port /dev/ttyUSB0           #
+#         --filename room_A_data.dat                                          #
+#     python collect_ESP32_data_save_to_disc.py                               #
+#         --device /dev/ttyUSB0=room_A_data.dat                               #
+#         --device /dev/ttyUSB1=room_B_data.dat --target-num-scans 300        #
+# See "python collect_ESP32_data_save_to_disc.py --help".                     #
 ###############################################################################
 
-# List the serial ports on the computer.
-# You have to configure bellow to one of them.
+import argparse
+import os
+import queue
+import re
+import threading
+import time
+
+import serial
 import serial.tools.list_ports
-print([comport.device for comport in serial.tools.list_ports.comports()])
 
+from wifi_data_parser import (C_FILE_SUFIX, C_JSON_LINES_FILE_SUFIX, parse_scan_block,
+                              is_empty_scan_block, format_scan_record)
 
 # Collect data from serial port and write it to disk.
 path = './/data_files//'
@@ -28,7 +50,7 @@ path = './/data_files//'
 # STEP's to RUN:
 # Uncomment or modify one of this lines for each room you would like.
 # Um can change the name of the room but you have to maintain the ending part "_data.dat".
-# To stop the program when the file reach's 20KB use Ctrl+C .
+# The program stops when the file reach's 20KB or can be stopped with Ctrl+C .
 
 filename = 'room_A_data.dat'
 #filename = 'room_B_data.dat'
@@ -37,14 +59,352 @@ filename = 'room_A_data.dat'
 
 # Configure the serial port to connect to you ESP32, note you can't be connected at the
 # some time with the Arduino Serial Monitor or Serial Plotter.
-my_ESP32_serial_port = '/dev/ttyUSB0'   # 'COM4' 
+my_ESP32_serial_port = '/dev/ttyUSB0'   # 'COM4'
 
-import serial
-ser = serial.Serial(my_ESP32_serial_port, baudrate=115200)
-f = open(path + filename, 'wb')
-while (True):
-    data = ser.read()
-    f.write(data)
-    f.flush()
-ser.close()
-f.close()
+# Multi-device capture, one (serial port, filename) for each ESP32.
+flag_multi_device = False
+list_ESP32_ports_and_filenames = [
+    ('/dev/ttyUSB0', 'room_A_data.dat'),
+    ('/dev/ttyUSB1', 'room_B_data.dat'),
+    #('replay://.//data_files_replay//room_C_data.dat', 'room_C_data.dat'),
+]
+
+# By default the raw bytes of the serial port are saved in the "_data.dat" file.
+# With True ("--format jsonl") the scans are parsed while capturing and saved in
+# the JSON lines format, the file ends in "_data.jsonl" instead of "_data.dat".
+# The incomplete scans at the start and end are dropped so the file doesn't have
+# to be trimmed.
+flag_json_lines = False
+
+# Stop conditions of the capture, None is no limit.
+C_TARGET_SIZE_BYTES = 20 * 1024
+C_TARGET_NUM_SCANS  = None
+C_TARGET_DURATION_S = None
+
+# Max time that a read waits for data, so the stop conditions are tested
+# even when the ESP32 isn't sending.
+C_SERIAL_READ_TIMEOUT_S = 0.1
+
+# A scan ends in a empty line, the ESP32 Serial.println() ends lines in "\r\n".
+C_SCAN_END_REGEX = re.compile(rb"\r?\n\r?\n")
+
+C_BAUDRATE = 115200
+C_REPLAY_URL_PREFIX = "replay://"
+
+# Max number of chunks of complete scans waiting to be written to disk for each
+# device, when it is reached the reading of that device waits (backpressure).
+C_MAX_PENDING_CHUNKS = 64
+
+# Period of the refresh of the status lines of the multi-device capture.
+C_STATUS_PERIOD_S = 0.5
+
+def capture(ser, f, target_size_bytes = None, target_num_scans = None, target_duration_s = None,
+            flag_print_status = True, stop_event = None, dict_status = None, flag_json_lines = False):
+    """
+    Reads from the serial port ser in chunks of all the bytes waiting, and
+    writes to the file f only complete scans, the file is flushed once for
+    each chunk that completes at least one scan. Returns when one of the
+    targets is reached, on a CTRL+C or when stop_event is set, the 
+    incomplete scan that is in the buffer at that moment isn't written.
+    If dict_status is given it's updated with the counters after each read.
+    Each scan is parsed as it arrives, in both formats num_scans counts only
+    the complete scans, num_empty the complete ones that found no networks
+    and num_dropped the incomplete ones, like the first one when the capture
+    starts in the middle of a scan. With
+    flag_json_lines the empty and incomplete ones aren't written and the others are
+    written with a timestamp in the JSON lines format of wifi_data_parser.py,
+    without it all the raw bytes are written.
+    Returns the tuple (num_scans, num_bytes, elapsed_time_s).
+    """
+    buffer = bytearray()
+    num_scans = 0
+    num_empty = 0
+    num_dropped = 0
+    num_bytes = 0
+    time_begin = time.monotonic()
+    elapsed_time_s = 0.0
+    try:
+        while True:
+            data = ser.read(max(1, ser.in_waiting))
+            if data:
+                buffer += data
+                list_scan_end_matches = list(C_SCAN_END_REGEX.finditer(buffer))
+                if len(list_scan_end_matches) != 0:
+                    pos_end = list_scan_end_matches[-1].end()
+                    # Parse each scan now, the same rule counts the scans of both formats.
+                    list_records = []
+                    pos_begin = 0
+                    for match in list_scan_end_matches:
+                        text = buffer[pos_begin : match.start()].decode("utf-8", errors = "replace")
+                        pos_begin = match.end()
+                        if len(text.strip()) == 0:
+                            continue
+                        sample = parse_scan_block(text)
+                        if sample is None:
+                            if is_empty_scan_block(text):
+                                num_empty += 1
+                            else:
+                                num_dropped += 1
+                        else:
+                            num_scans += 1
+                            if flag_json_lines:
+                                list_records.append(format_scan_record(sample, time.time()))
+                    if flag_json_lines:
+                        chunk = "".join(list_records).encode("utf-8")
+                    else:
+                        chunk = bytes(buffer[ : pos_end])
+                    if len(chunk) != 0:
+                        f.write(chunk)
+                        f.flush()
+                    del buffer[ : pos_end]
+                    num_bytes += len(chunk)
+                    if flag_print_status:
+                        elapsed_time_s = time.monotonic() - time_begin
+                        print("\rscans: %d  empty: %d  dropped: %d  bytes: %d  scans/s: %.2f   "
+                              % (num_scans, num_empty, num_dropped, num_bytes,
+                                 num_scans / max(elapsed_time_s, 1e-9)),
+                              end = "", flush = True)
+            elapsed_time_s = time.monotonic() - time_begin
+            if dict_status is not None:
+                dict_status.update(num_scans = num_scans, num_empty = num_empty, num_dropped = num_dropped,
+                                   num_bytes = num_bytes, elapsed_time_s = elapsed_time_s)
+            if stop_event is not None and stop_event.is_set():
+                break
+            if ((target_size_bytes is not None and num_bytes >= target_size_bytes) or
+                (target_num_scans  is not None and num_scans >= target_num_scans)  or
+                (target_duration_s is not None and elapsed_time_s >= target_duration_s)):
+                break
+    except KeyboardInterrupt:
+        pass
+    if flag_print_status:
+        print()
+    return (num_scans, num_bytes, elapsed_time_s)
+
+class ReplaySerial:
+    """
+    Stand-in for a serial port that sends again the bytes of a data file at
+    the speed of the serial port, 10 bits by byte, used to test the capture
+    without the ESP32. It has the part of the serial.Serial interface that
+    capture() uses.
+    """
+    def __init__(self, filename, baudrate = C_BAUDRATE, timeout = C_SERIAL_READ_TIMEOUT_S):
+        with open(filename, "rb") as f:
+            self.data = f.read()
+        self.bytes_per_second = baudrate / 10.0
+        self.timeout = timeout
+        self.pos = 0
+        self.time_begin = time.monotonic()
+
+    @property
+    def in_waiting(self):
+        num_bytes_sent = int((time.monotonic() - self.time_begin) * self.bytes_per_second)
+        return max(0, min(num_bytes_sent, len(self.data)) - self.pos)
+
+    def read(self, size = 1):
+        time_end = time.monotonic() + self.timeout
+        while self.in_waiting == 0 and time.monotonic() < time_end:
+            time.sleep(min(0.01, self.timeout))
+        size = min(size, self.in_waiting)
+        data = self.data[self.pos : self.pos + size]
+        self.pos += size
+        return data
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def open_serial_port(port):
+    # A device, a pseudo-terminal, a pySerial URL or "replay://" + the path of a data file.
+    if port.startswith(C_REPLAY_URL_PREFIX):
+        return ReplaySerial(port[len(C_REPLAY_URL_PREFIX) : ])
+    return serial.serial_for_url(port, baudrate = C_BAUDRATE, timeout = C_SERIAL_READ_TIMEOUT_S)
+
+class ScanWriter(threading.Thread):
+    """
+    Writes to the file f, in its own thread, the chunks of complete scans
+    given to write(). The chunks wait in a queue of at most max_pending_chunks,
+    when it's full write() blocks, so a device that is faster then its disk
+    writes stops being read and the data waits in the serial port buffer.
+    It has the write() / flush() interface that capture() uses.
+    """
+    def __init__(self, f, max_pending_chunks = C_MAX_PENDING_CHUNKS):
+        threading.Thread.__init__(self, daemon = True)
+        self.f = f
+        self.queue = queue.Queue(maxsize = max_pending_chunks)
+
+    def write(self, data):
+        self.queue.put(bytes(data))
+
+    def flush(self):
+        pass
+
+    def num_pending_chunks(self):
+        return self.queue.qsize()
+
+    def close(self):
+        self.queue.put(None)
+        self.join()
+
+    def run(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                break
+            self.f.write(data)
+            self.f.flush()
+
+def capture_device(port, filename, target_size_bytes, target_num_scans, target_duration_s,
+                   stop_event, dict_status, flag_json_lines = False):
+    # Runs in the thread of each device of the multi-device capture.
+    try:
+        with open_serial_port(port) as ser:
+            with open(filename, 'wb') as f:
+                writer = ScanWriter(f)
+                writer.start()
+                dict_status["writer"] = writer
+                try:
+                    capture(ser, writer, target_size_bytes, target_num_scans, target_duration_s,
+                            False, stop_event, dict_status, flag_json_lines)
+                finally:
+                    writer.close()
+    except Exception as e:
+        dict_status["error"] = str(e)
+    dict_status["flag_done"] = True
+
+def format_device_status(port, dict_status):
+    elapsed_time_s = dict_status.get("elapsed_time_s", 0.0)
+    writer = dict_status.get("writer")
+    if "error" in dict_status:
+        state = "error: " + dict_status["error"]
+    elif dict_status.get("flag_done", False):
+        state = "done"
+    else:
+        state = "capturing"
+    return ("%-24s scans: %6d  empty: %4d  dropped: %4d  bytes: %9d  scans/s: %6.2f  pending: %3d  %s"
+            % (port, dict_status.get("num_scans", 0), dict_status.get("num_empty", 0),
+               dict_status.get("num_dropped", 0),
+               dict_status.get("num_bytes", 0),
+               dict_status.get("num_scans", 0) / max(elapsed_time_s, 1e-9),
+               writer.num_pending_chunks() if writer is not None else 0, state))
+
+def capture_multi_device(list_ports_and_filenames, target_size_bytes = None, target_num_scans = None,
+                         target_duration_s = None, flag_json_lines = False):
+    """
+    Captures at the same time from all the (port, filename) pairs, each
+    device in its own thread with its own ScanWriter, and shows a live
+    status line for each port. The targets are for each device. CTRL+C
+    stops all the devices.
+    Returns the list of the final status dict of each device.
+    """
+    stop_event = threading.Event()
+    list_status = [{} for _ in list_ports_and_filenames]
+    list_threads = [threading.Thread(target = capture_device,
+                                     args = (port, filename, target_size_bytes, target_num_scans,
+                                             target_duration_s, stop_event, dict_status, flag_json_lines),
+                                     daemon = True)
+                        for (port, filename), dict_status in zip(list_ports_and_filenames, list_status)]
+    for thread in list_threads:
+        thread.start()
+
+    flag_first = True
+    try:
+        while True:
+            flag_all_done = all(not thread.is_alive() for thread in list_threads)
+            if not flag_first:
+                # Move the cursor up to write over the previous status lines.
+                print("\x1b[%dA" % len(list_threads), end = "")
+            flag_first = False
+            for (port, _), dict_status in zip(list_ports_and_filenames, list_status):
+                print("\r" + format_device_status(port, dict_status) + "\x1b[K")
+            if flag_all_done:
+                break
+            time.sleep(C_STATUS_PERIOD_S)
+    except KeyboardInterrupt:
+        stop_event.set()
+        for thread in list_threads:
+            thread.join()
+        for (port, _), dict_status in zip(list_ports_and_filenames, list_status):
+            print(format_device_status(port, dict_status))
+    return list_status
+
+def capture_filename(filename, flag_json_lines):
+    if flag_json_lines and filename.endswith(C_FILE_SUFIX):
+        filename = filename[ : -len(C_FILE_SUFIX)] + C_JSON_LINES_FILE_SUFIX
+    return filename
+
+def optional_limit(value):
+    # argparse type of the stop conditions, 0 or "none" is no limit.
+    if value.lower() == "none" or float(value) == 0:
+        return None
+    return float(value) if "." in value else int(value)
+
+def parse_arguments(argv = None):
+    """
+    Parses the command line arguments argv (None is sys.argv), the defaults
+    are the configuration at the start of this file. Returns the argparse
+    namespace with list_ports_and_filenames, the (port, filename) of each
+    device, the filename already with the path.
+    """
+    parser = argparse.ArgumentParser(description = "Captures the WiFi scans of the ESP32 to a room data file.")
+    parser.add_argument("--list-ports", action = "store_true", help = "only lists the serial ports")
+    parser.add_argument("--path", default = path, help = "directory of the data files")
+    parser.add_argument("--port", default = my_ESP32_serial_port,
+                        help = "serial port, pySerial URL or replay:// + data file")
+    parser.add_argument("--filename", default = filename, help = "room data file, ends in _data.dat")
+    parser.add_argument("--device", action = "append", default = [], metavar = "PORT=FILENAME",
+                        help = "multi-device capture, one for each ESP32, can be repeated")
+    parser.add_argument("--format", choices = ("jsonl", "raw"), default = "jsonl" if flag_json_lines else "raw",
+                        help = "the raw bytes of the serial port in _data.dat, the default, or the JSON lines "
+                               "of the parsed scans in _data.jsonl")
+    parser.add_argument("--target-size-bytes", type = optional_limit, default = C_TARGET_SIZE_BYTES,
+                        help = "stop condition, 0 is no limit")
+    parser.add_argument("--target-num-scans", type = optional_limit, default = C_TARGET_NUM_SCANS,
+                        help = "stop condition, 0 is no limit")
+    parser.add_argument("--target-duration-s", type = optional_limit, default = C_TARGET_DURATION_S,
+                        help = "stop condition, 0 is no limit")
+    args = parser.parse_args(argv)
+
+    args.flag_json_lines = args.format == "jsonl"
+    list_ports_and_filenames = []
+    for device in args.device:
+        # The filename is after the last "=", the port can be a URL with "=".
+        port, separator, device_filename = device.rpartition("=")
+        if separator == "" or port == "" or device_filename == "":
+            parser.error("--device has to be PORT=FILENAME")
+        list_ports_and_filenames.append((port, device_filename))
+    if len(list_ports_and_filenames) == 0 and flag_multi_device:
+        list_ports_and_filenames = list(list_ESP32_ports_and_filenames)
+    args.list_ports_and_filenames = [(port, os.path.join(args.path, capture_filename(device_filename,
+                                                                                     args.flag_json_lines)))
+                                         for port, device_filename in list_ports_and_filenames]
+    return args
+
+def main(argv = None):
+    args = parse_arguments(argv)
+    # List the serial ports on the computer.
+    # You have to configure above to one of them.
+    print([comport.device for comport in serial.tools.list_ports.comports()])
+    if args.list_ports:
+        return
+
+    os.makedirs(args.path, exist_ok = True)
+    if len(args.list_ports_and_filenames) != 0:
+        capture_multi_device(args.list_ports_and_filenames, args.target_size_bytes, args.target_num_scans,
+                             args.target_duration_s, args.flag_json_lines)
+        return
+
+    with open_serial_port(args.port) as ser:
+        with open(os.path.join(args.path, capture_filename(args.filename, args.flag_json_lines)), 'wb') as f:
+            num_scans, num_bytes, elapsed_time_s = capture(ser, f, args.target_size_bytes,
+                                                           args.target_num_scans, args.target_duration_s,
+                                                           flag_json_lines = args.flag_json_lines)
+    print("scans: ", num_scans, " bytes: ", num_bytes, " seconds: %.1f" % elapsed_time_s,
+          " scans/s: %.2f" % (num_scans / max(elapsed_time_s, 1e-9)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+###############################################################################
+#                                                                             #
+# indoor_localization_KNN.py                                                  #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Python reference implementation of the KNN classifier of the   #
+#              ESP32 version (6 - component of the project), with the secret #
+#              sauce custom distance, to measure the accuracy of a dataset    #
+#              without generating the .h file and compiling the C++ code.    #
+# The distance only uses the dimensions where both points saw the router      #
+# (value != C_NOT_SEEN_ROUTER_SIGNAL_VALUE) and is normalized by n*n + n/4,   #
+# n being the number of those dimensions:                                     #
+#     sqrt( sum((a_i - b_i)^2) / (n*n + n/4.0) )                              #
+# With distance = "euclidean" it's the plain Euclidean distance over all the  #
+# dimensions, the not seen routers have the not_seen_value (120 in the C++),  #
+# to compare with the secret sauce.                                           #
+# And the majority vote is the same, if there isn't a single most voted class #
+# in the k nearest neighbors, it tries the k-1 nearest and so on.             #
+# All the distances between the points to classify and the train points are  #
+# computed in blocks with matrix products, and the vote is done for all the   #
+# points at once.                                                             #
+# To run it do in a terminal "python indoor_localization_KNN.py", it reads    #
+# the data_files directory and makes the same train and test split of         #
+# proc_data_f_gen_train_test_code.py .                                        #
+# Or "python indoor_localization_KNN.py home_train_data.bin" evaluates the    #
+# binary model file of the generator, mapped in memory without any parsing.   #
+# With C_DISTANCE_CACHE_PATH the test distances are read from the cache of    #
+# the generator "distances" target (computed the first time), and the test   #
+# evaluation is only the top k of each row.                                   #
+###############################################################################
+
+import sys
+import time
+
+import numpy as np
+
+C_K = 5
+C_DISTANCE_VARIANTS = ("masked", "euclidean")
+# Max number of elements of each block of the distance matrix.
+C_DISTANCE_BLOCK_NUM_ELEMENTS = 1 << 22
+# Directory of the distance cache, for example "distance_cache", None doesn't use it.
+C_DISTANCE_CACHE_PATH = None
+
+def masked_terms(X, not_seen_value, flag_query):
+    """
+    Returns the tuple (mask, terms) of X used by masked_distance_matrix(),
+    mask is the float32 matrix of the seen routers and terms is the float32
+    matrix [m*x^2, -2*m*x, m] for the query points or [m, m*x, m*x^2] for
+    the train points.
+    float32 is exact here, the values and the squares are small integers
+    and the sums only have the routers seen in one scan (5 to 24 in the 
+    README), far from the 2^24 limit.
+    """
+    X = np.asarray(X, dtype = np.float32)
+    mask = (X != not_seen_value).astype(np.float32)
+    values = X * mask
+    if flag_query:
+        terms = np.hstack((values * values, -2.0 * values, mask))
+    else:
+        terms = np.hstack((mask, values, values * values))
+    return (mask, terms)
+
+def masked_distance_matrix(X_query, X_train, not_seen_value, train_terms = None, flag_sqrt = True):
+    """
+    Returns the float32 matrix (len(X_query), len(X_train)) of the secret
+    sauce distance between each pair of points. The pairs without any
+    router seen by both points have distance inf (in C++ it's a NaN).
+    The masked sum is computed with one matrix product:
+        sum(m*(q-t)^2) = (m_q*q^2) . m_t - 2 (m_q*q) . (m_t*t) + m_q . (m_t*t^2)
+                       = [m_q*q^2, -2*m_q*q, m_q] . [m_t, m_t*t, m_t*t^2]
+    train_terms are the masked_terms() of X_train, if they were already
+    computed. With flag_sqrt = False returns the squared distances, that
+    have the same order.
+    """
+    mask_query, query_terms = masked_terms(X_query, not_seen_value, True)
+    if train_terms is None:
+        train_terms = masked_terms(X_train, not_seen_value, False)
+    mask_train, train_terms = train_terms
+
+    num_matches = mask_query @ mask_train.T
+    sum_squares = query_terms @ train_terms.T
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        sum_squares /= num_matches * (num_matches + 0.25)
+    sum_squares[num_matches == 0] = np.inf
+    if flag_sqrt:
+        np.sqrt(sum_squares, out = sum_squares)
+    return sum_squares
+
+def euclidean_terms(X):
+    # Returns the tuple (X, squared norms) of X as float64 used by euclidean_distance_matrix().
+    X = np.asarray(X, dtype = np.float64)
+    return (X, np.einsum("ij,ij->i", X, X))
+
+def euclidean_distance_matrix(X_query, X_train, train_terms = None, flag_sqrt = True):
+    """
+    Returns the matrix (len(X_query), len(X_train)) of the plain Euclidean
+    distance, with all the dimensions, computed as |q|^2 - 2 q.t + |t|^2.
+    float64 is exact here, the sums of the squares of all the dimensions
+    may pass the 2^24 limit of float32.
+    """
+    X_query, query_norms = euclidean_terms(X_query)
+    if train_terms is None:
+        train_terms = euclidean_terms(X_train)
+    X_train, train_norms = train_terms
+    sum_squares = X_query @ X_train.T
+    sum_squares *= -2.0
+    sum_squares += query_norms[:, None]
+    sum_squares += train_norms[None, :]
+    if flag_sqrt:
+        np.sqrt(sum_squares, out = sum_squares)
+    return sum_squares
+
+def k_nearest_neighbors(X_query, X_train, k, not_seen_value,
+                        block_num_elements = C_DISTANCE_BLOCK_NUM_ELEMENTS, distance = "masked"):
+    """
+    Returns the matrix (len(X_query), k) of the indexes of the k nearest
+    train points of each query point, sorted by ascending distance and then
+    by index for the same distance (the C++ std::sort() doesn't define the
+    order of the ties). The distance matrix is computed in blocks of query
+    rows, so the memory doesn't depend on the number of query points.
+    distance is one of C_DISTANCE_VARIANTS.
+    """
+    num_query = len(X_query)
+    num_train = len(X_train)
+    k = min(k, num_train)
+    block_size = max(1, block_num_elements // max(1, num_train))
+    if distance == "masked":
+        train_terms = masked_terms(X_train, not_seen_value, False)
+    elif distance == "euclidean":
+        train_terms = euclidean_terms(X_train)
+    else:
+        raise ValueError("unknown distance: " + str(distance))
+    neighbors = np.empty((num_query, k), dtype = np.int64)
+    for begin in range(0, num_query, block_size):
+        end = min(begin + block_size, num_query)
+        if distance == "masked":
+            distances = masked_distance_matrix(X_query[begin : end], X_train, not_seen_value,
+                                               train_terms, flag_sqrt = False)
+        else:
+            distances = euclidean_distance_matrix(X_query[begin : end], X_train, train_terms, flag_sqrt = False)
+        neighbors[begin : end] = k_smallest_sorted(distances, k)
+    return neighbors
+
+def k_smallest_sorted(distances, k):
+    """
+    Returns the indexes of the k smallest distances of each row, sorted by
+    ascending distance and then by index. The ties at the k-th distance
+    are broken by the lowest index, so the result is the one of a stable sort.
+    """
+    num_rows, num_cols = distances.shape
+    if k < num_cols:
+        kth_distance = np.partition(distances, k - 1, axis = 1)[:, k - 1 : k]
+        flag_selected = distances < kth_distance
+        num_equal_needed = k - flag_selected.sum(axis = 1)
+        flag_equal = distances == kth_distance
+        num_equal = flag_equal.sum(axis = 1)
+        # Only the rows with more ties then needed need the ranking of the ties.
+        rows_with_ties = np.nonzero(num_equal > num_equal_needed)[0]
+        if len(rows_with_ties) != 0:
+            flag_equal[rows_with_ties] &= (np.cumsum(flag_equal[rows_with_ties], axis = 1)
+                                           <= num_equal_needed[rows_with_ties, None])
+        flag_selected |= flag_equal
+        nearest = np.nonzero(flag_selected)[1].reshape(num_rows, k)
+    else:
+        nearest = np.broadcast_to(np.arange(num_cols), (num_rows, num_cols))
+    nearest_distances = np.take_along_axis(distances, nearest, axis = 1)
+    order = np.argsort(nearest_distances, axis = 1, kind = "stable")
+    return np.take_along_axis(nearest, order, axis = 1)
+
+def majority_vote(Y_neighbors, num_classes):
+    """
+    Majority vote of the Y target of the neighbors of each point, matrix
+    (num_points, k) sorted by distance. Like the C++ KNN_classifier(), the
+    vote of the k nearest is used if it has a single max, if not the vote
+    of the k-1 nearest and so on, the nearest alone is always a single max.
+    """
+    num_points, k = Y_neighbors.shape
+    # votes[p, i, c] number of votes of class c in the i+1 nearest neighbors of point p.
+    votes = np.zeros((num_points, k, num_classes), dtype = np.int32)
+    np.put_along_axis(votes, Y_neighbors[:, :, None], 1, axis = 2)
+    np.cumsum(votes, axis = 1, out = votes)
+    max_votes = votes.max(axis = 2)
+    flag_single_max = (votes == max_votes[:, :, None]).sum(axis = 2) == 1
+    # The largest i with a single max.
+    best_i = k - 1 - np.argmax(flag_single_max[:, : : -1], axis = 1)
+    return np.argmax(votes[np.arange(num_points), best_i], axis = 1).astype(np.int32)
+
+def KNN_classifier(X_train, Y_train, k, X_query, not_seen_value, num_classes = None,
+                   block_num_elements = C_DISTANCE_BLOCK_NUM_ELEMENTS):
+    # Returns the vector of the predicted Y target int of each point of X_query.
+    Y_train = np.asarray(Y_train)
+    if num_classes is None:
+        num_classes = int(Y_train.max()) + 1
+    if len(X_query) == 0:
+        return np.empty(0, dtype = np.int32)
+    neighbors = k_nearest_neighbors(X_query, X_train, k, not_seen_value, block_num_elements)
+    return majority_vote(Y_train[neighbors], num_classes)
+
+def evaluate_all_dataset(X_train, Y_train, k, X_dataset, Y_dataset, not_seen_value, num_classes = None):
+    # Returns the tuple (dataset_len, correct_dataset_pred, correct_dataset_pred_perc).
+    Y_pred = KNN_classifier(X_train, Y_train, k, X_dataset, not_seen_value, num_classes)
+    dataset_len = len(Y_dataset)
+    correct_dataset_pred = int(np.sum(Y_pred == np.asarray(Y_dataset)))
+    correct_dataset_pred_perc = (correct_dataset_pred / max(dataset_len, 1)) * 100
+    return (dataset_len, correct_dataset_pred, correct_dataset_pred_perc)
+
+def main(model_blob_filename = None):
+    if model_blob_filename is not None:
+        # The datasets of the binary model file, the arrays are views of the mapped file.
+        from wifi_train_data_generator.model_blob import read_model_blob
+
+        model = read_model_blob(model_blob_filename)
+        X_train, Y_train = model["X_train"], model["Y_train"]
+        X_test,  Y_test  = model["X_test"],  model["Y_test"]
+        not_seen_value = model["not_seen_value"]
+        num_classes = len(model["class_names"])
+    else:
+        # The same dataset that proc_data_f_gen_train_test_code.py writes to the .h file,
+        # SparseFingerprints that are classified with the sparse KNN, the same results.
+        from wifi_train_data_generator.pipeline import (read_dataset, split_train_test_arrays,
+                                                        C_NOT_SEEN_ROUTER_SIGNAL_VALUE, C_PERCENTAGE_OF_TRAIN_CASES)
+        from sparse_fingerprints import sparse_KNN_classifier
+
+        data_files_path = ".//data_files//"
+        list_unique_router_names, list_of_y_target, X_all, Y_all = read_dataset(data_files_path, num_workers = 1)
+        X_train, Y_train, X_test, Y_test = split_train_test_arrays(X_all, Y_all, C_PERCENTAGE_OF_TRAIN_CASES)
+        not_seen_value = C_NOT_SEEN_ROUTER_SIGNAL_VALUE
+        num_classes = len(list_of_y_target)
+
+    print("\nIndoor localization with KNN K-Nearest-Neighbors in Python\n")
+    for name, X_dataset, Y_dataset in (("train", X_train, Y_train), ("test", X_test, Y_test)):
+        time_begin = time.perf_counter()
+        if name == "test" and C_DISTANCE_CACHE_PATH is not None:
+            from wifi_train_data_generator.distance_cache import cached_distance_matrix, cached_KNN_classifier
+
+            distances, flag_computed = cached_distance_matrix(C_DISTANCE_CACHE_PATH, X_train, X_test, not_seen_value)
+            print("distance cache computed: ", flag_computed)
+            Y_pred = cached_KNN_classifier(distances, Y_train, C_K, num_classes)
+        elif model_blob_filename is None:
+            Y_pred = sparse_KNN_classifier(X_train, Y_train, C_K, X_dataset, num_classes)
+        else:
+            Y_pred = KNN_classifier(X_train, Y_train, C_K, X_dataset, not_seen_value, num_classes)
+        dataset_len = len(Y_dataset)
+        correct_pred = int(np.sum(Y_pred == np.asarray(Y_dataset)))
+        correct_pred_perc = (correct_pred / max(dataset_len, 1)) * 100
+        elapsed = time.perf_counter() - time_begin
+        print("Correct classification in %s set \n\t%s_len: %d\n\t correct_%s_pred: %d"
+              "\n\t correct_%s_pred_perc: %.4f\n\t time: %.3f s"
+              % (name, name, dataset_len, name, correct_pred, name, correct_pred_perc, elapsed))
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
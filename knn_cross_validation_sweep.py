@@ -0,0 +1,235 @@
+###############################################################################
+#                                                                             #
+# knn_cross_validation_sweep.py                                               #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: k-fold cross validation of the Python KNN of                   #
+#              indoor_localization_KNN.py for all the combinations of k, the  #
+#              not seen value, the distance ("masked", the secret sauce, or   #
+#              "euclidean") and the router pruning threshold (the min number  #
+#              of scans that saw the router), without editing constants and   #
+#              compiling the C++ code. The masked distance ignores the not    #
+#              seen routers, so the not seen values are only swept for the    #
+#              euclidean distance.                                            #
+# The data files are parsed once, the arrays of the sparse X (CSR) and the Y  #
+# are saved in a temporary directory and each worker of the process pool maps #
+# them read only (np.load with mmap_mode), so they are shared and never       #
+# copied. Each task is one fold with one (distance, not seen value, pruning), #
+# it densifies only the rows and columns of its fold and scores all the k,    #
+# the k nearest of the smaller k are the first ones of the larger k. The      #
+# router frequency of the pruning is counted in the train folds of the task,  #
+# so the test fold never leaks into the features.                             #
+# The results table (CSV) has the mean and std of the accuracy over the folds #
+# and the time per query point, the search plus the vote. With more then one  #
+# worker the times are measured with the workers competing for the CPU.       #
+# The folds are stratified by room and grouped by time windows of             #
+# C_SPLIT_WINDOW_S seconds of the timestamps of the JSON lines files, or of   #
+# C_SPLIT_WINDOW_NUM_SCANS consecutive scans of the .dat files, see splits.py.#
+# To run it do in a terminal "python knn_cross_validation_sweep.py --help".   #
+###############################################################################
+
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from indoor_localization_KNN import k_nearest_neighbors, majority_vote, C_DISTANCE_VARIANTS
+from sparse_fingerprints import SparseFingerprints
+from wifi_train_data_generator.pipeline import (read_dataset, C_NOT_SEEN_ROUTER_SIGNAL_VALUE,
+                                                C_SPLIT_WINDOW_S, C_SPLIT_WINDOW_NUM_SCANS)
+from wifi_train_data_generator.splits import k_fold_indexes, time_window_groups, C_SPLIT_SEED
+
+C_DATA_FILES_PATH = ".//data_files//"
+C_RESULTS_FILENAME = "knn_sweep_results.csv"
+C_NUM_FOLDS = 5
+C_LIST_K = (1, 3, 5, 7, 9)
+# 0 is the value of the Python generator and 120 the one of the C++ KNN.
+C_LIST_NOT_SEEN_VALUES = (0, 120)
+# The distances that use the not seen value, the masked one ignores the not seen routers
+# and only runs with C_NOT_SEEN_ROUTER_SIGNAL_VALUE.
+C_NOT_SEEN_DISTANCES = ("euclidean", )
+C_LIST_MIN_ROUTER_FREQUENCIES = (1, 5, 20)
+C_SHARED_ARRAY_NAMES = ("X_indptr", "X_indices", "X_rssi", "X_shape", "Y", "fold_of_case")
+
+# The read only arrays of the worker, mapped by init_worker().
+dict_shared_arrays = {}
+
+def save_shared_arrays(shared_dirname, dict_arrays):
+    for array_name, array in dict_arrays.items():
+        np.save(os.path.join(shared_dirname, array_name + ".npy"), array)
+
+def init_worker(shared_dirname):
+    for array_name in C_SHARED_ARRAY_NAMES:
+        dict_shared_arrays[array_name] = np.load(os.path.join(shared_dirname, array_name + ".npy"),
+                                                 mmap_mode = "r")
+
+def shared_sparse_arrays(X):
+    # The arrays of the SparseFingerprints X saved for the workers.
+    return {"X_indptr": X.indptr, "X_indices": X.indices, "X_rssi": X.rssi, "X_shape": np.array(X.shape)}
+
+def shared_X():
+    # The SparseFingerprints of the mapped arrays, without any copy.
+    return SparseFingerprints(dict_shared_arrays["X_indptr"], dict_shared_arrays["X_indices"],
+                              dict_shared_arrays["X_rssi"], int(dict_shared_arrays["X_shape"][1]))
+
+def router_frequency(X):
+    # Returns the number of scans that saw each router, the feature columns of the SparseFingerprints X.
+    return np.bincount(X.indices, minlength = X.num_features)
+
+def fold_features(X, columns, not_seen_value):
+    """
+    Returns the dense int32 matrix of the columns of the SparseFingerprints
+    X. The seen routers are the readings of the CSR indices, the others are
+    not_seen_value, so a reading equal to not_seen_value is still seen.
+    """
+    fold_column = np.full(X.num_features, -1, dtype = np.int64)
+    fold_column[columns] = np.arange(len(columns))
+    reading_columns = fold_column[X.indices]
+    flag_kept = reading_columns >= 0
+    X_fold = np.full((len(X), len(columns)), not_seen_value, dtype = np.int32)
+    X_fold[X.row_ids()[flag_kept], reading_columns[flag_kept]] = X.rssi[flag_kept]
+    return X_fold
+
+def evaluate_fold(task):
+    """
+    Scores one fold with one (distance, not_seen_value, min_router_frequency)
+    for all the k of list_k. The router frequency of the pruning is counted
+    only in the train folds, the test fold doesn't choose the features.
+    Returns the list of tuples (distance, not_seen_value,
+    min_router_frequency, num_features, k, accuracy, query_latency_s), the
+    accuracy in percentage.
+    """
+    fold, distance, not_seen_value, min_router_frequency, list_k, num_classes = task
+    fold_of_case = np.asarray(dict_shared_arrays["fold_of_case"])
+    Y = np.asarray(dict_shared_arrays["Y"])
+    train_indexes = np.nonzero(fold_of_case != fold)[0]
+    test_indexes  = np.nonzero(fold_of_case == fold)[0]
+    X = shared_X()
+    X_train = X.take(train_indexes)
+    columns = np.nonzero(router_frequency(X_train) >= min_router_frequency)[0]
+    X_train = fold_features(X_train, columns, not_seen_value)
+    X_test  = fold_features(X.take(test_indexes), columns, not_seen_value)
+    Y_train, Y_test = Y[train_indexes], Y[test_indexes]
+    num_queries = max(len(test_indexes), 1)
+
+    time_begin = time.perf_counter()
+    neighbors = k_nearest_neighbors(X_test, X_train, max(list_k), not_seen_value, distance = distance)
+    search_time = time.perf_counter() - time_begin
+    list_results = []
+    for k in list_k:
+        time_begin = time.perf_counter()
+        Y_pred = majority_vote(Y_train[neighbors[:, : k]], num_classes)
+        vote_time = time.perf_counter() - time_begin
+        accuracy = np.count_nonzero(Y_pred == Y_test) / num_queries * 100
+        list_results.append((distance, not_seen_value, min_router_frequency, len(columns), k,
+                             accuracy, (search_time + vote_time) / num_queries))
+    return list_results
+
+def sweep_tasks(num_folds, list_distances, list_not_seen_values, list_min_router_frequencies,
+                list_k, num_classes):
+    # The not seen values are only swept for the C_NOT_SEEN_DISTANCES, the others give the same result.
+    return [(fold, distance, not_seen_value, min_router_frequency, tuple(sorted(list_k)), num_classes)
+                for distance in list_distances
+                for not_seen_value in (list_not_seen_values if distance in C_NOT_SEEN_DISTANCES
+                                       else (C_NOT_SEEN_ROUTER_SIGNAL_VALUE, ))
+                for min_router_frequency in list_min_router_frequencies
+                for fold in range(num_folds)]
+
+def run_sweep(X_all, Y_all, num_classes, fold_of_case, num_folds, list_k, list_not_seen_values,
+              list_distances, list_min_router_frequencies, num_workers):
+    """
+    Runs all the tasks in a process pool of num_workers and returns the
+    list of rows of the results table, the tuples (distance,
+    not_seen_value, min_router_frequency, num_features, k, accuracy_mean,
+    accuracy_std, query_latency_us), sorted by descending accuracy.
+    """
+    list_tasks = sweep_tasks(num_folds, list_distances, list_not_seen_values,
+                             list_min_router_frequencies, list_k, num_classes)
+    shared_dirname = tempfile.mkdtemp(prefix = "knn_sweep_")
+    try:
+        save_shared_arrays(shared_dirname, dict(shared_sparse_arrays(X_all), Y = Y_all,
+                                                fold_of_case = fold_of_case))
+        if num_workers <= 1:
+            init_worker(shared_dirname)
+            list_fold_results = list(map(evaluate_fold, list_tasks))
+        else:
+            with ProcessPoolExecutor(max_workers = num_workers, initializer = init_worker,
+                                     initargs = (shared_dirname, )) as executor:
+                list_fold_results = list(executor.map(evaluate_fold, list_tasks))
+    finally:
+        dict_shared_arrays.clear()
+        shutil.rmtree(shared_dirname, ignore_errors = True)
+
+    # Join the folds of each combination.
+    dict_combinations = {}
+    for fold_results in list_fold_results:
+        for distance, not_seen_value, min_router_frequency, num_features, k, accuracy, latency in fold_results:
+            key = (distance, not_seen_value, min_router_frequency, k)
+            dict_combinations.setdefault(key, []).append((num_features, accuracy, latency))
+    list_rows = []
+    for (distance, not_seen_value, min_router_frequency, k), list_fold_values in dict_combinations.items():
+        # The routers kept by the pruning depend on the train folds, num_features is the rounded mean.
+        num_features, accuracies, latencies = np.array(list_fold_values).T
+        list_rows.append((distance, not_seen_value, min_router_frequency, int(round(num_features.mean())), k,
+                          float(accuracies.mean()), float(accuracies.std()), float(latencies.mean()) * 1e6))
+    list_rows.sort(key = lambda row: (-row[5], row[7]))
+    return list_rows
+
+def write_results_table(results_filename, list_rows):
+    with open(results_filename, "w", newline = "") as f:
+        writer = csv.writer(f)
+        writer.writerow(("distance", "not_seen_value", "min_router_frequency", "num_features", "k",
+                         "accuracy_mean", "accuracy_std", "query_latency_us"))
+        for row in list_rows:
+            writer.writerow(row[ : 5] + tuple("%.4f" % value for value in row[5 : ]))
+
+def main():
+    parser = argparse.ArgumentParser(description = "k-fold cross validation and hyperparameter sweep of the KNN.")
+    parser.add_argument("--data-files-path", default = C_DATA_FILES_PATH)
+    parser.add_argument("--output", default = C_RESULTS_FILENAME, help = "results table CSV file")
+    parser.add_argument("--num-folds", type = int, default = C_NUM_FOLDS)
+    parser.add_argument("--k", type = int, nargs = "+", default = list(C_LIST_K))
+    parser.add_argument("--not-seen", type = int, nargs = "+", default = list(C_LIST_NOT_SEEN_VALUES))
+    parser.add_argument("--distance", nargs = "+", choices = C_DISTANCE_VARIANTS, default = list(C_DISTANCE_VARIANTS))
+    parser.add_argument("--min-router-frequency", type = int, nargs = "+", default = list(C_LIST_MIN_ROUTER_FREQUENCIES))
+    parser.add_argument("--window-num-scans", type = int, default = C_SPLIT_WINDOW_NUM_SCANS,
+                        help = "time window of the fold groups of the .dat files without timestamps, "
+                               "0 for folds of single scans")
+    parser.add_argument("--window-s", type = float, default = C_SPLIT_WINDOW_S,
+                        help = "time window in seconds of the fold groups of the scans with timestamps")
+    parser.add_argument("--seed", type = int, default = C_SPLIT_SEED)
+    parser.add_argument("--workers", type = int, default = os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    list_unique_router_names, list_of_y_target, X_all, Y_all, scan_index_all, scan_time_all = read_dataset(
+        args.data_files_path, num_workers = args.workers, flag_scan_index = True)
+    groups = None
+    if args.window_num_scans > 0:
+        groups = time_window_groups(Y_all, scan_index_all, args.window_num_scans, scan_time_all, args.window_s)
+    fold_of_case = np.empty(len(Y_all), dtype = np.int32)
+    for fold, (_, test_indexes) in enumerate(k_fold_indexes(Y_all, args.num_folds, groups, args.seed)):
+        fold_of_case[test_indexes] = fold
+
+    time_begin = time.perf_counter()
+    list_rows = run_sweep(X_all, Y_all, len(list_of_y_target), fold_of_case, args.num_folds, args.k,
+                          args.not_seen, args.distance, args.min_router_frequency, args.workers)
+    print("sweep: ", len(list_rows), " combinations, ", args.num_folds, " folds, time: %.3f s"
+          % (time.perf_counter() - time_begin))
+    write_results_table(args.output, list_rows)
+    print("%-10s %8s %8s %8s %4s %10s %8s %12s" % ("distance", "not_seen", "min_freq", "features", "k",
+                                                   "accuracy", "std", "latency_us"))
+    for row in list_rows[ : 10]:
+        print("%-10s %8d %8d %8d %4d %10.4f %8.4f %12.2f" % row)
+    print("results table: ", args.output)
+
+if __name__ == "__main__":
+    main()
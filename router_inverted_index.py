@@ -0,0 +1,101 @@
+###############################################################################
+#                                                                             #
+# router_inverted_index.py                                                    #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Inverted index from each router (feature index) to the train   #
+#              scans that saw it, to prune the candidates of the KNN.         #
+# The secret sauce distance only uses the routers seen by both scans, the     #
+# train scans without any router in common with the query have distance inf   #
+# and are never neighbors (if there are at least k with a router in common).  #
+# So each query is only scored against the train scans that share at least    #
+# min_shared_routers routers with it, the cost of a query is the size of the  #
+# candidate set and not len(X_train) * num_features.                          #
+# The index is in the CSR format, like SparseFingerprints transposed:         #
+#     router_offsets - The train rows of router r are                         #
+#                      train_rows[router_offsets[r] : router_offsets[r+1]].   #
+#     train_rows     - Sorted train rows of each router.                      #
+###############################################################################
+
+import numpy as np
+
+from indoor_localization_KNN import k_smallest_sorted, majority_vote
+from sparse_fingerprints import sparse_masked_distance_matrix
+
+C_MIN_SHARED_ROUTERS = 1
+
+def create_router_inverted_index(X_train):
+    """
+    Returns the tuple (router_offsets, train_rows) of the SparseFingerprints
+    X_train.
+    """
+    order = np.argsort(X_train.indices, kind = "stable")   # Stable, so the rows stay sorted.
+    train_rows = X_train.row_ids()[order]
+    router_offsets = np.zeros(X_train.num_features + 1, dtype = np.int64)
+    np.cumsum(np.bincount(X_train.indices, minlength = X_train.num_features), out = router_offsets[1 : ])
+    return (router_offsets, train_rows)
+
+def router_train_rows(router_inverted_index, router_index):
+    router_offsets, train_rows = router_inverted_index
+    return train_rows[router_offsets[router_index] : router_offsets[router_index + 1]]
+
+def candidate_train_rows(router_inverted_index, query_router_indices, min_shared_routers = C_MIN_SHARED_ROUTERS):
+    """
+    Returns the sorted train rows that share at least min_shared_routers
+    routers with the query. The shared routers are counted with np.unique()
+    of the posting lists, the cost is the size of the posting lists and not
+    the number of train scans.
+    """
+    router_offsets, train_rows = router_inverted_index
+    query_router_indices = query_router_indices[query_router_indices < len(router_offsets) - 1]
+    if len(query_router_indices) == 0:
+        return np.empty(0, dtype = np.int64)
+    posting_lists = [router_train_rows(router_inverted_index, router_index)
+                         for router_index in query_router_indices.tolist()]
+    candidates, num_shared_routers = np.unique(np.concatenate(posting_lists), return_counts = True)
+    return candidates[num_shared_routers >= min_shared_routers]
+
+def inverted_index_k_nearest_neighbors(X_query, X_train, router_inverted_index, k,
+                                       min_shared_routers = C_MIN_SHARED_ROUTERS):
+    """
+    Returns the matrix (len(X_query), k) of the indexes of the k nearest
+    train scans of each query, sorted like k_nearest_neighbors() of
+    indoor_localization_KNN.py, but only the candidates are scored.
+    If there are less then k candidates, the other neighbors are the first
+    train scans that aren't candidates, like the ties of the inf distances.
+    With min_shared_routers = 1 the result is the same of the full KNN.
+    """
+    num_train = len(X_train)
+    k = min(k, num_train)
+    neighbors = np.empty((len(X_query), k), dtype = np.int64)
+    for i in range(len(X_query)):
+        query = X_query[i : i + 1]
+        candidates = candidate_train_rows(router_inverted_index, query.indices, min_shared_routers)
+        if len(candidates) != 0:
+            distances = sparse_masked_distance_matrix(query, X_train.take(candidates), flag_sqrt = False)
+            nearest = candidates[k_smallest_sorted(distances, min(k, len(candidates)))[0]]
+        else:
+            nearest = candidates
+        if len(nearest) < k:
+            # The first rows that aren't candidates are among the first k rows and the candidates.
+            num_others = k - len(nearest)
+            others = np.setdiff1d(np.arange(min(num_train, num_others + len(candidates))), candidates)[ : num_others]
+            nearest = np.concatenate((nearest, others))
+        neighbors[i] = nearest
+    return neighbors
+
+def inverted_index_KNN_classifier(X_train, Y_train, router_inverted_index, k, X_query, num_classes = None,
+                                  min_shared_routers = C_MIN_SHARED_ROUTERS):
+    # Returns the vector of the predicted Y target int of each scan of the SparseFingerprints X_query.
+    Y_train = np.asarray(Y_train)
+    if num_classes is None:
+        num_classes = int(Y_train.max()) + 1
+    if len(X_query) == 0:
+        return np.empty(0, dtype = np.int32)
+    neighbors = inverted_index_k_nearest_neighbors(X_query, X_train, router_inverted_index, k,
+                                                   min_shared_routers)
+    return majority_vote(Y_train[neighbors], num_classes)
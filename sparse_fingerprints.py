@@ -0,0 +1,184 @@
+###############################################################################
+#                                                                             #
+# sparse_fingerprints.py                                                      #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Sparse representation of the WiFi fingerprints (scans).       #
+#              In each scan only 5 to 24 of all the routers are seen, so the  #
+#              dense matrix (num_samples, num_unique_routers) is mostly       #
+# C_NOT_SEEN_ROUTER_SIGNAL_VALUE, and with thousands of routers of many       #
+# buildings it is more then 95% filler. SparseFingerprints stores only the    #
+# readings, in the CSR (compressed sparse row) format:                        #
+#     indptr  - The readings of row i are [indptr[i], indptr[i+1]).           #
+#     indices - The router (feature column) of each reading, sorted in a row. #
+#     rssi    - The abs(RSSI) of each reading, uint8.                         #
+# So the memory depends on the number of readings and not on the vocabulary.  #
+# The secret sauce distance is computed only over the intersection of the     #
+# routers seen by both scans, the same distance of indoor_localization_KNN.py.#
+###############################################################################
+
+import numpy as np
+
+from indoor_localization_KNN import k_smallest_sorted, majority_vote, C_DISTANCE_BLOCK_NUM_ELEMENTS
+
+class SparseFingerprints:
+    """
+    CSR matrix of shape (num_samples, num_features) of the abs(RSSI) of the
+    routers seen in each scan, the routers that weren't seen aren't stored.
+    """
+
+    def __init__(self, indptr, indices, rssi, num_features):
+        self.indptr  = np.asarray(indptr, dtype = np.int64)
+        # uint16 columns are enough up to 65536 routers.
+        self.indices = np.asarray(indices, dtype = np.uint16 if num_features <= (1 << 16) else np.int32)
+        self.rssi    = np.asarray(rssi, dtype = np.uint8)
+        self.num_features = int(num_features)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @property
+    def shape(self):
+        return (len(self), self.num_features)
+
+    @property
+    def nnz(self):
+        return len(self.indices)
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.rssi.nbytes
+
+    def row_ids(self):
+        # The row of each reading.
+        return np.repeat(np.arange(len(self), dtype = np.int64), np.diff(self.indptr))
+
+    def row(self, i):
+        # Returns the tuple (indices, rssi) of the routers seen in the scan i.
+        begin, end = self.indptr[i], self.indptr[i + 1]
+        return (self.indices[begin : end], self.rssi[begin : end])
+
+    def take(self, rows):
+        """
+        Returns the SparseFingerprints of the rows in the given order, like
+        X[rows] of a NumPy matrix (the shuffle and the train/test split).
+        """
+        rows = np.asarray(rows, dtype = np.int64)
+        begins = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - begins
+        indptr = np.zeros(len(rows) + 1, dtype = np.int64)
+        np.cumsum(lengths, out = indptr[1 : ])
+        # Position in the old arrays of each reading of the new rows.
+        positions = np.repeat(begins - indptr[ : -1], lengths) + np.arange(indptr[-1], dtype = np.int64)
+        return SparseFingerprints(indptr, self.indices[positions], self.rssi[positions], self.num_features)
+
+    def __getitem__(self, rows):
+        if isinstance(rows, slice):
+            rows = range(*rows.indices(len(self)))
+        return self.take(rows)
+
+    def to_dense(self, not_seen_value, dtype = np.uint8):
+        X = np.full(self.shape, not_seen_value, dtype = dtype)
+        X[self.row_ids(), self.indices] = self.rssi
+        return X
+
+def sparse_fingerprints_from_readings(row_ids, column_ids, rssi, num_samples, num_features):
+    """
+    Builds the SparseFingerprints from the flat arrays of the readings, in
+    any order. The same router name can appear more then once in a scan,
+    like in the dense dataset the first reading is the one that is used.
+    """
+    keys = np.asarray(row_ids, dtype = np.int64) * num_features + np.asarray(column_ids, dtype = np.int64)
+    keys, first_index = np.unique(keys, return_index = True)
+    rows = keys // num_features
+    indptr = np.zeros(num_samples + 1, dtype = np.int64)
+    np.cumsum(np.bincount(rows, minlength = num_samples), out = indptr[1 : ])
+    rssi = np.abs(np.asarray(rssi, dtype = np.int32))[first_index]
+    return SparseFingerprints(indptr, keys % num_features, rssi, num_features)
+
+def dense_rows(X, not_seen_value, dtype = np.uint8):
+    # The dense NumPy matrix of the rows of a SparseFingerprints, a dense X is returned as it is.
+    if isinstance(X, SparseFingerprints):
+        return X.to_dense(not_seen_value, dtype)
+    return X
+
+def sparse_fingerprints_from_dense(X, not_seen_value):
+    X = np.asarray(X)
+    row_ids, column_ids = np.nonzero(X != not_seen_value)
+    return sparse_fingerprints_from_readings(row_ids, column_ids, X[row_ids, column_ids], len(X), X.shape[1])
+
+def sparse_masked_distance_matrix(X_query, X_train, flag_sqrt = True,
+                                  block_num_elements = C_DISTANCE_BLOCK_NUM_ELEMENTS):
+    """
+    Returns the float32 matrix (len(X_query), len(X_train)) of the secret
+    sauce distance between two SparseFingerprints, inf for the pairs without
+    any router seen by both scans. For a block of query rows, the values of
+    the query rows are scattered in a dense (block, num_features) matrix and
+    gathered at the routers of each train reading, so the cost is
+    O(len(X_query) * X_train.nnz) and not O(len(X_query) * len(X_train) * num_features).
+    The sums over each train row are differences of the integer cumulative
+    sums, so they are exact.
+    """
+    num_query = len(X_query)
+    num_train = len(X_train)
+    num_features = max(X_query.num_features, X_train.num_features)
+    distances = np.empty((num_query, num_train), dtype = np.float32)
+    train_rssi = X_train.rssi.astype(np.int32)
+    block_size = max(1, block_num_elements // max(1, X_train.nnz, num_features))
+    for begin in range(0, num_query, block_size):
+        end = min(begin + block_size, num_query)
+        block = X_query[begin : end]
+        query_rssi = np.zeros((end - begin, num_features), dtype = np.int32)
+        query_mask = np.zeros((end - begin, num_features), dtype = np.int32)
+        block_row_ids = block.row_ids()
+        query_rssi[block_row_ids, block.indices] = block.rssi
+        query_mask[block_row_ids, block.indices] = 1
+
+        # (block, X_train.nnz) matrices, one column per train reading.
+        mask = query_mask[:, X_train.indices]
+        squares = mask * (query_rssi[:, X_train.indices] - train_rssi) ** 2
+        num_matches = segment_sums(mask, X_train.indptr)
+        sum_squares = segment_sums(squares, X_train.indptr).astype(np.float32)
+        num_matches = num_matches.astype(np.float32)
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            sum_squares /= num_matches * (num_matches + 0.25)
+        sum_squares[num_matches == 0] = np.inf
+        distances[begin : end] = sum_squares
+    if flag_sqrt:
+        np.sqrt(distances, out = distances)
+    return distances
+
+def segment_sums(values, indptr):
+    # Sum of the columns [indptr[i], indptr[i+1]) of each row, also for the empty segments.
+    cumulative = np.zeros((values.shape[0], values.shape[1] + 1), dtype = np.int64)
+    np.cumsum(values, axis = 1, out = cumulative[:, 1 : ])
+    return cumulative[:, indptr[1 : ]] - cumulative[:, indptr[ : -1]]
+
+def sparse_k_nearest_neighbors(X_query, X_train, k, block_num_elements = C_DISTANCE_BLOCK_NUM_ELEMENTS):
+    # The same of k_nearest_neighbors() of indoor_localization_KNN.py for SparseFingerprints.
+    num_query = len(X_query)
+    num_train = len(X_train)
+    k = min(k, num_train)
+    block_size = max(1, block_num_elements // max(1, num_train))
+    neighbors = np.empty((num_query, k), dtype = np.int64)
+    for begin in range(0, num_query, block_size):
+        end = min(begin + block_size, num_query)
+        distances = sparse_masked_distance_matrix(X_query[begin : end], X_train, flag_sqrt = False,
+                                                  block_num_elements = block_num_elements)
+        neighbors[begin : end] = k_smallest_sorted(distances, k)
+    return neighbors
+
+def sparse_KNN_classifier(X_train, Y_train, k, X_query, num_classes = None,
+                          block_num_elements = C_DISTANCE_BLOCK_NUM_ELEMENTS):
+    # Returns the vector of the predicted Y target int of each scan of X_query.
+    Y_train = np.asarray(Y_train)
+    if num_classes is None:
+        num_classes = int(Y_train.max()) + 1
+    if len(X_query) == 0:
+        return np.empty(0, dtype = np.int32)
+    neighbors = sparse_k_nearest_neighbors(X_query, X_train, k, block_num_elements)
+    return majority_vote(Y_train[neighbors], num_classes)
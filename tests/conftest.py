@@ -0,0 +1,5 @@
+# The tests import the modules of the repository root, like the benchmarks.
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
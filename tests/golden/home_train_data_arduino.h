@@ -0,0 +1,72 @@
+
+#pragma once
+
+
+#ifndef __HOME_TRAIN_DATA_H_
+#define __HOME_TRAIN_DATA_H_
+
+    
+#include <string>
+#include <vector>
+#include <map>
+
+//using namespace std;
+
+
+// Lookup table of routers, Y int target to Y classifier Class name target.
+// Usage pattern "vec_target_table_Y[Y_int]"   
+std::vector<std::string> vec_target_table_Y 
+{
+    "Cafe: 051336",
+    "Guest (5 GHz)",
+    "MEO-089449",
+    "NOS-003DDE",
+    "My Home WiFi"
+};
+
+
+// HashTable -> X router_name (string) to feature_index (size_t).
+std::map<std::string,int> map_x_router_name_to_index 
+{
+    {"room_B", 0},
+    {"room_A", 1},
+    {"kitchen", 2}
+};
+
+
+std::vector<std::vector<float>> vec_X_train
+{
+    {43,0,53,0,61},
+    {0,81,0,47,0},
+    {44,0,55,0,60},
+    {0,80,90,0,0},
+    {95,0,0,12,7}
+};
+
+
+std::vector<int> vec_Y_train
+{
+    0,
+    1,
+    0,
+    2,
+    1
+};
+
+
+std::vector<std::vector<float>> vec_X_test
+{
+    {42,0,54,0,0},
+    {0,79,0,48,9}
+};
+
+
+std::vector<int> vec_Y_test
+{
+    0,
+    1
+};
+
+
+
+#endif
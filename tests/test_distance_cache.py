@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pytest
+
+from indoor_localization_KNN import masked_distance_matrix
+from sparse_fingerprints import sparse_fingerprints_from_dense
+from wifi_train_data_generator.distance_cache import cached_distance_matrix, write_distance_cache
+
+C_NOT_SEEN_VALUE = 0
+
+def dataset():
+    rng = np.random.RandomState(11)
+    X = rng.randint(30, 96, (30, 12)).astype(np.uint8)
+    X[rng.rand(30, 12) < 0.6] = C_NOT_SEEN_VALUE
+    return (X[ : 20], X[20 : ])
+
+def test_second_call_hits_the_cache_and_a_changed_input_misses_it(tmp_path):
+    distance_cache_path = str(tmp_path / "distance_cache")
+    X_train, X_test = dataset()
+    distances, flag_computed = cached_distance_matrix(distance_cache_path, X_train, X_test, C_NOT_SEEN_VALUE)
+    assert flag_computed
+    np.testing.assert_array_equal(distances, masked_distance_matrix(X_test, X_train, C_NOT_SEEN_VALUE,
+                                                                    flag_sqrt = False))
+    distances_again, flag_computed = cached_distance_matrix(distance_cache_path, X_train, X_test, C_NOT_SEEN_VALUE)
+    assert not flag_computed
+    np.testing.assert_array_equal(distances_again, distances)
+    # The sparse dataset of the same uint8 values is the same cache entry.
+    assert not cached_distance_matrix(distance_cache_path, sparse_fingerprints_from_dense(X_train, C_NOT_SEEN_VALUE),
+                                      sparse_fingerprints_from_dense(X_test, C_NOT_SEEN_VALUE),
+                                      C_NOT_SEEN_VALUE)[1]
+
+    X_test_changed = X_test.copy()
+    X_test_changed[0, 0] += 1
+    for X_train_other, X_test_other, not_seen_value in ((X_train, X_test_changed, C_NOT_SEEN_VALUE),
+                                                        (X_train, X_test, 120)):
+        assert cached_distance_matrix(distance_cache_path, X_train_other, X_test_other, not_seen_value)[1]
+    assert len(os.listdir(distance_cache_path)) == 3
+
+def test_mixed_dense_and_sparse_datasets_are_rejected(tmp_path):
+    X_train, X_test = dataset()
+    X_test_sparse = sparse_fingerprints_from_dense(X_test, C_NOT_SEEN_VALUE)
+    with pytest.raises(TypeError):
+        cached_distance_matrix(str(tmp_path), X_train, X_test_sparse, C_NOT_SEEN_VALUE)
+    with pytest.raises(TypeError):
+        write_distance_cache(str(tmp_path / "distances.npy"), X_train, X_test_sparse, C_NOT_SEEN_VALUE)
+    assert os.listdir(str(tmp_path)) == []
@@ -0,0 +1,59 @@
+import os
+import re
+
+import numpy as np
+import pytest
+
+import wifi_train_data_generator.emitters as emitters
+from sparse_fingerprints import sparse_fingerprints_from_dense
+from wifi_train_data_generator.emitters import emit_PC_vector, emit_arduino_vector, write_dot_H_file_compact
+
+C_GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+# The golden files were written by write_dot_H_file_for_C_plus_plus() of the
+# proc_data_f_gen_train_test_code.py and proc_data_f_gen_train_test_code_arduino.py
+# of the baseline, before the .h vectors were streamed, with these lists.
+LIST_UNIQUE_ROUTER_NAMES = ["Cafe: 051336", "Guest (5 GHz)", "MEO-089449", "NOS-003DDE", "My Home WiFi"]
+LIST_OF_Y_TARGET = [("room_B", 0), ("room_A", 1), ("kitchen", 2)]
+X_TRAIN = [[43, 0, 53, 0, 61], [0, 81, 0, 47, 0], [44, 0, 55, 0, 60], [0, 80, 90, 0, 0], [95, 0, 0, 12, 7]]
+Y_TRAIN = [0, 1, 0, 2, 1]
+X_TEST = [[42, 0, 54, 0, 0], [0, 79, 0, 48, 9]]
+Y_TEST = [0, 1]
+
+def golden_datasets():
+    # The same dataset as lists, as NumPy arrays and as SparseFingerprints.
+    yield (X_TRAIN, Y_TRAIN, X_TEST, Y_TEST)
+    yield (np.array(X_TRAIN, dtype = np.uint8), np.array(Y_TRAIN), np.array(X_TEST, dtype = np.uint8),
+           np.array(Y_TEST, dtype = np.int32))
+    yield (sparse_fingerprints_from_dense(np.array(X_TRAIN), 0), np.array(Y_TRAIN),
+           sparse_fingerprints_from_dense(np.array(X_TEST), 0), np.array(Y_TEST))
+
+@pytest.mark.parametrize("emit, golden_filename", [(emit_PC_vector, "home_train_data_pc.h"),
+                                                   (emit_arduino_vector, "home_train_data_arduino.h")])
+def test_streamed_headers_are_the_golden_ones(tmp_path, monkeypatch, emit, golden_filename):
+    with open(os.path.join(C_GOLDEN_PATH, golden_filename), "rb") as f:
+        golden = f.read()
+    filename = str(tmp_path / "home_train_data.h")
+    for chunk_num_rows in (2, emitters.C_WRITE_CHUNK_NUM_ROWS):
+        # Chunks of 2 rows, so the rows are written in more then one chunk.
+        monkeypatch.setattr(emitters, "C_WRITE_CHUNK_NUM_ROWS", chunk_num_rows)
+        for X_train, Y_train, X_test, Y_test in golden_datasets():
+            emit(filename, LIST_UNIQUE_ROUTER_NAMES, LIST_OF_Y_TARGET, X_train, Y_train, X_test, Y_test)
+            with open(filename, "rb") as f:
+                assert f.read() == golden
+
+def test_compact_header_of_an_empty_test_dataset(tmp_path):
+    filename = str(tmp_path / "home_train_data_compact.h")
+    X_train = np.array([[40, 0, 55], [0, 61, 70]], dtype = np.uint8)
+    write_dot_H_file_compact(filename, ["r1", "r2", "r3"], [("room_a", 0), ("room_b", 1)],
+                             X_train, np.array([0, 1]), np.empty((0, 3), dtype = np.uint8), np.empty(0, dtype = int))
+    with open(filename) as f:
+        text = f.read()
+    assert "constexpr int C_X_TEST_NUM_ROWS = 0;" in text
+    assert "const uint8_t vec_X_test_flat[1] PROGMEM = { 0 };" in text
+    assert "const uint8_t vec_Y_test_flat[1] PROGMEM = { 0 };" in text
+    # No array of size 0 and the accessors of the four arrays.
+    assert re.search(r"\[0\] PROGMEM", text) is None
+    for macro_name in ("X_TRAIN_AT(row, feature_index)", "Y_TRAIN_AT(row)", "X_TEST_AT(row, feature_index)",
+                       "Y_TEST_AT(row)"):
+        assert "#define " + macro_name + " ((int) (uint8_t) pgm_read_byte(" in text
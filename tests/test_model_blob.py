@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from sparse_fingerprints import sparse_fingerprints_from_dense
+from wifi_train_data_generator.model_blob import write_model_blob, read_model_blob, C_ALIGNMENT, C_SECTION_NAMES
+
+C_NOT_SEEN_VALUE = 0
+
+def model_dataset():
+    rng = np.random.RandomState(3)
+    list_unique_router_names = ["router_%02d" % i for i in range(9)] + ["Café (2.4 GHz)"]
+    list_of_y_target = [("kitchen", 1), ("room_a", 0), ("sala de estar", 2)]
+    X_train = rng.randint(30, 96, (13, 10)).astype(np.uint8)
+    X_train[rng.rand(13, 10) < 0.6] = C_NOT_SEEN_VALUE
+    X_test = rng.randint(30, 96, (5, 10)).astype(np.uint8)
+    X_test[rng.rand(5, 10) < 0.6] = C_NOT_SEEN_VALUE
+    return (list_unique_router_names, list_of_y_target, X_train, rng.randint(0, 3, 13),
+            X_test, rng.randint(0, 3, 5))
+
+def assert_same_model(dict_model, list_unique_router_names, X_train, Y_train, X_test, Y_test):
+    assert dict_model["version"] == 1
+    assert dict_model["not_seen_value"] == C_NOT_SEEN_VALUE
+    assert dict_model["router_names"] == list_unique_router_names
+    assert dict_model["class_names"] == ["room_a", "kitchen", "sala de estar"]
+    np.testing.assert_array_equal(dict_model["X_train"], X_train)
+    np.testing.assert_array_equal(dict_model["Y_train"], Y_train)
+    np.testing.assert_array_equal(dict_model["X_test"], X_test)
+    np.testing.assert_array_equal(dict_model["Y_test"], Y_test)
+
+def test_model_blob_round_trip(tmp_path):
+    list_unique_router_names, list_of_y_target, X_train, Y_train, X_test, Y_test = model_dataset()
+    filename = str(tmp_path / "model.bin")
+    list_sections = write_model_blob(filename, list_unique_router_names, list_of_y_target,
+                                     X_train, Y_train, X_test, Y_test, C_NOT_SEEN_VALUE)
+    assert [section_name for section_name, _ in list_sections] == list(C_SECTION_NAMES)
+    assert dict(list_sections)["X_train"] == X_train.nbytes
+    dict_model = read_model_blob(filename)
+    assert_same_model(dict_model, list_unique_router_names, X_train, Y_train, X_test, Y_test)
+    assert dict_model["X_train"].dtype == np.uint8
+    # The arrays are views of the mapped file, aligned.
+    assert not dict_model["X_train"].flags.writeable
+    assert dict_model["X_train"].ctypes.data % C_ALIGNMENT == 0
+
+def test_model_blob_of_sparse_dataset_is_the_dense_one(tmp_path):
+    list_unique_router_names, list_of_y_target, X_train, Y_train, X_test, Y_test = model_dataset()
+    write_model_blob(str(tmp_path / "dense.bin"), list_unique_router_names, list_of_y_target,
+                     X_train, Y_train, X_test, Y_test, C_NOT_SEEN_VALUE)
+    write_model_blob(str(tmp_path / "sparse.bin"), list_unique_router_names, list_of_y_target,
+                     sparse_fingerprints_from_dense(X_train, C_NOT_SEEN_VALUE), Y_train,
+                     sparse_fingerprints_from_dense(X_test, C_NOT_SEEN_VALUE), Y_test, C_NOT_SEEN_VALUE)
+    assert (tmp_path / "sparse.bin").read_bytes() == (tmp_path / "dense.bin").read_bytes()
+
+def test_read_model_blob_errors(tmp_path):
+    filename = str(tmp_path / "model.bin")
+    with open(filename, "wb") as f:
+        f.write(b"not a model blob" * 16)
+    with pytest.raises(ValueError):
+        read_model_blob(filename)
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+
+from wifi_data_parser import format_scan_record
+from wifi_train_data_generator.shards import (find_shards, generate_shards, read_shard_selector, select_shard,
+                                              shard_scores, C_SHARD_SELECTOR_FILENAME)
+
+def write_room_file(filename, list_router_names, num_scans, rng):
+    with open(filename, "w", encoding = "utf-8") as f:
+        for i in range(num_scans):
+            routers = rng.choice(list_router_names, 3, replace = False)
+            sample = [(num, str(router_name), -int(rng.randint(40, 90))) for num, router_name in enumerate(routers, 1)]
+            f.write(format_scan_record(sample, 1700000000.0 + 5.0 * i))
+
+def write_campus(data_files_path):
+    # Two buildings with one floor each and disjoint routers.
+    rng = np.random.RandomState(1)
+    for building, router_prefix in (("library", "lib_"), ("main_building", "main_")):
+        floor_path = os.path.join(data_files_path, building, "floor_0")
+        os.makedirs(floor_path)
+        list_router_names = [router_prefix + str(i) for i in range(6)]
+        for room in ("room_A", "room_B"):
+            write_room_file(os.path.join(floor_path, room + "_data.jsonl"), list_router_names, 10, rng)
+
+def test_shard_selector_routes_each_scan_to_its_own_shard(tmp_path):
+    data_files_path = str(tmp_path / "data_files")
+    output_path = str(tmp_path / "shards")
+    write_campus(data_files_path)
+    assert [shard[0] for shard in find_shards(data_files_path, "building")] == ["library", "main_building"]
+    assert [shard[0] for shard in find_shards(data_files_path, "floor")] == ["library/floor_0",
+                                                                             "main_building/floor_0"]
+
+    shard_selector = generate_shards(data_files_path, "building", ["blob"], output_path)
+    assert read_shard_selector(os.path.join(output_path, C_SHARD_SELECTOR_FILENAME)) == shard_selector
+    assert [shard["name"] for shard in shard_selector["shards"]] == ["library", "main_building"]
+    assert set(shard_selector["shards"][0]["routers"]) == {"lib_" + str(i) for i in range(6)}
+    for shard in shard_selector["shards"]:
+        assert os.path.isfile(os.path.join(shard["output_path"], "home_train_data.bin"))
+
+    assert select_shard(shard_selector, ["lib_0", "lib_3", "lib_5"]) == 0
+    assert select_shard(shard_selector, ["main_1", "main_2", "main_4"]) == 1
+    # The routers that no shard has are ignored, a single known router still decides.
+    assert select_shard(shard_selector, ["unknown_router", "main_0"]) == 1
+    assert shard_scores(shard_selector, ["unknown_router"]) == [0.0, 0.0]
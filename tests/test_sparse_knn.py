@@ -0,0 +1,86 @@
+import numpy as np
+
+from indoor_localization_KNN import KNN_classifier, k_nearest_neighbors
+from sparse_fingerprints import (sparse_fingerprints_from_dense, sparse_masked_distance_matrix,
+                                 sparse_k_nearest_neighbors, sparse_KNN_classifier)
+from router_inverted_index import (create_router_inverted_index, candidate_train_rows,
+                                   inverted_index_k_nearest_neighbors, inverted_index_KNN_classifier)
+
+C_NOT_SEEN_VALUE = 0
+C_NUM_FEATURES = 40
+
+def random_fingerprints(rng, num_scans, num_visible):
+    # Dense abs(RSSI) matrix, each scan sees num_visible random routers of the first half or of the second half.
+    X = np.full((num_scans, C_NUM_FEATURES), C_NOT_SEEN_VALUE, dtype = np.uint8)
+    for i in range(num_scans):
+        first_router = (i % 2) * (C_NUM_FEATURES // 2)
+        routers = first_router + rng.choice(C_NUM_FEATURES // 2, num_visible, replace = False)
+        X[i, routers] = rng.randint(30, 96, num_visible)
+    return X
+
+def brute_force_distances(X_query, X_train):
+    # The secret sauce distance of each pair of scans, with the float32 operations of the matrix versions.
+    distances = np.full((len(X_query), len(X_train)), np.inf, dtype = np.float32)
+    for i, query in enumerate(X_query.astype(np.int64)):
+        for j, train in enumerate(X_train.astype(np.int64)):
+            shared = (query != C_NOT_SEEN_VALUE) & (train != C_NOT_SEEN_VALUE)
+            num_matches = np.float32(np.count_nonzero(shared))
+            if num_matches != 0:
+                sum_squares = np.float32(np.sum((query[shared] - train[shared]) ** 2))
+                distances[i, j] = sum_squares / (num_matches * (num_matches + np.float32(0.25)))
+    return distances
+
+def brute_force_neighbors(distances, k):
+    # Sorted by distance and then by index.
+    return np.argsort(distances, axis = 1, kind = "stable")[:, : k]
+
+def dataset(seed = 7):
+    rng = np.random.RandomState(seed)
+    X_train = random_fingerprints(rng, 60, 6)
+    X_query = random_fingerprints(rng, 15, 4)
+    # A query without any router of the train scans, all its distances are inf.
+    X_train[:, -1] = C_NOT_SEEN_VALUE
+    X_query[0] = C_NOT_SEEN_VALUE
+    X_query[0, -1] = 50
+    Y_train = rng.randint(0, 4, len(X_train))
+    return (X_train, Y_train, X_query)
+
+def test_sparse_distances_are_the_brute_force_ones():
+    X_train, _, X_query = dataset()
+    distances = brute_force_distances(X_query, X_train)
+    sparse_distances = sparse_masked_distance_matrix(sparse_fingerprints_from_dense(X_query, C_NOT_SEEN_VALUE),
+                                                     sparse_fingerprints_from_dense(X_train, C_NOT_SEEN_VALUE),
+                                                     flag_sqrt = False, block_num_elements = 64)
+    np.testing.assert_array_equal(sparse_distances, distances)
+    assert np.isinf(distances[0]).all()
+
+def test_sparse_and_inverted_index_neighbors_are_the_brute_force_ones():
+    X_train, Y_train, X_query = dataset()
+    X_train_sparse = sparse_fingerprints_from_dense(X_train, C_NOT_SEEN_VALUE)
+    X_query_sparse = sparse_fingerprints_from_dense(X_query, C_NOT_SEEN_VALUE)
+    router_inverted_index = create_router_inverted_index(X_train_sparse)
+    distances = brute_force_distances(X_query, X_train)
+    for k in (1, 5, 40):
+        neighbors = brute_force_neighbors(distances, k)
+        np.testing.assert_array_equal(k_nearest_neighbors(X_query, X_train, k, C_NOT_SEEN_VALUE), neighbors)
+        np.testing.assert_array_equal(sparse_k_nearest_neighbors(X_query_sparse, X_train_sparse, k), neighbors)
+        # With k = 40 most queries have less then k candidates, the others are the first non candidates.
+        np.testing.assert_array_equal(inverted_index_k_nearest_neighbors(X_query_sparse, X_train_sparse,
+                                                                         router_inverted_index, k), neighbors)
+
+        Y_pred = KNN_classifier(X_train, Y_train, k, X_query, C_NOT_SEEN_VALUE, 4)
+        np.testing.assert_array_equal(sparse_KNN_classifier(X_train_sparse, Y_train, k, X_query_sparse, 4), Y_pred)
+        np.testing.assert_array_equal(inverted_index_KNN_classifier(X_train_sparse, Y_train, router_inverted_index,
+                                                                    k, X_query_sparse, 4), Y_pred)
+
+def test_candidate_train_rows_count_the_shared_routers():
+    X_train, _, X_query = dataset()
+    X_train_sparse = sparse_fingerprints_from_dense(X_train, C_NOT_SEEN_VALUE)
+    X_query_sparse = sparse_fingerprints_from_dense(X_query, C_NOT_SEEN_VALUE)
+    router_inverted_index = create_router_inverted_index(X_train_sparse)
+    num_shared_routers = ((X_query != C_NOT_SEEN_VALUE).astype(np.int64)
+                          @ (X_train != C_NOT_SEEN_VALUE).astype(np.int64).T)
+    for i in range(len(X_query)):
+        for min_shared_routers in (1, 2, 3):
+            candidates = candidate_train_rows(router_inverted_index, X_query_sparse.row(i)[0], min_shared_routers)
+            np.testing.assert_array_equal(candidates, np.nonzero(num_shared_routers[i] >= min_shared_routers)[0])
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from wifi_train_data_generator.splits import (time_window_groups, grouped_split_indexes, stratified_split_indexes,
+                                              split_indexes, k_fold_indexes)
+
+def synthetic_cases():
+    # 3 rooms of 40 scans, the scan index restarts in each room file.
+    Y = np.repeat(np.arange(3), 40)
+    scan_index = np.tile(np.arange(40), 3)
+    return (Y, scan_index)
+
+def assert_same_partition(groups, expected_groups):
+    # The group ints are arbitrary, only the partition of the cases matters.
+    pairs = np.unique(np.stack((groups, expected_groups), axis = 1), axis = 0)
+    assert len(pairs) == len(np.unique(groups)) == len(np.unique(expected_groups))
+
+def test_time_window_groups_of_scans_without_timestamps():
+    Y, scan_index = synthetic_cases()
+    groups = time_window_groups(Y, scan_index, 10)
+    assert_same_partition(groups, Y * 4 + scan_index // 10)
+    # The NaN timestamps of the .dat files fall back to the scan windows.
+    groups_nan = time_window_groups(Y, scan_index, 10, np.full(len(Y), np.nan), 60.0)
+    np.testing.assert_array_equal(groups_nan, groups)
+
+def test_time_window_groups_of_scans_with_timestamps():
+    Y, scan_index = synthetic_cases()
+    # A scan every 5 s, the windows of 60 s have 12 scans and not 10.
+    scan_time = 1699999980.0 + 5.0 * scan_index
+    groups = time_window_groups(Y, scan_index, 10, scan_time, 60.0)
+    assert_same_partition(groups, Y * 4 + scan_index // 12)
+
+    # The scans with and without timestamps are never in the same group.
+    scan_time[Y == 2] = np.nan
+    groups = time_window_groups(Y, scan_index, 10, scan_time, 60.0)
+    assert_same_partition(groups, np.where(Y == 2, 100 + scan_index // 10, Y * 4 + scan_index // 12))
+
+def test_grouped_split_keeps_groups_together():
+    Y, scan_index = synthetic_cases()
+    groups = time_window_groups(Y, scan_index, 10)
+    train_indexes, test_indexes = grouped_split_indexes(Y, groups, 75)
+    assert len(np.intersect1d(train_indexes, test_indexes)) == 0
+    assert len(train_indexes) + len(test_indexes) == len(Y)
+    assert len(np.intersect1d(groups[train_indexes], groups[test_indexes])) == 0
+    # Each room has 3 of its 4 windows in train.
+    np.testing.assert_array_equal(np.bincount(Y[train_indexes]), [30, 30, 30])
+
+def test_stratified_split_has_the_percentage_of_each_room():
+    Y, _ = synthetic_cases()
+    train_indexes, test_indexes = stratified_split_indexes(Y, 80)
+    np.testing.assert_array_equal(np.bincount(Y[train_indexes]), [32, 32, 32])
+    np.testing.assert_array_equal(np.sort(np.concatenate((train_indexes, test_indexes))), np.arange(len(Y)))
+    np.testing.assert_array_equal(split_indexes("stratified", Y, 80)[1], test_indexes)
+
+def test_split_indexes_errors():
+    Y, _ = synthetic_cases()
+    with pytest.raises(ValueError):
+        split_indexes("grouped", Y, 80)
+    with pytest.raises(ValueError):
+        split_indexes("random", Y, 80)
+
+def test_k_fold_each_case_is_tested_once():
+    Y, scan_index = synthetic_cases()
+    groups = time_window_groups(Y, scan_index, 5)
+    list_folds = k_fold_indexes(Y, 4, groups)
+    fold_of_case = np.full(len(Y), -1)
+    for fold, (train_indexes, test_indexes) in enumerate(list_folds):
+        assert np.all(fold_of_case[test_indexes] == -1)
+        fold_of_case[test_indexes] = fold
+        assert len(np.intersect1d(groups[train_indexes], groups[test_indexes])) == 0
+        # Stratified, each fold tests 2 of the 8 windows of each room.
+        np.testing.assert_array_equal(np.bincount(Y[test_indexes]), [10, 10, 10])
+    assert np.all(fold_of_case >= 0)
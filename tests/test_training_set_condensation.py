@@ -0,0 +1,42 @@
+import numpy as np
+
+from sparse_fingerprints import sparse_fingerprints_from_dense
+from training_set_condensation import cluster_medoid, room_medoids, condense_training_set
+
+C_NOT_SEEN_VALUE = 0
+
+def room_fingerprints(seed = 5):
+    rng = np.random.RandomState(seed)
+    X = rng.randint(30, 96, (80, 25)).astype(np.uint8)
+    X[rng.rand(80, 25) < 0.7] = C_NOT_SEEN_VALUE
+    return X
+
+def brute_force_distance(x, y):
+    shared = (x != C_NOT_SEEN_VALUE) & (y != C_NOT_SEEN_VALUE)
+    num_matches = np.count_nonzero(shared)
+    if num_matches == 0:
+        return 1.0e6    # C_NO_MATCH_DISTANCE.
+    sum_squares = np.sum((x[shared].astype(np.int64) - y[shared]) ** 2)
+    return np.sqrt(sum_squares / (num_matches * (num_matches + 0.25)))
+
+def test_cluster_medoid_in_blocks_is_the_full_matrix_one():
+    X = room_fingerprints()
+    distances = np.array([[brute_force_distance(x, y) for y in X] for x in X])
+    expected_medoid = int(np.argmin(distances.sum(axis = 1)))
+    for block_num_elements in (1, 7 * len(X), 1 << 22):
+        assert cluster_medoid(X, C_NOT_SEEN_VALUE, block_num_elements) == expected_medoid
+
+def test_room_medoids_dont_depend_on_the_blocks_or_the_layout():
+    X = room_fingerprints()
+    medoids = room_medoids(X, 6, C_NOT_SEEN_VALUE)
+    assert len(medoids) == 6 and len(np.unique(medoids)) == 6
+    np.testing.assert_array_equal(room_medoids(X, 6, C_NOT_SEEN_VALUE, block_num_elements = 50), medoids)
+    np.testing.assert_array_equal(room_medoids(sparse_fingerprints_from_dense(X, C_NOT_SEEN_VALUE), 6,
+                                               C_NOT_SEEN_VALUE), medoids)
+
+def test_condensation_keeps_the_budget_of_each_room():
+    X = room_fingerprints()
+    Y = np.repeat(np.arange(4), 20)
+    kept = condense_training_set(X, Y, 3, C_NOT_SEEN_VALUE)
+    np.testing.assert_array_equal(np.bincount(Y[kept]), [3, 3, 3, 3])
+    np.testing.assert_array_equal(kept, np.sort(kept))
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+
+from wifi_data_parser import format_scan_record, reads_file_to_memory
+from wifi_data_cache import save_data_file_to_cache, load_data_file_from_cache
+
+def write_json_lines_file(filename):
+    samples = [[(1, "router_a", -40), (2, "router_b", -55)],
+               [(1, "router_b", -60)],
+               [(1, "router_a", -40), (2, "router_b", -55)],     # Duplicate, not kept.
+               [(1, "router_c", -70), (2, "router_a", -45)]]
+    with open(filename, "w", encoding = "utf-8") as f:
+        for i, sample in enumerate(samples):
+            f.write(format_scan_record(sample, 1700000000.0 + 5.0 * i))
+
+def write_dat_file(filename):
+    with open(filename, "w", newline = "") as f:
+        for rssi in (-40, -50):
+            f.write("scan start\r\nscan done\r\n2 networks found\r\n"
+                    "1: router_a (%d)*\r\n2: router_b (-60)*\r\n\r\n" % rssi)
+
+def assert_same_data_file(data_file, data_file_cached):
+    assert data_file_cached[0] == data_file[0]
+    assert data_file_cached[2 : 4] == data_file[2 : 4]
+    scan_readings, scan_readings_cached = data_file[1], data_file_cached[1]
+    assert scan_readings_cached.router_names == scan_readings.router_names
+    for array_name in ("sample_offsets", "reading_num", "reading_router_index", "reading_signal", "sample_time"):
+        np.testing.assert_array_equal(getattr(scan_readings_cached, array_name), getattr(scan_readings, array_name))
+    assert list(scan_readings_cached) == list(scan_readings)
+
+def test_cache_round_trip_with_timestamps(tmp_path):
+    path = str(tmp_path) + os.sep
+    cache_path = str(tmp_path / "cache")
+    write_json_lines_file(path + "room_a_data.jsonl")
+    data_file = reads_file_to_memory(path, "room_a_data.jsonl", {})
+    np.testing.assert_array_equal(data_file[1].sample_time, [1700000000.0, 1700000005.0, 1700000015.0])
+    save_data_file_to_cache(cache_path, path, "room_a_data.jsonl", data_file)
+
+    data_file_cached, dict_router_vocabulary = load_data_file_from_cache(cache_path, path, "room_a_data.jsonl")
+    assert_same_data_file(data_file, data_file_cached)
+    assert dict_router_vocabulary == {"router_a": [2, {"room_a"}], "router_b": [2, {"room_a"}],
+                                      "router_c": [1, {"room_a"}]}
+
+def test_cache_round_trip_without_timestamps(tmp_path):
+    path = str(tmp_path) + os.sep
+    cache_path = str(tmp_path / "cache")
+    write_dat_file(path + "room_b_data.dat")
+    data_file = reads_file_to_memory(path, "room_b_data.dat", {})
+    assert np.isnan(data_file[1].sample_time).all()
+    save_data_file_to_cache(cache_path, path, "room_b_data.dat", data_file)
+    assert_same_data_file(data_file, load_data_file_from_cache(cache_path, path, "room_b_data.dat")[0])
+
+def test_cache_of_changed_file_is_not_used(tmp_path):
+    path = str(tmp_path) + os.sep
+    cache_path = str(tmp_path / "cache")
+    write_json_lines_file(path + "room_a_data.jsonl")
+    data_file = reads_file_to_memory(path, "room_a_data.jsonl", {})
+    save_data_file_to_cache(cache_path, path, "room_a_data.jsonl", data_file)
+
+    # The same content with a new mtime is still valid, the content hash is the same.
+    stat = os.stat(path + "room_a_data.jsonl")
+    os.utime(path + "room_a_data.jsonl", ns = (stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load_data_file_from_cache(cache_path, path, "room_a_data.jsonl") is not None
+
+    with open(path + "room_a_data.jsonl", "a", encoding = "utf-8") as f:
+        f.write(format_scan_record([(1, "router_d", -80)], 1700000020.0))
+    assert load_data_file_from_cache(cache_path, path, "room_a_data.jsonl") is None
+    assert load_data_file_from_cache(cache_path, path, "room_c_data.jsonl") is None
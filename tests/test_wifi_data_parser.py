@@ -0,0 +1,96 @@
+import io
+import os
+
+import pytest
+
+from wifi_data_parser import (parse_line_router_name_and_signal_strength, iter_samples, format_scan_record,
+                              read_all_files_to_memory)
+
+@pytest.mark.parametrize("line, expected", [
+    ("1: MEO-089449 (-53)*\r\n",         (1, "MEO-089449", -53)),
+    ("12: MEO-089449 (-53)\r\n",         (12, "MEO-089449", -53)),          # Without the trailing "*".
+    ("3: MEO-089449 (-53)*",              (3, "MEO-089449", -53)),          # Without the end of line.
+    ("2: Cafe: 051336 (-43)*\r\n",        (2, "Cafe: 051336", -43)),
+    ("4: My Home WiFi (-70)*\r\n",        (4, "My Home WiFi", -70)),
+    ("5: Guest (5 GHz) (-81)*\r\n",       (5, "Guest (5 GHz)", -81)),
+    ("6: a (b): c (d) (-90)*\r\n",        (6, "a (b): c (d)", -90)),
+    ("7: trailing space  (-60)*\r\n",     (7, "trailing space ", -60)),
+])
+def test_parse_line_of_router_names_with_special_characters(line, expected):
+    assert parse_line_router_name_and_signal_strength(line) == expected
+
+@pytest.mark.parametrize("line", [
+    "1: MEO-089449 -53*\r\n",            # Without " (".
+    "1: MEO-089449 (-53\r\n",            # Truncated, without ")".
+    "1: MEO-089449 (",                    # Truncated in the RSSI.
+    "1: MEO-089449 (strong)*\r\n",        # RSSI isn't an int.
+    "x: MEO-089449 (-53)*\r\n",           # Number isn't an int.
+    "MEO-089449: (-53)*\r\n",
+    "1:MEO-089449 (-53)*\r\n",            # Without ": ".
+])
+def test_parse_line_of_malformed_lines(line):
+    assert parse_line_router_name_and_signal_strength(line) is None
+
+def test_iter_samples_skips_malformed_lines_and_the_truncated_last_scan():
+    text = ("scan start\r\n"
+            "scan done\r\n"
+            "3 networks found\r\n"
+            "1: Guest (5 GHz) (-41)*\r\n"
+            "2: broken line (-4\r\n"
+            "3: Cafe: 051336 (-43)\r\n"
+            "\r\n"
+            "scan start\r\n"
+            "scan done\r\n"
+            "no networks found\r\n"
+            "\r\n"
+            "scan start\r\n"
+            "scan done\r\n"
+            "1 networks found\r\n"
+            "1: MEO-089449 (-53)*\r\n")
+    list_malformed_lines = []
+    samples = list(iter_samples(io.StringIO(text, newline = ""), list_malformed_lines))
+    assert samples == [[(1, "Guest (5 GHz)", -41), (3, "Cafe: 051336", -43)]]
+    assert list_malformed_lines == [(5, "2: broken line (-4\r\n")]
+    # The same from a stream of bytes, like the serial port.
+    assert list(iter_samples(io.BytesIO(text.encode("utf-8")))) == samples
+
+def write_room_files(path):
+    # The duplicate scans of room_b are also in room_a, one of them twice, and the routers in other order.
+    dict_room_samples = {
+        "room_a": [[(1, "r1", -40), (2, "r2", -50)],
+                   [(1, "r3", -60)]],
+        "room_b": [[(1, "r1", -40), (2, "r2", -50)],
+                   [(1, "r2", -50), (2, "r1", -40)],
+                   [(1, "r4", -70), (2, "r3", -61)],
+                   [(1, "r3", -60)]],
+        "room_c": [[(1, "r4", -70), (2, "r3", -61)],
+                   [(1, "r5", -80)],
+                   [(1, "r5", -80)]]}
+    for room, samples in dict_room_samples.items():
+        with open(os.path.join(path, room + "_data.jsonl"), "w", encoding = "utf-8") as f:
+            for i, sample in enumerate(samples):
+                f.write(format_scan_record(sample, 1700000000.0 + i))
+    return sorted(room + "_data.jsonl" for room in dict_room_samples)
+
+def read_with_dedupe(path, data_files, num_workers, cache_path = None):
+    dict_router_vocabulary = {}
+    data_files_in_memory = read_all_files_to_memory(path, data_files, dict_router_vocabulary, set(),
+                                                    num_workers, cache_path)
+    return ([(data_file[0], list(data_file[1]), data_file[1].sample_time.tolist(), data_file[2 : ])
+                 for data_file in data_files_in_memory],
+            dict_router_vocabulary)
+
+def test_dedupe_across_files_is_the_same_with_any_number_of_workers(tmp_path):
+    path = str(tmp_path) + os.sep
+    data_files = write_room_files(path)
+    serial_result = read_with_dedupe(path, data_files, 1)
+    list_counts = [counts for _, _, _, counts in serial_result[0]]
+    # [num_sample_lists, num_duplicate_sample_lists, num_duplicate_across_files] of each room.
+    assert list_counts == [[2, 0, 0], [1, 1, 2], [1, 1, 1]]
+    assert serial_result[0][1][1] == [[(1, "r4", -70), (2, "r3", -61)]]
+    assert serial_result[0][1][2] == [1700000002.0]
+    assert read_with_dedupe(path, data_files, 3) == serial_result
+    # The cache path merges the files like the parallel one.
+    cache_path = str(tmp_path / "cache")
+    assert read_with_dedupe(path, data_files, 1, cache_path) == serial_result
+    assert read_with_dedupe(path, data_files, 3, cache_path) == serial_result
@@ -0,0 +1,200 @@
+###############################################################################
+#                                                                             #
+# training_set_condensation.py                                                #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Condensation (prototype reduction) of the train dataset before #
+#              it is written to the .h file. The ESP32 only fits about 250    #
+#              train points and each query is a linear scan over all of them, #
+# so instead of the first train points of the shuffled data, each room keeps  #
+# a budget of representative fingerprints, the medoids of the clusters of its #
+# scans under the secret sauce distance of indoor_localization_KNN.py .       #
+# Optionally the train dataset is first edited (Wilson's edited nearest       #
+# neighbor), removing the scans that their own neighbors classify in another  #
+# room, those are noise at the borders between rooms.                         #
+# The train dataset is a NumPy matrix or a SparseFingerprints, the distances  #
+# of sparse_fingerprints.py are the same, so both keep the same scans.        #
+###############################################################################
+
+import numpy as np
+
+from indoor_localization_KNN import (masked_distance_matrix, masked_terms, k_smallest_sorted,
+                                     majority_vote, evaluate_all_dataset, C_DISTANCE_BLOCK_NUM_ELEMENTS)
+from sparse_fingerprints import SparseFingerprints, sparse_masked_distance_matrix, sparse_KNN_classifier
+
+# Distance used in the sums instead of the inf of the pairs without common routers.
+C_NO_MATCH_DISTANCE = 1.0e6
+C_MEDOIDS_NUM_ITERATIONS = 10
+
+def finite_distances(distances):
+    distances[np.isinf(distances)] = C_NO_MATCH_DISTANCE
+    return distances
+
+def train_masked_terms(X_train, not_seen_value):
+    # The masked_terms() of a dense X_train, None for a SparseFingerprints.
+    if isinstance(X_train, SparseFingerprints):
+        return None
+    return masked_terms(X_train, not_seen_value, False)
+
+def distance_matrix(X_query, X_train, not_seen_value, train_terms = None, flag_sqrt = True):
+    # The masked_distance_matrix() of NumPy matrices or of SparseFingerprints.
+    if isinstance(X_train, SparseFingerprints):
+        return sparse_masked_distance_matrix(X_query, X_train, flag_sqrt)
+    return masked_distance_matrix(X_query, X_train, not_seen_value, train_terms, flag_sqrt)
+
+def num_routers_seen(X, not_seen_value):
+    # The number of routers seen in each scan.
+    if isinstance(X, SparseFingerprints):
+        return np.diff(X.indptr)
+    return (X != not_seen_value).sum(axis = 1)
+
+def dataset_accuracy(X_train, Y_train, k, X_test, Y_test, not_seen_value, num_classes = None):
+    # The correct_pred_perc of evaluate_all_dataset(), also for SparseFingerprints.
+    if isinstance(X_train, SparseFingerprints):
+        Y_pred = sparse_KNN_classifier(X_train, Y_train, k, X_test, num_classes)
+        return (int(np.sum(Y_pred == np.asarray(Y_test))) / max(len(Y_test), 1)) * 100
+    _, _, correct_pred_perc = evaluate_all_dataset(X_train, Y_train, k, X_test, Y_test, not_seen_value,
+                                                   num_classes)
+    return correct_pred_perc
+
+def edit_training_set(X_train, Y_train, k, not_seen_value, num_classes = None,
+                      block_num_elements = C_DISTANCE_BLOCK_NUM_ELEMENTS):
+    """
+    Wilson's edited nearest neighbor, returns the indexes of the train
+    points that are correctly classified by the KNN of the other train
+    points (leave one out).
+    """
+    Y_train = np.asarray(Y_train)
+    if num_classes is None:
+        num_classes = int(Y_train.max()) + 1
+    num_train = len(X_train)
+    k = min(k, num_train - 1)
+    if k < 1:
+        return np.arange(num_train)
+    train_terms = train_masked_terms(X_train, not_seen_value)
+    block_size = max(1, block_num_elements // max(1, num_train))
+    Y_pred = np.empty(num_train, dtype = np.int32)
+    for begin in range(0, num_train, block_size):
+        end = min(begin + block_size, num_train)
+        distances = distance_matrix(X_train[begin : end], X_train, not_seen_value, train_terms,
+                                    flag_sqrt = False)
+        # A point isn't its own neighbor.
+        distances[np.arange(end - begin), np.arange(begin, end)] = np.inf
+        neighbors = k_smallest_sorted(distances, k)
+        Y_pred[begin : end] = majority_vote(Y_train[neighbors], num_classes)
+    return np.nonzero(Y_pred == Y_train)[0]
+
+def cluster_medoid(X_members, not_seen_value, block_num_elements = C_DISTANCE_BLOCK_NUM_ELEMENTS):
+    """
+    Returns the index in X_members of the scan with the smallest sum of
+    distances to the others, the first one for the ties. The distances are
+    computed in blocks of rows with a running argmin, so the memory doesn't
+    depend on the square of the number of members.
+    """
+    num_members = len(X_members)
+    train_terms = train_masked_terms(X_members, not_seen_value)
+    block_size = max(1, block_num_elements // max(1, num_members))
+    best_member = 0
+    best_sum = np.inf
+    for begin in range(0, num_members, block_size):
+        end = min(begin + block_size, num_members)
+        sums = finite_distances(distance_matrix(X_members[begin : end], X_members, not_seen_value,
+                                                train_terms)).sum(axis = 1)
+        block_best = int(np.argmin(sums))
+        if sums[block_best] < best_sum:
+            best_member = begin + block_best
+            best_sum = sums[block_best]
+    return best_member
+
+def room_medoids(X_room, budget, not_seen_value, num_iterations = C_MEDOIDS_NUM_ITERATIONS,
+                 block_num_elements = C_DISTANCE_BLOCK_NUM_ELEMENTS):
+    """
+    Returns the indexes in X_room of at most budget medoids of the scans of
+    one room. The first medoid is the scan with more routers seen, the
+    next ones are chosen farthest first, then it alternates between the
+    assignment of each scan to the nearest medoid and the choice of the
+    new medoid of each cluster, the scan with the smallest sum of
+    distances to the others of the cluster, see cluster_medoid(). Only the
+    distances to the medoids and blocks of rows of the distances inside
+    each cluster are computed, never the full matrix.
+    """
+    num_scans = len(X_room)
+    if num_scans <= budget:
+        return np.arange(num_scans)
+    train_terms = train_masked_terms(X_room, not_seen_value)
+
+    def distances_to(indexes):
+        # Matrix (len(indexes), num_scans).
+        return finite_distances(distance_matrix(X_room[indexes], X_room, not_seen_value, train_terms))
+
+    medoids = [int(np.argmax(num_routers_seen(X_room, not_seen_value)))]
+    min_distance = distances_to(medoids)[0]
+    distance_to_medoids = [min_distance.copy()]
+    for _ in range(1, budget):
+        new_medoid = int(np.argmax(min_distance))
+        if min_distance[new_medoid] <= 0.0:
+            break   # All the other scans are equal to a medoid.
+        medoids.append(new_medoid)
+        distance = distances_to([new_medoid])[0]
+        distance_to_medoids.append(distance)
+        np.minimum(min_distance, distance, out = min_distance)
+    distance_to_medoids = np.vstack(distance_to_medoids)
+
+    medoids = np.array(medoids)
+    for _ in range(num_iterations):
+        assignment = np.argmin(distance_to_medoids, axis = 0)
+        new_medoids = medoids.copy()
+        for cluster in range(len(medoids)):
+            members = np.nonzero(assignment == cluster)[0]
+            if len(members) == 0:
+                continue
+            new_medoids[cluster] = members[cluster_medoid(X_room[members], not_seen_value, block_num_elements)]
+        if np.array_equal(new_medoids, medoids):
+            break
+        changed = np.nonzero(new_medoids != medoids)[0]
+        distance_to_medoids[changed] = distances_to(new_medoids[changed])
+        medoids = new_medoids
+    return np.sort(medoids)
+
+def condense_training_set(X_train, Y_train, budget_per_room, not_seen_value, k = 5,
+                          flag_edit = False, num_classes = None):
+    """
+    Returns the sorted indexes of the train points that are kept, at most
+    budget_per_room medoids of each room (Y target). With flag_edit the
+    train dataset is first edited with edit_training_set(), unless that
+    would remove all the scans of a room.
+    """
+    Y_train = np.asarray(Y_train)
+    candidates = np.arange(len(Y_train))
+    if flag_edit:
+        edited = edit_training_set(X_train, Y_train, k, not_seen_value, num_classes)
+        if set(np.unique(Y_train[edited]).tolist()) == set(np.unique(Y_train).tolist()):
+            candidates = edited
+    list_kept = []
+    for y_value in np.unique(Y_train[candidates]):
+        room_indexes = candidates[Y_train[candidates] == y_value]
+        medoids = room_medoids(X_train[room_indexes], budget_per_room, not_seen_value)
+        list_kept.append(room_indexes[medoids])
+    return np.sort(np.concatenate(list_kept))
+
+def condense_and_report(X_train, Y_train, X_test, Y_test, budget_per_room, not_seen_value, k = 5,
+                        flag_edit = False, num_classes = None):
+    """
+    Condenses the train dataset and prints the accuracy on the test dataset
+    of the KNN with the full and with the condensed train dataset.
+    Returns the tuple (X_train_condensed, Y_train_condensed).
+    """
+    kept = condense_training_set(X_train, Y_train, budget_per_room, not_seen_value, k, flag_edit,
+                                 num_classes)
+    X_train_condensed = X_train[kept]
+    Y_train_condensed = Y_train[kept]
+    full_perc = dataset_accuracy(X_train, Y_train, k, X_test, Y_test, not_seen_value, num_classes)
+    condensed_perc = dataset_accuracy(X_train_condensed, Y_train_condensed, k, X_test, Y_test, not_seen_value,
+                                   num_classes)
+    print("condensed train cases: ", len(Y_train), " -> ", len(Y_train_condensed),
+          " test accuracy: %.2f %% -> %.2f %%" % (full_perc, condensed_perc))
+    return (X_train_condensed, Y_train_condensed)
@@ -0,0 +1,123 @@
+###############################################################################
+#                                                                             #
+# wifi_data_cache.py                                                          #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: On disk cache of the parsed data files, used by                #
+#              read_all_files_to_memory() of wifi_data_parser.py .            #
+# Each data file is saved after being parsed in a binary columnar .npz file   #
+# in the cache directory, with the router names of the file and the flat      #
+# arrays of the readings and of the timestamps of all the scans. The cache    #
+# entry is valid while the data file has the same mtime and size, or if those #
+# changed, while it has the same content hash (SHA1). So only the new or      #
+# modified data files are parsed again.                                       #
+# The cache is opt-in and its directory is outside the data files, the name   #
+# of an entry has the SHA1 of the absolute path of the data file, so one      #
+# cache directory is shared by all the datasets, the building and floor       #
+# shards and the parallel jobs, the files with the same name in different     #
+# directories have different entries.                                         #
+###############################################################################
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from wifi_data_parser import ScanReadings, scan_readings_router_vocabulary
+
+C_CACHE_VERSION = 2
+C_CACHE_FILE_SUFIX = '.npz'
+
+def file_content_hash(filename):
+    sha1 = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def cache_filename(cache_path, path, file):
+    # "room_A_data.dat.<SHA1 of the absolute path>.npz", flat in the cache directory.
+    path_hash = hashlib.sha1(os.path.abspath(path + file).encode("utf-8")).hexdigest()[ : 16]
+    return os.path.join(cache_path, "%s.%s%s" % (os.path.basename(file), path_hash, C_CACHE_FILE_SUFIX))
+
+def save_data_file_to_cache(cache_path, path, file, data_file, content_hash = None):
+    """
+    Saves the result of reads_file_to_memory(), without duplicates across
+    files, in the cache. The arrays are the ones of its ScanReadings:
+        router_names    - The unique router names of the file.
+        sample_offsets  - The readings of sample i are [offsets[i], offsets[i+1]).
+        reading_num, reading_router_index, reading_signal - One entry per reading.
+        sample_time     - The timestamp of each sample, NaN without it.
+    """
+    data_filename = path + file
+    stat = os.stat(data_filename)
+    if content_hash is None:
+        content_hash = file_content_hash(data_filename)
+    scan_readings = data_file[1]
+
+    filename = cache_filename(cache_path, path, file)
+    os.makedirs(cache_path, exist_ok = True)
+    # A temporary file with a unique name, the parallel jobs of the same dataset don't
+    # share it, and os.replace() is atomic, a reader sees the old or the new entry.
+    fd, filename_tmp = tempfile.mkstemp(prefix = os.path.basename(filename) + ".", suffix = ".tmp",
+                                        dir = os.path.dirname(filename))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f,
+                     version              = np.array(C_CACHE_VERSION),
+                     id                   = np.array(data_file[0]),
+                     mtime_ns             = np.array(stat.st_mtime_ns, dtype = np.int64),
+                     size                 = np.array(stat.st_size, dtype = np.int64),
+                     content_hash         = np.array(content_hash),
+                     num_duplicates       = np.array(data_file[3], dtype = np.int64),
+                     router_names         = np.array(scan_readings.router_names, dtype = str),
+                     sample_offsets       = scan_readings.sample_offsets,
+                     reading_num          = scan_readings.reading_num,
+                     reading_router_index = scan_readings.reading_router_index,
+                     reading_signal       = scan_readings.reading_signal,
+                     sample_time          = scan_readings.sample_time)
+        os.replace(filename_tmp, filename)
+    except BaseException:
+        if os.path.exists(filename_tmp):
+            os.remove(filename_tmp)
+        raise
+
+def load_data_file_from_cache(cache_path, path, file):
+    """
+    Returns the tuple (data_file, dict_file_router_vocabulary) in the same
+    format of reads_file_to_memory() or None if there isn't a valid cache
+    entry for the file. The ScanReadings of data_file has the arrays of the
+    cache file, without any Python loop over the scans or the readings.
+    """
+    filename = cache_filename(cache_path, path, file)
+    if not os.path.isfile(filename):
+        return None
+    data_filename = path + file
+    stat = os.stat(data_filename)
+    with np.load(filename, allow_pickle = False) as cache:
+        if int(cache["version"]) != C_CACHE_VERSION:
+            return None
+        flag_same_stat = (int(cache["mtime_ns"]) == stat.st_mtime_ns and
+                          int(cache["size"]) == stat.st_size)
+        if not flag_same_stat:
+            # The file was touched or copied, only the content tells if it changed.
+            content_hash = file_content_hash(data_filename)
+            if str(cache["content_hash"]) != content_hash:
+                return None
+        id = str(cache["id"])
+        num_duplicate_sample_lists = int(cache["num_duplicates"])
+        scan_readings = ScanReadings(cache["router_names"].tolist(), cache["sample_offsets"],
+                                     cache["reading_num"], cache["reading_router_index"],
+                                     cache["reading_signal"], cache["sample_time"])
+
+    data_file = [id, scan_readings, len(scan_readings), num_duplicate_sample_lists, 0]
+    if not flag_same_stat:
+        # Refresh the mtime and size of the entry so the next run doesn't hash the file.
+        save_data_file_to_cache(cache_path, path, file, data_file, content_hash)
+    # The frequency of a router in the vocabulary is its number of readings.
+    return (data_file, scan_readings_router_vocabulary(id, scan_readings))
@@ -0,0 +1,425 @@
+###############################################################################
+#                                                                             #
+# wifi_data_parser.py                                                         #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Parser of the data files collected from the ESP32 running the  #
+#              WiFiScan program, shared by the two programs that generate    #
+#              the .h files, proc_data_f_gen_train_test_code.py and          #
+#              proc_data_f_gen_train_test_code_arduino.py .                  #
+# The data files are read line by line as a stream, one scan (sample) at a    #
+# time, so the memory used while parsing doesn't depend on the size of the    #
+# file. Each scan is a block of lines "N: SSID (RSSI)*" separated by a line   #
+# without ":" (empty line, "scan start", "scan done", "N networks found").    #
+# The collector can also save the scans already parsed in the JSON lines      #
+# format, files "_data.jsonl", one scan by line:                              #
+#     {"t": unix_time, "routers": [["SSID", RSSI], ...]}                      #
+# those are loaded without the parsing of the text lines.                     #
+# The scans of a file are kept in flat arrays (ScanReadings), one entry for   #
+# each reading, without a Python tuple for each one, so the cache of          #
+# wifi_data_cache.py loads them without any Python loop over the readings.    #
+###############################################################################
+
+import json
+import math
+import sys
+
+import numpy as np
+
+C_FILE_SUFIX = '_data.dat'
+C_JSON_LINES_FILE_SUFIX = '_data.jsonl'
+
+def parse_line_router_name_and_signal_strength(line):
+    """
+    Parses the line "N: SSID (RSSI)*" in a single pass from the right, the
+    RSSI is always the last " (...)" of the line, so SSID's with "(", ")"
+    or ":" are parsed correctly.
+    Returns the tuple (num_router_in_sample, router_name, signal_strength)
+    or None if the line is malformed.
+    """
+    head, _, tail = line.rpartition(" (")
+    num_router_in_sample, _, router_name = head.partition(": ")
+    pos_end = tail.find(")")
+    if pos_end < 0:
+        return None
+    try:
+        return (int(num_router_in_sample), router_name, int(tail[ : pos_end]))
+    except ValueError:
+        return None
+
+def iter_samples(f, list_malformed_lines = None):
+    """
+    Generator that yields one scan at a time from a file handle, or any
+    iterable of lines, in text or in bytes (ex: a file opened with "rb" or
+    a serial port stream). Each scan is a list of tuples
+    (num_router_in_sample, router_name, signal_strength). The router names
+    are interned, so all the samples share the same string objects.
+    A incomplete scan at the end of the stream isn't yielded.
+    The malformed router lines are skipped, if list_malformed_lines is
+    given the tuple (line_number, line) of each one is appended to it.
+    """
+    parse_line = parse_line_router_name_and_signal_strength
+    intern = sys.intern
+    flag_in_sample = False
+    sample = None
+    for line_number, line in enumerate(f, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors = "replace")
+        if (len(line) != 0) and (":" in line):
+            if flag_in_sample == False:
+                flag_in_sample = True
+                sample = []
+            res = parse_line(line)
+            if res is None:
+                if list_malformed_lines is not None:
+                    list_malformed_lines.append((line_number, line))
+                continue
+            sample.append((res[0], intern(res[1]), res[2]))
+        else:
+            if flag_in_sample == True:
+                flag_in_sample = False
+                if len(sample) != 0:
+                    yield sample
+                sample = None
+
+def parse_scan_block(text):
+    """
+    Parses the text of one scan as printed by WiFiScan, the lines between
+    two empty lines:
+        scan start
+        scan done
+        N networks found
+        1: SSID (RSSI)*
+        ...
+        N: SSID (RSSI)*
+    Returns the list of tuples (num_router_in_sample, router_name, signal_strength)
+    or None if the scan is incomplete (ex: the first and last scans of a 
+    capture), malformed or has no networks.
+    """
+    lines = text.splitlines()
+    num_networks = None
+    sample = []
+    for index, line in enumerate(lines):
+        if line.endswith(" networks found"):
+            try:
+                num_networks = int(line[ : -len(" networks found")])
+            except ValueError:
+                return None
+            for line in lines[index + 1 : ]:
+                res = parse_line_router_name_and_signal_strength(line)
+                if res is None or res[0] != len(sample) + 1:
+                    return None
+                sample.append((res[0], sys.intern(res[1]), res[2]))
+            break
+    if num_networks is None or num_networks == 0 or num_networks != len(sample):
+        return None
+    if "scan done" not in lines[ : index]:
+        return None
+    return sample
+
+def is_empty_scan_block(text):
+    # True for the text of a complete scan that didn't find networks, "scan done" and "no networks found".
+    lines = [line.strip() for line in text.splitlines() if line.strip() != ""]
+    return len(lines) >= 2 and lines[-2] == "scan done" and lines[-1] == "no networks found"
+
+def format_scan_record(sample, timestamp):
+    # One line of the JSON lines format, the num_router_in_sample is the position in the list.
+    return json.dumps({"t": round(timestamp, 3),
+                       "routers": [[router_name, signal_strength] for _, router_name, signal_strength in sample]},
+                      ensure_ascii = False, separators = (",", ":")) + "\n"
+
+def iter_samples_json_lines(f, list_malformed_lines = None, list_timestamps = None):
+    # Same as iter_samples() for a file in the JSON lines format, the "t" of
+    # each yielded scan is appended to list_timestamps, NaN if it doesn't have one.
+    intern = sys.intern
+    for line_number, line in enumerate(f, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors = "replace")
+        if len(line.strip()) == 0:
+            continue
+        try:
+            record = json.loads(line)
+            routers = record["routers"]
+            sample = [(num_router_in_sample, intern(router_name), int(signal_strength))
+                          for num_router_in_sample, (router_name, signal_strength) in enumerate(routers, 1)]
+        except (ValueError, KeyError, TypeError):
+            if list_malformed_lines is not None:
+                list_malformed_lines.append((line_number, line))
+            continue
+        if len(sample) != 0:
+            if list_timestamps is not None:
+                timestamp = record.get("t")
+                list_timestamps.append(float(timestamp) if isinstance(timestamp, (int, float)) else math.nan)
+            yield sample
+
+class ScanReadings:
+    """
+    The scans of a data file in flat arrays, like the CSR format:
+        router_names         - The unique router names of the file, in the
+                               order of their first reading.
+        sample_offsets       - The readings of scan i are
+                               [sample_offsets[i], sample_offsets[i+1]).
+        reading_num          - The num_router_in_sample of each reading.
+        reading_router_index - The index in router_names of each reading.
+        reading_signal       - The RSSI of each reading.
+        sample_time          - The timestamp in seconds of each scan, the "t"
+                               of the JSON lines format, NaN for the .dat
+                               files that don't have it.
+    len() is the number of scans and iterating gives each scan as the list
+    of tuples (num_router_in_sample, router_name, signal_strength).
+    """
+
+    def __init__(self, router_names, sample_offsets, reading_num, reading_router_index, reading_signal,
+                 sample_time = None):
+        self.router_names         = list(router_names)
+        self.sample_offsets       = np.asarray(sample_offsets, dtype = np.int64)
+        self.reading_num          = np.asarray(reading_num, dtype = np.int32)
+        self.reading_router_index = np.asarray(reading_router_index, dtype = np.int32)
+        self.reading_signal       = np.asarray(reading_signal, dtype = np.int32)
+        if sample_time is None:
+            sample_time = np.full(len(self.sample_offsets) - 1, np.nan)
+        self.sample_time          = np.asarray(sample_time, dtype = np.float64)
+
+    def __len__(self):
+        return len(self.sample_offsets) - 1
+
+    def __iter__(self):
+        router_names = self.router_names
+        readings = list(zip(self.reading_num.tolist(),
+                            [router_names[index] for index in self.reading_router_index.tolist()],
+                            self.reading_signal.tolist()))
+        offsets = self.sample_offsets.tolist()
+        for begin, end in zip(offsets[ : -1], offsets[1 : ]):
+            yield readings[begin : end]
+
+    def router_frequency(self):
+        # The number of readings of each router of router_names.
+        return np.bincount(self.reading_router_index, minlength = len(self.router_names))
+
+    def take(self, samples):
+        # Returns the ScanReadings of the scans in the given order, with the same router_names.
+        samples = np.asarray(samples, dtype = np.int64)
+        begins = self.sample_offsets[samples]
+        lengths = self.sample_offsets[samples + 1] - begins
+        sample_offsets = np.zeros(len(samples) + 1, dtype = np.int64)
+        np.cumsum(lengths, out = sample_offsets[1 : ])
+        positions = np.repeat(begins - sample_offsets[ : -1], lengths) + np.arange(sample_offsets[-1], dtype = np.int64)
+        return ScanReadings(self.router_names, sample_offsets, self.reading_num[positions],
+                            self.reading_router_index[positions], self.reading_signal[positions],
+                            self.sample_time[samples])
+
+def scan_readings_from_samples(samples, sample_time = None):
+    # Returns the ScanReadings of an iterable of scans, lists of tuples (num_router_in_sample, router_name, signal_strength).
+    map_router_name_to_index = {}
+    sample_offsets = [0]
+    reading_num = []
+    reading_router_index = []
+    reading_signal = []
+    for sample in samples:
+        for num_router_in_sample, router_name, signal_strength in sample:
+            reading_num.append(num_router_in_sample)
+            reading_router_index.append(map_router_name_to_index.setdefault(router_name,
+                                                                            len(map_router_name_to_index)))
+            reading_signal.append(signal_strength)
+        sample_offsets.append(len(reading_num))
+    return ScanReadings(map_router_name_to_index, sample_offsets, reading_num, reading_router_index, reading_signal,
+                        sample_time)
+
+def sample_dedup_key(sample):
+    # Canonical hashable key of a scan, the (router_name, signal_strength) pairs
+    # sorted so that the order in which the routers were listed doesn't matter.
+    return tuple(sorted((router_name, signal_strength) for _, router_name, signal_strength in sample))
+
+def file_id(file):
+    # The room name (classifier class name) is the filename without the sufix.
+    id = file
+    for sufix in (C_FILE_SUFIX, C_JSON_LINES_FILE_SUFIX):
+        if id.endswith(sufix):
+            id = id[ : -len(sufix)]
+            break
+    return id
+
+# The router vocabulary is a dict built incrementally while parsing:
+#     router_name -> [frequency, set of the rooms (id's) where it was seen]
+# the frequency is the number of readings of the router in the kept scans (without duplicates).
+def update_router_vocabulary(dict_router_vocabulary, id, sample):
+    for _, router_name, _ in sample:
+        entry = dict_router_vocabulary.get(router_name)
+        if entry is None:
+            dict_router_vocabulary[router_name] = [1, {id}]
+        else:
+            entry[0] += 1
+            entry[1].add(id)
+
+def create_router_vocabulary(id, sample_list):
+    dict_router_vocabulary = {}
+    for sample in sample_list:
+        update_router_vocabulary(dict_router_vocabulary, id, sample)
+    return dict_router_vocabulary
+
+def scan_readings_router_vocabulary(id, scan_readings):
+    # The router vocabulary of the ScanReadings of one file, the same of create_router_vocabulary().
+    return {router_name: [frequency, {id}]
+                for router_name, frequency in zip(scan_readings.router_names,
+                                                  scan_readings.router_frequency().tolist())
+                if frequency > 0}
+
+def merge_router_vocabulary(dict_router_vocabulary, dict_other_router_vocabulary):
+    for router_name, (frequency, set_rooms) in dict_other_router_vocabulary.items():
+        entry = dict_router_vocabulary.get(router_name)
+        if entry is None:
+            dict_router_vocabulary[router_name] = [frequency, set(set_rooms)]
+        else:
+            entry[0] += frequency
+            entry[1].update(set_rooms)
+
+def sorted_router_names(dict_router_vocabulary, min_frequency = 1, min_num_rooms = 1):
+    """
+    Returns the sorted list of the router names, without the rare routers 
+    that have less then min_frequency readings or are seen in less then 
+    min_num_rooms rooms. With the default values no router is pruned.
+    """
+    return sorted(router_name for router_name, (frequency, set_rooms) in dict_router_vocabulary.items()
+                      if frequency >= min_frequency and len(set_rooms) >= min_num_rooms)
+
+def  reads_file_to_memory(path, file, dict_router_vocabulary, set_seen_sample_keys = None):
+    """
+    Duplicated scans are detected with a set of sample_dedup_key(), so each
+    test is O(1). If set_seen_sample_keys is given, the same set is used
+    between calls to also remove the scans that are duplicates of scans of
+    the previous files, those are counted in num_duplicate_across_files.
+    The duplicates inside the file are removed first, then the ones across
+    files with kept_across_files(), the same of read_all_files_to_memory()
+    with any number of workers.
+    The routers of the kept scans are added to dict_router_vocabulary.
+    Returns the list [id, scan_readings, num_sample_lists,
+    num_duplicate_sample_lists, num_duplicate_across_files], the kept
+    scans are in the ScanReadings scan_readings, with the timestamps of
+    the scans of the JSON lines files.
+    """
+    id = file_id(file)
+    num_duplicate_sample_lists = 0
+    num_duplicate_across_files = 0
+    set_sample_keys = set()
+    list_malformed_lines = []
+    list_timestamps = None
+    if file.endswith(C_JSON_LINES_FILE_SUFIX):
+        f = open(path + file, "r", encoding = "utf-8")
+        list_timestamps = []
+        samples = iter_samples_json_lines(f, list_malformed_lines, list_timestamps)
+    else:
+        f = open(path + file, "r")
+        samples = iter_samples(f, list_malformed_lines)
+    list_kept = []
+    list_sample_keys = []
+
+    def kept_samples():
+        nonlocal num_duplicate_sample_lists
+        for index, sample in enumerate(samples):
+            key = sample_dedup_key(sample)
+            if key in set_sample_keys:
+                num_duplicate_sample_lists += 1
+                print("#################### duplicate case!")
+            else:
+                set_sample_keys.add(key)
+                list_sample_keys.append(key)
+                list_kept.append(index)
+                yield sample
+
+    with f:
+        scan_readings = scan_readings_from_samples(kept_samples())
+    if list_timestamps is not None:
+        scan_readings.sample_time = np.array(list_timestamps, dtype = np.float64)[list_kept]
+    for line_number, line in list_malformed_lines:
+        print("#################### malformed line ", file, ":", line_number, " ", repr(line))
+    if set_seen_sample_keys is not None:
+        list_kept_across_files = kept_across_files(list_sample_keys, set_seen_sample_keys)
+        num_duplicate_across_files = len(scan_readings) - len(list_kept_across_files)
+        if num_duplicate_across_files > 0:
+            scan_readings = scan_readings.take(list_kept_across_files)
+    merge_router_vocabulary(dict_router_vocabulary, scan_readings_router_vocabulary(id, scan_readings))
+    return [id, scan_readings, len(scan_readings), num_duplicate_sample_lists, num_duplicate_across_files]
+
+def _reads_file_to_memory_worker(path, file):
+    # Runs in a worker process, returns the parsed file and its local router vocabulary.
+    dict_file_router_vocabulary = {}
+    data_file = reads_file_to_memory(path, file, dict_file_router_vocabulary)
+    return (data_file, dict_file_router_vocabulary)
+
+def kept_across_files(list_sample_keys, set_seen_sample_keys):
+    """
+    The pass across files of the deduplication, list_sample_keys are the
+    sample_dedup_key() of the scans of one file, without the duplicates
+    inside the file. Returns the list of the indexes of the scans that
+    aren't in set_seen_sample_keys, the scans of the previous files, and
+    adds the keys of the file to it.
+    """
+    list_kept = []
+    for index, key in enumerate(list_sample_keys):
+        if key in set_seen_sample_keys:
+            print("#################### duplicate case across files!")
+        else:
+            list_kept.append(index)
+    set_seen_sample_keys.update(list_sample_keys)
+    return list_kept
+
+def remove_duplicates_across_files(data_file, set_seen_sample_keys):
+    # Same kept_across_files() that reads_file_to_memory() does with set_seen_sample_keys,
+    # for a file that was already parsed without it. Returns the number of removed scans.
+    list_kept = kept_across_files([sample_dedup_key(sample) for sample in data_file[1]], set_seen_sample_keys)
+    num_removed = len(data_file[1]) - len(list_kept)
+    if num_removed > 0:
+        data_file[1] = data_file[1].take(list_kept)
+    data_file[2] = len(list_kept)
+    data_file[4] += num_removed
+    return num_removed
+
+def read_all_files_to_memory(path, data_files, dict_router_vocabulary,
+                             set_seen_sample_keys = None, num_workers = 1, cache_path = None):
+    """
+    Calls reads_file_to_memory() for each file and returns the list of the
+    results in the order of data_files. With num_workers > 1 the files are
+    parsed in parallel by a pool of processes, each one returns its scans
+    and its local router vocabulary, that are merged in the order of
+    data_files in dict_router_vocabulary so that the result, and the
+    generated .h file, are the same as the ones of the serial run.
+    With a cache_path the files that didn't change since the last run are
+    loaded from the cache of wifi_data_cache.py, and only the new or
+    modified ones are parsed and saved to the cache.
+    """
+    if cache_path is None and (num_workers <= 1 or len(data_files) <= 1):
+        return [reads_file_to_memory(path, file, dict_router_vocabulary, set_seen_sample_keys)
+                    for file in data_files]
+
+    results = [None] * len(data_files)
+    if cache_path is not None:
+        from wifi_data_cache import load_data_file_from_cache, save_data_file_to_cache
+        results = [load_data_file_from_cache(cache_path, path, file) for file in data_files]
+    list_index_to_parse = [index for index, result in enumerate(results) if result is None]
+    files_to_parse = [data_files[index] for index in list_index_to_parse]
+
+    if num_workers <= 1 or len(files_to_parse) <= 1:
+        parsed_results = [_reads_file_to_memory_worker(path, file) for file in files_to_parse]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers = min(num_workers, len(files_to_parse))) as executor:
+            parsed_results = list(executor.map(_reads_file_to_memory_worker,
+                                               [path] * len(files_to_parse), files_to_parse))
+
+    for index, file, result in zip(list_index_to_parse, files_to_parse, parsed_results):
+        if cache_path is not None:
+            save_data_file_to_cache(cache_path, path, file, result[0])
+        results[index] = result
+
+    data_files_in_memory = []
+    for data_file, dict_file_router_vocabulary in results:
+        if set_seen_sample_keys is not None:
+            if remove_duplicates_across_files(data_file, set_seen_sample_keys) > 0:
+                dict_file_router_vocabulary = scan_readings_router_vocabulary(data_file[0], data_file[1])
+        merge_router_vocabulary(dict_router_vocabulary, dict_file_router_vocabulary)
+        data_files_in_memory.append(data_file)
+    return data_files_in_memory
@@ -0,0 +1,37 @@
+###############################################################################
+#                                                                             #
+# wifi_train_data_generator                                                   #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Generator of the train and test .h files of all the targets,   #
+#              one ingest and feature pipeline (pipeline.py) and pluggable    #
+# emitters (emitters.py), the PC vector, the Arduino std::vector, the compact #
+# flat arrays, the binary model blob (model_blob.py) and the cache of the     #
+# test x train distances (distance_cache.py). generate_targets() of           #
+# generator.py writes all the targets from a single parse of the files, and   #
+# generate_shards() of shards.py one model for each building or floor.        #
+###############################################################################
+
+from wifi_train_data_generator.pipeline import (C_NOT_SEEN_ROUTER_SIGNAL_VALUE, C_MIN_ROUTER_FREQUENCY,
+                                                C_MIN_ROUTER_NUM_ROOMS, C_PERCENTAGE_OF_TRAIN_CASES,
+                                                files, create_router_name_to_index_map,
+                                                collect_all_readings, create_all_samples_dataset,
+                                                create_all_samples_sparse_dataset, split_train_test,
+                                                split_train_test_arrays, read_dataset, check_condensation_budget,
+                                                split_dataset, limit_condensed_dataset, prepare_target_dataset)
+from wifi_train_data_generator.emitters import (DICT_EMITTERS, write_dot_H_file_for_C_plus_plus,
+                                                write_dot_H_file_compact)
+from wifi_train_data_generator.splits import (C_SPLIT_STRATEGIES, time_window_groups, split_indexes,
+                                              shuffled_split_indexes, stratified_split_indexes,
+                                              grouped_split_indexes, k_fold_indexes)
+from wifi_train_data_generator.model_blob import write_model_blob, read_model_blob
+from wifi_train_data_generator.distance_cache import (dataset_fingerprint, cached_distance_matrix,
+                                                      cached_KNN_classifier)
+from wifi_train_data_generator.instrumentation import stage, enable_instrumentation, write_instrumentation_json
+from wifi_train_data_generator.generator import C_ALL_TARGETS, generate_targets
+from wifi_train_data_generator.shards import (C_SHARD_LEVELS, find_shards, generate_shards, read_shard_selector,
+                                              select_shard)
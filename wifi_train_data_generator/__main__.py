@@ -0,0 +1,4 @@
+from wifi_train_data_generator.generator import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+###############################################################################
+#                                                                             #
+# wifi_train_data_generator/distance_cache.py                                 #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Cache of the secret sauce distances between the test and the  #
+#              train points, the "distances" target of the generator. The     #
+# distances of a train and test split never change, so they are computed      #
+# once, in blocks of test rows with the matrix products of                    #
+# indoor_localization_KNN.py, or of sparse_fingerprints.py for the            #
+# SparseFingerprints with the same values, and saved in a float32 .npy file   #
+# that is mapped in memory (mmap). The next evaluations, with any k, only     #
+# select the k smallest of each row.                                          #
+# The file name has the fingerprint of the dataset, the SHA-256 of the X      #
+# train and test arrays (densified as uint8 when they are SparseFingerprints, #
+# so both give the same cache) and the not seen value, so a cache of other    #
+# dataset is never used. The matrix has one row for each test point, with the #
+# squared distances (the same order) to all the train points, inf for the     #
+# pairs without any router seen by both.                                      #
+###############################################################################
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from indoor_localization_KNN import (masked_terms, masked_distance_matrix, k_smallest_sorted, majority_vote,
+                                     C_DISTANCE_BLOCK_NUM_ELEMENTS)
+from sparse_fingerprints import SparseFingerprints, dense_rows, sparse_masked_distance_matrix
+
+C_DISTANCE_CACHE_PATH = "distance_cache"
+C_DISTANCE_CACHE_VERSION = 1
+C_FINGERPRINT_CHUNK_NUM_ROWS = 1 << 14
+
+def check_same_layout(X_train, X_test):
+    # The X datasets are both NumPy matrices or both SparseFingerprints, raises TypeError if not.
+    if isinstance(X_train, SparseFingerprints) != isinstance(X_test, SparseFingerprints):
+        raise TypeError("the X train and test datasets have to be both NumPy matrices or both SparseFingerprints, "
+                        "not %s and %s" % (type(X_train).__name__, type(X_test).__name__))
+
+def dataset_fingerprint(X_train, X_test, not_seen_value):
+    # Returns the hex SHA-256 of the X train and test arrays, their shape and dtype and the not seen value.
+    check_same_layout(X_train, X_test)
+    fingerprint = hashlib.sha256()
+    fingerprint.update(("%d %d" % (C_DISTANCE_CACHE_VERSION, not_seen_value)).encode("ascii"))
+    for X in (X_train, X_test):
+        if isinstance(X, SparseFingerprints):
+            # The same fingerprint of the dense uint8 matrix.
+            x_dtype_str, x_shape = np.dtype(np.uint8).str, X.shape
+        else:
+            X = np.asarray(X)
+            x_dtype_str, x_shape = X.dtype.str, X.shape
+        fingerprint.update(("|%s %s" % (x_dtype_str, x_shape)).encode("ascii"))
+        for begin in range(0, len(X), C_FINGERPRINT_CHUNK_NUM_ROWS):
+            rows = dense_rows(X[begin : begin + C_FINGERPRINT_CHUNK_NUM_ROWS], not_seen_value)
+            fingerprint.update(np.ascontiguousarray(rows).tobytes())
+    return fingerprint.hexdigest()
+
+def distance_cache_filename(distance_cache_path, fingerprint):
+    return os.path.join(distance_cache_path, "distances_" + fingerprint[ : 32] + ".npy")
+
+def write_distance_cache(distance_cache_filename, X_train, X_test, not_seen_value,
+                         block_num_elements = C_DISTANCE_BLOCK_NUM_ELEMENTS):
+    """
+    Computes the float32 matrix (len(X_test), len(X_train)) of the squared
+    distances in blocks of test rows and writes it to the .npy file,
+    through a memory map so the full matrix is never in memory. The file
+    is written with a unique temporary name and renamed at the end, an
+    interrupted write doesn't leave a broken cache and the parallel jobs
+    don't race on the same temporary file. The X datasets are both NumPy
+    matrices or both SparseFingerprints, TypeError if not. Returns the size
+    bytes.
+    """
+    check_same_layout(X_train, X_test)
+    num_test = len(X_test)
+    num_train = len(X_train)
+    block_size = max(1, block_num_elements // max(1, num_train))
+    flag_sparse = isinstance(X_train, SparseFingerprints)
+    train_terms = None if flag_sparse else masked_terms(X_train, not_seen_value, False)
+    # A unique temporary name, the parallel jobs of the same dataset don't write the same file.
+    fd, temporary_filename = tempfile.mkstemp(prefix = os.path.basename(distance_cache_filename) + ".",
+                                              suffix = ".tmp", dir = os.path.dirname(distance_cache_filename))
+    os.close(fd)
+    try:
+        distances = np.lib.format.open_memmap(temporary_filename, mode = "w+", dtype = np.float32,
+                                              shape = (num_test, num_train))
+        for begin in range(0, num_test, block_size):
+            end = min(begin + block_size, num_test)
+            if flag_sparse:
+                distances[begin : end] = sparse_masked_distance_matrix(X_test[begin : end], X_train,
+                                                                       flag_sqrt = False)
+            else:
+                distances[begin : end] = masked_distance_matrix(X_test[begin : end], X_train, not_seen_value,
+                                                                train_terms, flag_sqrt = False)
+        distances.flush()
+        del distances
+        os.replace(temporary_filename, distance_cache_filename)
+    except BaseException:
+        if os.path.exists(temporary_filename):
+            os.remove(temporary_filename)
+        raise
+    return os.path.getsize(distance_cache_filename)
+
+def cached_distance_matrix(distance_cache_path, X_train, X_test, not_seen_value):
+    """
+    Returns the tuple (distances, flag_computed), distances is the read
+    only memory map of the cached matrix of the dataset, computed and
+    written first if it isn't in the distance_cache_path directory. The X
+    datasets are both NumPy matrices or both SparseFingerprints, TypeError
+    if not.
+    """
+    filename = distance_cache_filename(distance_cache_path,
+                                       dataset_fingerprint(X_train, X_test, not_seen_value))
+    flag_computed = not os.path.isfile(filename)
+    if flag_computed:
+        os.makedirs(distance_cache_path, exist_ok = True)
+        if not isinstance(X_test, SparseFingerprints):
+            X_test = np.asarray(X_test)
+        write_distance_cache(filename, X_train, X_test, not_seen_value)
+    distances = np.load(filename, mmap_mode = "r")
+    if distances.shape != (len(X_test), len(X_train)) or distances.dtype != np.float32:
+        raise ValueError("distance cache file doesn't match the dataset: " + filename)
+    return (distances, flag_computed)
+
+def cached_k_nearest_neighbors(distances, k, block_num_elements = C_DISTANCE_BLOCK_NUM_ELEMENTS):
+    # The k_nearest_neighbors() of indoor_localization_KNN.py from the cached distances, in blocks of rows.
+    num_test, num_train = distances.shape
+    k = min(k, num_train)
+    block_size = max(1, block_num_elements // max(1, num_train))
+    neighbors = np.empty((num_test, k), dtype = np.int64)
+    for begin in range(0, num_test, block_size):
+        end = min(begin + block_size, num_test)
+        neighbors[begin : end] = k_smallest_sorted(np.asarray(distances[begin : end]), k)
+    return neighbors
+
+def cached_KNN_classifier(distances, Y_train, k, num_classes = None):
+    # Returns the vector of the predicted Y target int of each test point, the same of KNN_classifier().
+    Y_train = np.asarray(Y_train)
+    if num_classes is None:
+        num_classes = int(Y_train.max()) + 1
+    if len(distances) == 0:
+        return np.empty(0, dtype = np.int32)
+    return majority_vote(Y_train[cached_k_nearest_neighbors(distances, k)], num_classes)
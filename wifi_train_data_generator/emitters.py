@@ -0,0 +1,578 @@
+###############################################################################
+#                                                                             #
+# wifi_train_data_generator/emitters.py                                       #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: The emitters of the .h file of each target, from the train     #
+#              and test datasets of the pipeline:                             #
+#     "pc"      - vector<vector<float>> with "using namespace std;", for the  #
+#                 5 - component of the project, the KNN on the PC.            #
+#     "arduino" - The same with std:: and without "using namespace std;",     #
+#                 for the 6 - component, the KNN on the ESP32.                #
+#     "compact" - Flat const uint8_t (int8_t) arrays in flash (PROGMEM) with  #
+#                 a row stride of C_NUM_FEATURES, for the ESP32.              #
+#     "blob"    - Not a .h file, the binary model file of model_blob.py,      #
+#                 loaded with mmap without compiling.                         #
+# The emitters are registered in DICT_EMITTERS, with the limits of the        #
+# dataset of the target. The vectors are streamed to the file in chunks of    #
+# rows, the .h file is never all in memory. The X datasets can be NumPy       #
+# matrices or SparseFingerprints, only the chunk of rows written is dense.    #
+###############################################################################
+
+import os
+
+import numpy as np
+
+from sparse_fingerprints import SparseFingerprints, dense_rows, sparse_fingerprints_from_dense
+from router_inverted_index import create_router_inverted_index, router_train_rows
+from wifi_train_data_generator.pipeline import C_NOT_SEEN_ROUTER_SIGNAL_VALUE
+from wifi_train_data_generator.model_blob import write_model_blob
+from wifi_train_data_generator.distance_cache import cached_distance_matrix
+from wifi_train_data_generator.instrumentation import stage
+
+# The vectors of the .h file are written in chunks of rows through a buffer.
+C_WRITE_CHUNK_NUM_ROWS = 1024
+C_WRITE_BUFFER_SIZE = 1 << 20
+C_WRITE_MAX_LOOKUP_VALUE = 1 << 16
+# Writes to the .h file the inverted index from each router feature_index to
+# the rows of vec_X_train that saw the router, to score only those candidates.
+C_WRITE_ROUTER_INVERTED_INDEX = False
+
+# The std_prefix of the C++ types is "" for the PC, that has "using namespace std;",
+# and "std::" for the Arduino.
+
+def write_header(dot_H_code_filename, std_prefix = ""):
+    """
+#pragma once
+
+
+#ifndef __HOME_TRAIN_DATA_H_
+#define __HOME_TRAIN_DATA_H_
+
+#include <string>
+#include <vector>
+#include <map>
+
+using namespace std;      [//using namespace std; for the Arduino]
+
+
+"""
+
+    filename = dot_H_code_filename.replace(".", "_")
+    filename = filename.upper()
+    filename = "__" + filename + "_"
+
+    first_str = """
+#pragma once
+
+
+#ifndef """
+
+    second_str = "#define "
+
+    third_str = """
+    
+#include <string>
+#include <vector>
+#include <map>
+
+%susing namespace std;
+
+""" % ("" if std_prefix == "" else "//")
+
+    d_header= "".join((first_str,
+                    filename,
+                    "\n",
+                    second_str,
+                    filename,
+                    "\n",
+                    third_str) )
+    return d_header
+
+def write_footer(dot_H_code_filename):
+    d_footer = "\n\n#endif\n"
+
+    return d_footer
+
+def write_target_table_vector(var_name, target_table_names_in_order, std_prefix = ""):
+    """
+// Lookup table of routers, Y int target to Y classifier Class name target.
+// Usage pattern "vec_target_table_Y[Y_int]"
+vector<string> vec_target_table_Y
+{
+    "router_name_0",
+    "router_name_1",
+    "router_name_3"
+};
+
+"""
+
+    list_str = []
+    str_0 = """
+// Lookup table of routers, Y int target to Y classifier Class name target.
+// Usage pattern "vec_target_table_Y[Y_int]"   
+%svector<%sstring> vec_target_table_Y 
+{
+""" % (std_prefix, std_prefix)
+    list_str.append(str_0)
+
+    num_elem = len(target_table_names_in_order)
+    elem_index = 0
+    for router_name in target_table_names_in_order:
+        str_tmp = None
+        if elem_index != (num_elem - 1):
+            str_tmp = "".join( ('    "', router_name, '",\n') )  # Comma
+        else:
+            str_tmp = "".join( ('    "', router_name, '"\n') )   # No comma
+        list_str.append( str_tmp)
+        elem_index += 1
+
+    str_1 = "};\n\n"
+    list_str.append(str_1)
+
+    d_target_table = "".join(list_str)
+    return d_target_table
+
+def write_router_name_hashtable(var_name, router_names_feature_correspond_list, std_prefix = ""):
+    """
+// HashTable -> X router_name (string) to feature_index (size_t).
+map<string,int> map_x_router_name_to_index
+{
+    {"router_name_0", 0},
+    {"router_name_1", 1},
+    {"router_name_2", 2}
+};
+
+"""
+
+    list_str = []
+    str_0 = """
+// HashTable -> X router_name (string) to feature_index (size_t).
+%smap<%sstring,int> map_x_router_name_to_index 
+{
+""" % (std_prefix, std_prefix)
+    list_str.append(str_0)
+
+    num_elem = len(router_names_feature_correspond_list)
+    elem_index = 0
+    for router_name, int_index in router_names_feature_correspond_list:
+        str_tmp = None
+
+        if elem_index != (num_elem - 1):
+            str_tmp = "".join( ('    {"', router_name, '", ', str(int_index), '},\n') )  # Comma
+        else:
+            str_tmp = "".join( ('    {"', router_name, '", ', str(int_index), '}\n') )   # No comma
+        list_str.append( str_tmp)
+        elem_index += 1
+
+    str_1 = "};\n\n"
+    list_str.append(str_1)
+
+    d_router_name_hashtable = "".join(list_str)
+    return d_router_name_hashtable
+
+def write_rows(f, list_row_strings, flag_first_chunk):
+    # Writes a chunk of rows of a vector, the rows are separated by a comma.
+    if len(list_row_strings) == 0:
+        return flag_first_chunk
+    if not flag_first_chunk:
+        f.write(",\n")    # Comma
+    f.write(",\n".join(list_row_strings))
+    return False
+
+def format_x_rows(X_rows, lookup_table = None, str_begin = "    {", str_end = "}"):
+    """
+    Formats all the rows of a chunk at once, "    {11,120,31,40}". With the
+    lookup_table of the str() of each value, the NumPy int matrix is
+    converted to strings with one indexing, without a str() for each value.
+    """
+    if lookup_table is not None:
+        list_rows = lookup_table[X_rows].tolist()
+    else:
+        if isinstance(X_rows, np.ndarray):
+            X_rows = X_rows.tolist()
+        list_rows = [map(str, x_case) for x_case in X_rows]
+    return ["".join((str_begin, ",".join(x_case), str_end)) for x_case in list_rows]
+
+def value_lookup_table(X_dataset):
+    # Lookup table of the str() of the values of a NumPy non negative int matrix, or None.
+    if isinstance(X_dataset, SparseFingerprints):
+        max_value = max(int(X_dataset.rssi.max()) if X_dataset.nnz != 0 else 0, C_NOT_SEEN_ROUTER_SIGNAL_VALUE)
+        return np.array([str(value) for value in range(max_value + 1)], dtype = object)
+    if (not isinstance(X_dataset, np.ndarray) or X_dataset.dtype.kind not in "ui" or X_dataset.size == 0
+        or X_dataset.min() < 0 or X_dataset.max() >= C_WRITE_MAX_LOOKUP_VALUE):
+        return None
+    return np.array([str(value) for value in range(int(X_dataset.max()) + 1)], dtype = object)
+
+def write_router_inverted_index(f, var_name, router_inverted_index, std_prefix = ""):
+    """
+// Inverted index -> X feature_index to the rows of vec_X_train that saw the router.
+// Usage pattern "vec_router_to_train_rows[feature_index]"
+vector<vector<int>> vec_router_to_train_rows
+{
+    {0,3,7},
+    {},
+    {1,2,3,8}
+};
+
+"""
+
+    str_0 = """
+// Inverted index -> X feature_index to the rows of vec_X_train that saw the router.
+// Usage pattern "%s[feature_index]"
+%svector<%svector<int>> %s
+{
+""" % (var_name, std_prefix, std_prefix, var_name)
+    f.write(str_0)
+
+    num_elem = len(router_inverted_index[0]) - 1
+    flag_first_chunk = True
+    for begin in range(0, num_elem, C_WRITE_CHUNK_NUM_ROWS):
+        end = min(begin + C_WRITE_CHUNK_NUM_ROWS, num_elem)
+        list_row_strings = ["".join(("    {", ",".join(map(str, router_train_rows(router_inverted_index,
+                                                                                    router_index).tolist())), "}"))
+                                for router_index in range(begin, end)]
+        flag_first_chunk = write_rows(f, list_row_strings, flag_first_chunk)
+    if not flag_first_chunk:
+        f.write("\n")    # No comma
+
+    str_1 = "};\n\n"
+    f.write(str_1)
+
+# Called for train and for test dataset's.
+def write_x_vector(f, var_name, X_dataset, std_prefix = ""):
+    """
+vector<vector<float>> vec_X_train [vec_X_test]
+{
+    {11,120,31,40,60,50,70},
+    {12,120,32,40,60,50,70},
+    {13,120,33,40,60,50,70},
+    //...
+    {14,120,34,40,60,50,70},
+    {15,120,35,40,60,50,70}
+};
+
+"""
+    # Streams the rows to the file f in chunks of C_WRITE_CHUNK_NUM_ROWS rows.
+
+    str_0 = "".join(("\n", std_prefix, "vector<", std_prefix, "vector<float>> ", var_name, "\n{\n"))
+    f.write(str_0)
+
+    lookup_table = value_lookup_table(X_dataset)
+    num_case = len(X_dataset)
+    flag_first_chunk = True
+    for begin in range(0, num_case, C_WRITE_CHUNK_NUM_ROWS):
+        X_rows = dense_rows(X_dataset[begin : begin + C_WRITE_CHUNK_NUM_ROWS], C_NOT_SEEN_ROUTER_SIGNAL_VALUE)
+        list_row_strings = format_x_rows(X_rows, lookup_table)
+        flag_first_chunk = write_rows(f, list_row_strings, flag_first_chunk)
+    if not flag_first_chunk:
+        f.write("\n")    # No comma
+
+    str_1 = "};\n\n"
+    f.write(str_1)
+
+# Called for train and for test dataset's.
+def write_y_vector(f, var_name, Y_dataset, std_prefix = ""):
+    """
+vector<int> vec_Y_train  [vec_Y_test]
+{
+    0,1,2,0,1,
+    //...
+    2,0,1,2
+};
+
+"""
+    # Streams the values to the file f in chunks of C_WRITE_CHUNK_NUM_ROWS values.
+
+    str_0 = "".join(("\n", std_prefix, "vector<int> ", var_name, "\n{\n"))
+    f.write(str_0)
+
+    num_elem = len(Y_dataset)
+    flag_first_chunk = True
+    for begin in range(0, num_elem, C_WRITE_CHUNK_NUM_ROWS):
+        Y_chunk = Y_dataset[begin : begin + C_WRITE_CHUNK_NUM_ROWS]
+        if isinstance(Y_chunk, np.ndarray):
+            Y_chunk = Y_chunk.tolist()
+        list_row_strings = ["".join(("    ", str(y_value))) for y_value in Y_chunk]
+        flag_first_chunk = write_rows(f, list_row_strings, flag_first_chunk)
+    if not flag_first_chunk:
+        f.write("\n")    # No comma
+
+    str_1 = "};\n\n"
+    f.write(str_1)
+
+def write_dot_H_file_for_C_plus_plus(dot_H_code_filename,
+                                     list_unique_router_names,
+                                     list_of_y_target,
+                                     X_train, Y_train, X_test, Y_test,
+                                     router_inverted_index = None,
+                                     std_prefix = ""):
+    # X and Y can be NumPy arrays or lists, each section is streamed to the
+    # file, the .h file is never all in memory.
+
+    # The include guard only has the name of the file, without the directory.
+    d_header = write_header(os.path.basename(dot_H_code_filename), std_prefix)
+
+    # Y int target to Y classifier Class name target.
+    target_table_names_in_order = list_unique_router_names
+    var_name = "vec_target_table_Y"
+    d_target_table = write_target_table_vector(var_name, target_table_names_in_order, std_prefix)
+
+    # HashTable -> X router_name (string) to feature_index (size_t).
+    router_names_feature_correspond_list = list_of_y_target
+    var_name = "map_x_router_name_to_index"
+    d_router_name_hashtable = write_router_name_hashtable(var_name, router_names_feature_correspond_list,
+                                                          std_prefix)
+
+    d_footer = write_footer(dot_H_code_filename)
+
+    # Write file to disc.
+    with open(dot_H_code_filename, "w", buffering = C_WRITE_BUFFER_SIZE) as f:
+        f.write(d_header)
+
+        f.write(d_target_table)
+        f.write(d_router_name_hashtable)
+
+        with stage("write_x_vector vec_X_train", len(X_train)):
+            write_x_vector(f, "vec_X_train", X_train, std_prefix)
+        with stage("write_y_vector vec_Y_train", len(Y_train)):
+            write_y_vector(f, "vec_Y_train", Y_train, std_prefix)
+        if router_inverted_index is not None:
+            # Inverted index -> X feature_index to the train rows that saw the router.
+            with stage("write_router_inverted_index", len(router_inverted_index[1])):
+                write_router_inverted_index(f, "vec_router_to_train_rows", router_inverted_index, std_prefix)
+        with stage("write_x_vector vec_X_test", len(X_test)):
+            write_x_vector(f, "vec_X_test", X_test, std_prefix)
+        with stage("write_y_vector vec_Y_test", len(Y_test)):
+            write_y_vector(f, "vec_Y_test", Y_test, std_prefix)
+
+        f.write(d_footer)
+
+def write_compact_header():
+    """
+#include <stdint.h>
+#include <pgmspace.h>
+
+#define HOME_TRAIN_DATA_COMPACT
+
+"""
+    return "\n#include <stdint.h>\n#include <pgmspace.h>\n\n#define HOME_TRAIN_DATA_COMPACT\n\n"
+
+def write_compact_dimensions(num_features, num_classes, num_train_rows, num_test_rows):
+    """
+// Dimensions of the compact flat arrays, the row stride is C_NUM_FEATURES.
+constexpr int C_NUM_FEATURES = 80;
+constexpr int C_NUM_CLASSES = 4;
+constexpr int C_X_TRAIN_NUM_ROWS = 1600;
+constexpr int C_X_TEST_NUM_ROWS = 400;
+
+"""
+    return "".join(("\n// Dimensions of the compact flat arrays, the row stride is C_NUM_FEATURES.\n",
+                    "constexpr int C_NUM_FEATURES = ", str(num_features), ";\n",
+                    "constexpr int C_NUM_CLASSES = ", str(num_classes), ";\n",
+                    "constexpr int C_X_TRAIN_NUM_ROWS = ", str(num_train_rows), ";\n",
+                    "constexpr int C_X_TEST_NUM_ROWS = ", str(num_test_rows), ";\n\n"))
+
+def compact_c_type(values):
+    # Returns the tuple (c_type, element_size) of the smallest C int type of the values.
+    values = np.asarray(values)
+    if values.size == 0 or (values.min() >= 0 and values.max() <= 255):
+        return ("uint8_t", 1)
+    if values.min() >= -128 and values.max() <= 127:
+        return ("int8_t", 1)
+    if values.min() >= 0 and values.max() <= 65535:
+        return ("uint16_t", 2)
+    raise ValueError("compact .h values out of the int8_t, uint8_t and uint16_t range")
+
+def x_values(X_dataset):
+    # The values of a X dataset, of a SparseFingerprints its readings and the not seen value of the other cells.
+    if isinstance(X_dataset, SparseFingerprints):
+        if X_dataset.nnz < len(X_dataset) * X_dataset.num_features:
+            return np.concatenate((X_dataset.rssi, [C_NOT_SEEN_ROUTER_SIGNAL_VALUE]))
+        return X_dataset.rssi
+    return np.asarray(X_dataset).ravel()
+
+def write_compact_accessors(x_c_type, y_c_type):
+    """
+// Accessors of the flat arrays in flash, the value of the feature_index of the
+// train row is X_TRAIN_AT(row, feature_index) and its Y target Y_TRAIN_AT(row).
+#define X_TRAIN_AT(row, feature_index) ((int) (uint8_t) pgm_read_byte(&vec_X_train_flat[(row) * C_NUM_FEATURES + (feature_index)]))
+#define Y_TRAIN_AT(row) ((int) (uint8_t) pgm_read_byte(&vec_Y_train_flat[(row)]))
+#define X_TEST_AT(row, feature_index) ((int) (uint8_t) pgm_read_byte(&vec_X_test_flat[(row) * C_NUM_FEATURES + (feature_index)]))
+#define Y_TEST_AT(row) ((int) (uint8_t) pgm_read_byte(&vec_Y_test_flat[(row)]))
+
+"""
+    dict_read_functions = {"uint8_t": "pgm_read_byte", "int8_t": "pgm_read_byte", "uint16_t": "pgm_read_word"}
+    list_lines = ["\n// Accessors of the flat arrays in flash, the value of the feature_index of the\n",
+                  "// train row is X_TRAIN_AT(row, feature_index) and its Y target Y_TRAIN_AT(row).\n"]
+    for macro_name, arguments, var_name, str_index, c_type in (
+            ("X_TRAIN_AT", "row, feature_index", "vec_X_train_flat", "(row) * C_NUM_FEATURES + (feature_index)",
+             x_c_type),
+            ("Y_TRAIN_AT", "row", "vec_Y_train_flat", "(row)", y_c_type),
+            ("X_TEST_AT", "row, feature_index", "vec_X_test_flat", "(row) * C_NUM_FEATURES + (feature_index)",
+             x_c_type),
+            ("Y_TEST_AT", "row", "vec_Y_test_flat", "(row)", y_c_type)):
+        list_lines.append("".join(("#define ", macro_name, "(", arguments, ") ((int) (", c_type, ") ",
+                                   dict_read_functions[c_type], "(&", var_name, "[", str_index, "]))\n")))
+    list_lines.append("\n")
+    return "".join(list_lines)
+
+def write_flat_array(f, var_name, c_type, str_dimension, str_index, X_dataset):
+    """
+// Usage pattern "vec_X_train_flat[row * C_NUM_FEATURES + feature_index]"
+const uint8_t vec_X_train_flat[C_X_TRAIN_NUM_ROWS * C_NUM_FEATURES] PROGMEM =
+{
+    11,0,31,40,60,50,70,
+    12,0,32,40,60,50,70,
+    //...
+    15,0,35,40,60,50,70
+};
+
+"""
+    # One row of X per line, streamed to the file f like write_x_vector().
+    # C++ doesn't have arrays of size 0, an empty dataset has one padding element.
+
+    if not isinstance(X_dataset, SparseFingerprints):
+        X_dataset = np.asarray(X_dataset)
+        if X_dataset.ndim == 1:
+            X_dataset = X_dataset.reshape(-1, 1)
+    if len(X_dataset) * X_dataset.shape[1] == 0:
+        f.write("".join(("\n// Empty dataset, ", str_dimension, " is 0, one padding element.\n",
+                         "const ", c_type, " ", var_name, "[1] PROGMEM = { 0 };\n\n")))
+        return
+
+    str_0 = "".join(("\n// Usage pattern \"", var_name, "[", str_index, "]\"\n",
+                     "const ", c_type, " ", var_name, "[", str_dimension, "] PROGMEM =\n{\n"))
+    f.write(str_0)
+    lookup_table = value_lookup_table(X_dataset)
+    num_case = len(X_dataset)
+    flag_first_chunk = True
+    for begin in range(0, num_case, C_WRITE_CHUNK_NUM_ROWS):
+        X_rows = dense_rows(X_dataset[begin : begin + C_WRITE_CHUNK_NUM_ROWS], C_NOT_SEEN_ROUTER_SIGNAL_VALUE)
+        list_row_strings = format_x_rows(X_rows, lookup_table, "    ", "")
+        flag_first_chunk = write_rows(f, list_row_strings, flag_first_chunk)
+    if not flag_first_chunk:
+        f.write("\n")    # No comma
+
+    str_1 = "};\n\n"
+    f.write(str_1)
+
+def write_dot_H_file_compact(dot_H_code_filename,
+                             list_unique_router_names,
+                             list_of_y_target,
+                             X_train, Y_train, X_test, Y_test):
+    """
+    Writes the compact .h file, the tables of names like the "vector" format
+    and the X and Y datasets as flat const arrays in flash. Returns the list
+    of tuples (section_name, size_bytes) of the data of each section.
+    """
+    num_features = len(list_unique_router_names)
+    num_classes  = len(list_of_y_target)
+    x_c_type, x_element_size = compact_c_type(np.concatenate((x_values(X_train), x_values(X_test))))
+    y_c_type, y_element_size = compact_c_type([0, num_classes - 1])
+
+    d_header = write_header(os.path.basename(dot_H_code_filename), "std::") + write_compact_header()
+    d_dimensions = write_compact_dimensions(num_features, num_classes, len(X_train), len(X_test))
+    d_target_table = write_target_table_vector("vec_target_table_Y", list_unique_router_names, "std::")
+    d_router_name_hashtable = write_router_name_hashtable("map_x_router_name_to_index", list_of_y_target,
+                                                          "std::")
+    d_footer = write_footer(dot_H_code_filename)
+
+    with open(dot_H_code_filename, "w", buffering = C_WRITE_BUFFER_SIZE) as f:
+        f.write(d_header)
+        f.write(d_dimensions)
+
+        f.write(d_target_table)
+        f.write(d_router_name_hashtable)
+
+        str_x_index = "row * C_NUM_FEATURES + feature_index"
+        for var_name, c_type, str_dimension, str_index, dataset in (
+                ("vec_X_train_flat", x_c_type, "C_X_TRAIN_NUM_ROWS * C_NUM_FEATURES", str_x_index, X_train),
+                ("vec_Y_train_flat", y_c_type, "C_X_TRAIN_NUM_ROWS", "row", Y_train),
+                ("vec_X_test_flat",  x_c_type, "C_X_TEST_NUM_ROWS * C_NUM_FEATURES", str_x_index, X_test),
+                ("vec_Y_test_flat",  y_c_type, "C_X_TEST_NUM_ROWS", "row", Y_test)):
+            with stage("write_flat_array " + var_name, len(dataset)):
+                write_flat_array(f, var_name, c_type, str_dimension, str_index, dataset)
+        f.write(write_compact_accessors(x_c_type, y_c_type))
+
+        f.write(d_footer)
+
+    # The names are char strings with the terminating 0.
+    return [("vec_target_table_Y", sum(len(name.encode()) + 1 for name in list_unique_router_names)),
+            ("map_x_router_name_to_index", sum(len(name.encode()) + 1 + 4 for name, _ in list_of_y_target)),
+            ("vec_X_train_flat", len(X_train) * num_features * x_element_size),
+            ("vec_Y_train_flat", len(Y_train) * y_element_size),
+            ("vec_X_test_flat",  len(X_test) * num_features * x_element_size),
+            ("vec_Y_test_flat",  len(Y_test) * y_element_size)]
+
+def print_section_sizes(list_section_sizes):
+    for section_name, size_bytes in list_section_sizes:
+        print("section: ", section_name, " bytes: ", size_bytes)
+    print("total bytes: ", sum(size_bytes for _, size_bytes in list_section_sizes))
+
+def train_router_inverted_index(X_train):
+    # Optional, inverted index -> X feature_index to the rows of vec_X_train that saw the router.
+    if not C_WRITE_ROUTER_INVERTED_INDEX:
+        return None
+    if not isinstance(X_train, SparseFingerprints):
+        X_train = sparse_fingerprints_from_dense(X_train, C_NOT_SEEN_ROUTER_SIGNAL_VALUE)
+    return create_router_inverted_index(X_train)
+
+def emit_PC_vector(dot_H_code_filename, list_unique_router_names, list_of_y_target,
+                   X_train, Y_train, X_test, Y_test):
+    write_dot_H_file_for_C_plus_plus(dot_H_code_filename, list_unique_router_names, list_of_y_target,
+                                     X_train, Y_train, X_test, Y_test,
+                                     train_router_inverted_index(X_train), "")
+
+def emit_arduino_vector(dot_H_code_filename, list_unique_router_names, list_of_y_target,
+                        X_train, Y_train, X_test, Y_test):
+    write_dot_H_file_for_C_plus_plus(dot_H_code_filename, list_unique_router_names, list_of_y_target,
+                                     X_train, Y_train, X_test, Y_test,
+                                     train_router_inverted_index(X_train), "std::")
+
+def emit_compact(dot_H_code_filename, list_unique_router_names, list_of_y_target,
+                 X_train, Y_train, X_test, Y_test):
+    print_section_sizes(write_dot_H_file_compact(dot_H_code_filename, list_unique_router_names,
+                                                 list_of_y_target, X_train, Y_train, X_test, Y_test))
+
+def emit_model_blob(model_blob_filename, list_unique_router_names, list_of_y_target,
+                    X_train, Y_train, X_test, Y_test):
+    print_section_sizes(write_model_blob(model_blob_filename, list_unique_router_names, list_of_y_target,
+                                         X_train, Y_train, X_test, Y_test, C_NOT_SEEN_ROUTER_SIGNAL_VALUE))
+
+def emit_distance_cache(distance_cache_path, list_unique_router_names, list_of_y_target,
+                        X_train, Y_train, X_test, Y_test):
+    # The filename of this target is the directory of the cache files.
+    distances, flag_computed = cached_distance_matrix(distance_cache_path, X_train, X_test,
+                                                      C_NOT_SEEN_ROUTER_SIGNAL_VALUE)
+    print("distance cache matrix: ", distances.shape, " computed: ", flag_computed, " bytes: ", distances.nbytes)
+
+# Each target has the emitter function, the default .h filename and the limits of its dataset:
+#     max_num_cases                   - Limit of cases before the split, ESP32 gives error with 323.
+#     condensation_max_num_test_cases - Limit of the test cases when the train dataset is condensed.
+DICT_EMITTERS = {
+    "pc":      {"emit": emit_PC_vector,
+                "dot_H_code_filename": "home_train_data.h",
+                "max_num_cases": None,
+                "condensation_max_num_test_cases": None},
+    "arduino": {"emit": emit_arduino_vector,
+                "dot_H_code_filename": os.path.join("Arduino_Indor_localizer", "home_train_data.h"),
+                "max_num_cases": 250,
+                "condensation_max_num_test_cases": 50},
+    "compact": {"emit": emit_compact,
+                "dot_H_code_filename": os.path.join("Arduino_Indor_localizer", "home_train_data_compact.h"),
+                "max_num_cases": None,
+                "condensation_max_num_test_cases": None},
+    "blob":    {"emit": emit_model_blob,
+                "dot_H_code_filename": "home_train_data.bin",
+                "max_num_cases": None,
+                "condensation_max_num_test_cases": None},
+    "distances": {"emit": emit_distance_cache,
+                  "dot_H_code_filename": "distance_cache",
+                  "max_num_cases": None,
+                  "condensation_max_num_test_cases": None},
+}
@@ -0,0 +1,187 @@
+###############################################################################
+#                                                                             #
+# wifi_train_data_generator/generator.py                                      #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Generates the .h files of one or more targets from a single    #
+#              parse of the data files.                                       #
+# To generate all the targets do in a terminal                                #
+#     "python -m wifi_train_data_generator"                                   #
+# The paths, the targets, the split, the seed, the condensation budget and    #
+# the number of workers are options of the command line, see                  #
+# "python -m wifi_train_data_generator --help",                               #
+# so several datasets can be generated in parallel jobs, for example:         #
+#     python -m wifi_train_data_generator --data-files-path ./building_A/     #
+#         --output-path ./out_A/ --targets pc blob --split grouped --seed 7   #
+# With "--shard-level building" or "floor" the data files path has the        #
+# directories building/floor/, see shards.py .                                #
+###############################################################################
+
+import argparse
+import os
+
+import numpy as np
+
+from wifi_train_data_generator.pipeline import (read_dataset, check_condensation_budget, prepare_target_dataset,
+                                                C_PERCENTAGE_OF_TRAIN_CASES,
+                                                C_SHUFFLE_SEED, C_SPLIT_STRATEGY, C_CONDENSATION_BUDGET_PER_ROOM)
+from wifi_train_data_generator.splits import C_SPLIT_STRATEGIES
+from wifi_train_data_generator.emitters import DICT_EMITTERS
+from wifi_train_data_generator.instrumentation import (stage, enable_instrumentation, print_instrumentation,
+                                                       write_instrumentation_json)
+
+C_DATA_FILES_PATH = ".//data_files//"
+C_ALL_TARGETS = ("pc", "arduino", "compact", "blob")
+# Also computes the cache of the test x train distances of the "distances" target.
+C_WRITE_DISTANCE_CACHE = False
+# Directory of the parse cache, for example ".//data_files_cache//", None doesn't cache.
+# One cache directory can be shared by all the datasets, the shards and the parallel jobs.
+C_DATA_FILES_CACHE_PATH = None
+# JSON file of the wall time, peak RSS and number of items of each stage, None doesn't instrument.
+C_INSTRUMENTATION_FILENAME = None
+
+def generate_targets(list_target_names, data_files_path = C_DATA_FILES_PATH, dict_dot_H_code_filenames = None,
+                     instrumentation_filename = None, percentage_of_train_cases = C_PERCENTAGE_OF_TRAIN_CASES,
+                     split_strategy = C_SPLIT_STRATEGY, seed = C_SHUFFLE_SEED, num_workers = 1,
+                     data_files_cache_path = C_DATA_FILES_CACHE_PATH, data_files = None,
+                     condensation_budget_per_room = C_CONDENSATION_BUDGET_PER_ROOM, dedupe_across_files = False):
+    """
+    Reads the data files once and writes the .h file of each target of
+    DICT_EMITTERS, to the default filename of the target or the one in
+    dict_dot_H_code_filenames. The targets with the same limits share the
+    same split, with condensation_budget_per_room all the targets share the
+    same split and condensed train dataset and only the test dataset is
+    limited for each target, a ValueError is raised before the split if
+    the budget doesn't fit in the max number of cases of a target. With an
+    instrumentation_filename the
+    stages are instrumented and the records written to that JSON file.
+    seed is the seed of the shuffle and of the split, num_workers the
+    number of processes that parse the files, 1 parses them serially
+    without starting a process pool.
+    data_files are the data files relative to data_files_path, None are
+    all the files of the directory. data_files_cache_path is the directory
+    of the parse cache, None doesn't cache. With dedupe_across_files the
+    scans repeated in the files of different rooms are also removed, only
+    the first one is kept.
+    Returns the dict with the "router_names", the "class_names", the
+    "num_scans" and the "router_num_scans", the number of scans that saw
+    each router, of the dataset, for the shard selector.
+    """
+    if instrumentation_filename is not None:
+        enable_instrumentation()
+    if dict_dot_H_code_filenames is None:
+        dict_dot_H_code_filenames = {}
+    list_unique_router_names, list_of_y_target, X_all, Y_all, scan_index_all, scan_time_all = read_dataset(
+        data_files_path, flag_dedupe_across_files = dedupe_across_files, num_workers = num_workers, data_files_cache_path = data_files_cache_path,
+        flag_scan_index = True, shuffle_seed = seed, data_files = data_files)
+
+    for target_name in list_target_names:
+        check_condensation_budget(len(list_of_y_target), DICT_EMITTERS[target_name]["max_num_cases"],
+                                  condensation_budget_per_room)
+
+    # The split of each max number of cases, only one when the train dataset is condensed.
+    dict_split_datasets = {}
+    for target_name in list_target_names:
+        emitter = DICT_EMITTERS[target_name]
+        dot_H_code_filename = dict_dot_H_code_filenames.get(target_name, emitter["dot_H_code_filename"])
+        print("target: ", target_name, " file: ", dot_H_code_filename)
+        X_train, Y_train, X_test, Y_test = prepare_target_dataset(
+            X_all, Y_all, len(list_of_y_target), emitter["max_num_cases"], percentage_of_train_cases,
+            condensation_budget_per_room, emitter["condensation_max_num_test_cases"],
+            scan_index_all = scan_index_all, split_strategy = split_strategy, split_seed = seed,
+            scan_time_all = scan_time_all, dict_split_datasets = dict_split_datasets)
+
+        dot_H_code_dirname = os.path.dirname(dot_H_code_filename)
+        if dot_H_code_dirname != "":
+            os.makedirs(dot_H_code_dirname, exist_ok = True)
+        with stage("emit " + target_name, len(X_train) + len(X_test)):
+            emitter["emit"](dot_H_code_filename, list_unique_router_names, list_of_y_target,
+                            X_train, Y_train, X_test, Y_test)
+
+    if instrumentation_filename is not None:
+        print_instrumentation()
+        write_instrumentation_json(instrumentation_filename)
+        enable_instrumentation(False)
+        print("instrumentation: ", instrumentation_filename)
+    return {"router_names":     list_unique_router_names,
+            "class_names":      [target_name for target_name, _ in list_of_y_target],
+            "num_scans":        len(Y_all),
+            "router_num_scans": np.bincount(X_all.indices, minlength = len(list_unique_router_names)).tolist()}
+
+def parse_arguments(argv = None, list_default_targets = None, dict_default_filenames = None):
+    """
+    Parses the command line arguments argv (None is sys.argv) and returns
+    the argparse namespace, with dict_dot_H_code_filenames, the filename of
+    each target: the one of "--output TARGET=FILENAME", or the default of
+    the target (dict_default_filenames or DICT_EMITTERS) in "--output-path".
+    """
+    if list_default_targets is None:
+        list_default_targets = C_ALL_TARGETS + (("distances", ) if C_WRITE_DISTANCE_CACHE else ())
+    if dict_default_filenames is None:
+        dict_default_filenames = {}
+    parser = argparse.ArgumentParser(description = "Generates the train and test .h files of the KNN targets.")
+    parser.add_argument("--data-files-path", default = C_DATA_FILES_PATH, help = "directory of the room data files")
+    parser.add_argument("--data-files-cache-path", default = C_DATA_FILES_CACHE_PATH,
+                        help = "directory of the parse cache, by default the parsed files aren't cached")
+    parser.add_argument("--targets", nargs = "+", choices = list(DICT_EMITTERS), default = list(list_default_targets))
+    parser.add_argument("--output", action = "append", default = [], metavar = "TARGET=FILENAME",
+                        help = "filename of a target, can be repeated")
+    parser.add_argument("--output-path", default = "", help = "directory of the default filenames of the targets")
+    parser.add_argument("--percentage-train", type = float, default = C_PERCENTAGE_OF_TRAIN_CASES)
+    parser.add_argument("--split", choices = C_SPLIT_STRATEGIES, default = C_SPLIT_STRATEGY)
+    parser.add_argument("--seed", type = int, default = C_SHUFFLE_SEED, help = "seed of the shuffle and of the split")
+    parser.add_argument("--condensation-budget", type = int, default = C_CONDENSATION_BUDGET_PER_ROOM,
+                        metavar = "SCANS_PER_ROOM",
+                        help = "condenses the train dataset to this number of medoids of each room, "
+                               "by default it isn't condensed")
+    parser.add_argument("--dedupe-across-files", action = "store_true",
+                        help = "also removes the scans repeated in the files of different rooms")
+    parser.add_argument("--workers", type = int, default = 1,
+                        help = "processes of the parse, 1 by default that parses serially without a process pool")
+    parser.add_argument("--instrumentation", default = C_INSTRUMENTATION_FILENAME, metavar = "JSON_FILENAME",
+                        help = "records the time and memory of each stage in the JSON file")
+    parser.add_argument("--shard-level", choices = ("building", "floor"), default = None,
+                        help = "one model for each building or floor directory of the data files path")
+    args = parser.parse_args(argv)
+    if args.condensation_budget is not None and args.condensation_budget < 1:
+        parser.error("--condensation-budget has to be at least 1 scan per room")
+
+    args.dict_dot_H_code_filenames = {target_name: os.path.join(args.output_path, dict_default_filenames.get(
+                                          target_name, DICT_EMITTERS[target_name]["dot_H_code_filename"]))
+                                      for target_name in args.targets}
+    # The filenames of the shards are relative to the directory of each shard.
+    args.dict_shard_filenames = {target_name: dict_default_filenames[target_name]
+                                     for target_name in args.targets if target_name in dict_default_filenames}
+    for output in args.output:
+        target_name, separator, filename = output.partition("=")
+        if separator == "" or target_name not in DICT_EMITTERS or filename == "":
+            parser.error("--output has to be TARGET=FILENAME with a target of: " + ", ".join(DICT_EMITTERS))
+        args.dict_dot_H_code_filenames[target_name] = filename
+        args.dict_shard_filenames[target_name] = filename
+    return args
+
+def main(argv = None, list_default_targets = None, dict_default_filenames = None):
+    args = parse_arguments(argv, list_default_targets, dict_default_filenames)
+    if args.shard_level is not None:
+        from wifi_train_data_generator.shards import generate_shards
+
+        generate_shards(args.data_files_path, args.shard_level, args.targets, args.output_path,
+                        args.dict_shard_filenames, args.instrumentation,
+                        percentage_of_train_cases = args.percentage_train, split_strategy = args.split,
+                        seed = args.seed, num_workers = args.workers,
+                        data_files_cache_path = args.data_files_cache_path,
+                        condensation_budget_per_room = args.condensation_budget,
+                        dedupe_across_files = args.dedupe_across_files)
+    else:
+        generate_targets(args.targets, args.data_files_path, args.dict_dot_H_code_filenames,
+                         instrumentation_filename = args.instrumentation,
+                         percentage_of_train_cases = args.percentage_train, split_strategy = args.split,
+                         seed = args.seed, num_workers = args.workers,
+                         data_files_cache_path = args.data_files_cache_path,
+                         condensation_budget_per_room = args.condensation_budget,
+                         dedupe_across_files = args.dedupe_across_files)
+    print("...end\n")
@@ -0,0 +1,94 @@
+###############################################################################
+#                                                                             #
+# wifi_train_data_generator/instrumentation.py                                #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Optional instrumentation of the stages of the generator, the   #
+#              wall time, the peak RSS (resident memory) and the number of    #
+# items of each stage: the listing of the files, reads_file_to_memory(), the  #
+# router vocabulary, create_all_samples_sparse_dataset(), the shuffle, the    #
+# split and the emitter of each target with its write_* sections.             #
+# It's off by default, stage() only records when enable_instrumentation() was #
+# called, and write_instrumentation_json() saves the records in a JSON file   #
+# to compare the runs and find the regressions.                               #
+# The peak RSS is the max of the process until the end of the stage, and      #
+# peak_rss_growth_bytes is how much the stage raised it. The parse workers    #
+# are other processes, their peak is peak_rss_children_bytes. The peak RSS    #
+# needs the resource module, that doesn't exist in Windows, there it's null.  #
+###############################################################################
+
+import contextlib
+import json
+import platform
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# The records of the stages in the order they started, and the nesting depth of the current stage.
+dict_instrumentation = {"flag_enabled": False, "list_stages": [], "depth": 0, "time_begin": 0.0}
+
+def enable_instrumentation(flag_enabled = True):
+    # Turns the instrumentation on or off and clears the records.
+    dict_instrumentation["flag_enabled"] = flag_enabled
+    dict_instrumentation["list_stages"] = []
+    dict_instrumentation["depth"] = 0
+    dict_instrumentation["time_begin"] = time.perf_counter()
+
+def peak_rss_bytes(who = "self"):
+    # Returns the peak RSS of this process ("self") or of the biggest child process ("children"), None without resource.
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in bytes in macOS and in KB in Linux.
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+@contextlib.contextmanager
+def stage(stage_name, num_items = None):
+    """
+    Context manager that records the stage, it yields the record dict and
+    the stage can set record["num_items"] when the count is only known at
+    the end. Without instrumentation it yields a dict that isn't recorded.
+    """
+    if not dict_instrumentation["flag_enabled"]:
+        yield {}
+        return
+    record = {"stage": stage_name, "depth": dict_instrumentation["depth"], "num_items": num_items}
+    dict_instrumentation["list_stages"].append(record)
+    dict_instrumentation["depth"] += 1
+    peak_rss_begin = peak_rss_bytes()
+    time_begin = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["wall_time_s"] = time.perf_counter() - time_begin
+        record["peak_rss_bytes"] = peak_rss_bytes()
+        record["peak_rss_growth_bytes"] = (None if peak_rss_begin is None
+                                           else record["peak_rss_bytes"] - peak_rss_begin)
+        record["peak_rss_children_bytes"] = peak_rss_bytes("children")
+        dict_instrumentation["depth"] -= 1
+
+def print_instrumentation():
+    for record in dict_instrumentation["list_stages"]:
+        print("%-40s %10.3f s  peak RSS: %8s MB  items: %s"
+              % ("  " * record["depth"] + record["stage"], record.get("wall_time_s", 0.0),
+                 "-" if record.get("peak_rss_bytes") is None else "%.1f" % (record["peak_rss_bytes"] / 2 ** 20),
+                 record["num_items"]))
+
+def write_instrumentation_json(instrumentation_filename):
+    # Writes the records of the stages, the total wall time and the Python and platform versions.
+    with open(instrumentation_filename, "w") as f:
+        json.dump({"time":              time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   "python":            platform.python_version(),
+                   "platform":          platform.platform(),
+                   "total_wall_time_s": time.perf_counter() - dict_instrumentation["time_begin"],
+                   "peak_rss_bytes":    peak_rss_bytes(),
+                   "stages":            dict_instrumentation["list_stages"]},
+                  f, indent = 2)
@@ -0,0 +1,141 @@
+###############################################################################
+#                                                                             #
+# wifi_train_data_generator/model_blob.py                                     #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Versioned binary file of the model (the KNN train and test     #
+#              datasets), the "blob" target of the generator. Changing the    #
+# fingerprints doesn't need to compile a .h file again, and the reader maps   #
+# the file in memory (mmap), the X and Y arrays are NumPy views of the file   #
+# without any copy.                                                           #
+# Layout, little endian, each section starts at a multiple of C_ALIGNMENT:    #
+#     Header  - magic "WIFIKNN\0", version, header size, num_features,        #
+#               num_classes, num_train, num_test, not_seen_value, the dtype   #
+#               of X and the (offset, size) of each section.                  #
+#     routers - The router names (feature index order), string table.         #
+#     classes - The Y target names (Y int order), string table.               #
+#     X_train, Y_train, X_test, Y_test - Row major arrays, Y is int32.        #
+# A string table is num_strings + 1 uint32 offsets followed by the UTF-8 text.#
+###############################################################################
+
+import struct
+
+import numpy as np
+
+from sparse_fingerprints import SparseFingerprints, dense_rows
+
+C_MODEL_BLOB_MAGIC = b"WIFIKNN\0"
+C_MODEL_BLOB_VERSION = 1
+C_ALIGNMENT = 64
+C_SECTION_NAMES = ("routers", "classes", "X_train", "Y_train", "X_test", "Y_test")
+# magic, version, header_size, num_features, num_classes, num_train, num_test,
+# not_seen_value, X dtype and the (offset, size) of each section.
+C_HEADER_FORMAT = "<8sIIIIIIi8s" + "QQ" * len(C_SECTION_NAMES)
+C_Y_DTYPE = np.dtype("<i4")
+C_WRITE_CHUNK_NUM_ROWS = 1 << 14
+
+def aligned(offset):
+    return (offset + C_ALIGNMENT - 1) // C_ALIGNMENT * C_ALIGNMENT
+
+def string_table_bytes(list_strings):
+    list_encoded = [string.encode("utf-8") for string in list_strings]
+    offsets = np.zeros(len(list_encoded) + 1, dtype = "<u4")
+    np.cumsum([len(encoded) for encoded in list_encoded], out = offsets[1 : ])
+    return offsets.tobytes() + b"".join(list_encoded)
+
+def read_string_table(buffer, num_strings):
+    offsets = np.frombuffer(buffer, dtype = "<u4", count = num_strings + 1).tolist()
+    text = bytes(buffer[(num_strings + 1) * 4 : ])
+    return [text[begin : end].decode("utf-8") for begin, end in zip(offsets[ : -1], offsets[1 : ])]
+
+def write_model_blob(model_blob_filename, list_unique_router_names, list_of_y_target,
+                     X_train, Y_train, X_test, Y_test, not_seen_value):
+    """
+    Writes the binary model file, the X arrays are written in chunks of
+    rows, a SparseFingerprints X is densified one chunk at a time as
+    uint8. Returns the list of tuples (section_name, size_bytes).
+    """
+    num_features = len(list_unique_router_names)
+    list_x_dtypes = []
+    if isinstance(X_train, SparseFingerprints):
+        list_x_dtypes.append(np.uint8)
+    else:
+        X_train = np.asarray(X_train).reshape(-1, num_features)
+        list_x_dtypes.append(X_train.dtype)
+    if isinstance(X_test, SparseFingerprints):
+        list_x_dtypes.append(np.uint8)
+    else:
+        X_test = np.asarray(X_test).reshape(-1, num_features)
+        list_x_dtypes.append(X_test.dtype)
+    x_dtype = np.result_type(*list_x_dtypes).newbyteorder("<")
+    if x_dtype.kind not in "uif":
+        raise ValueError("model blob X dtype isn't a number: " + str(x_dtype))
+    list_class_names = [target_name for target_name, _ in sorted(list_of_y_target, key = lambda target: target[1])]
+
+    list_sections = [("routers", string_table_bytes(list_unique_router_names)),
+                     ("classes", string_table_bytes(list_class_names)),
+                     ("X_train", X_train),
+                     ("Y_train", np.asarray(Y_train)),
+                     ("X_test",  X_test),
+                     ("Y_test",  np.asarray(Y_test))]
+    list_offsets_sizes = []
+    offset = aligned(struct.calcsize(C_HEADER_FORMAT))
+    for section_name, section in list_sections:
+        if isinstance(section, bytes):
+            size = len(section)
+        elif section_name.startswith("X"):
+            size = len(section) * num_features * x_dtype.itemsize
+        else:
+            size = section.size * C_Y_DTYPE.itemsize
+        list_offsets_sizes.append((offset, size))
+        offset = aligned(offset + size)
+
+    header = struct.pack(C_HEADER_FORMAT, C_MODEL_BLOB_MAGIC, C_MODEL_BLOB_VERSION,
+                         struct.calcsize(C_HEADER_FORMAT), num_features, len(list_class_names),
+                         len(X_train), len(X_test), not_seen_value, x_dtype.str.encode("ascii"),
+                         *[value for offset_size in list_offsets_sizes for value in offset_size])
+    with open(model_blob_filename, "wb") as f:
+        f.write(header)
+        for (section_name, section), (offset, size) in zip(list_sections, list_offsets_sizes):
+            f.write(b"\0" * (offset - f.tell()))    # Alignment padding.
+            if isinstance(section, bytes):
+                f.write(section)
+                continue
+            dtype = x_dtype if section_name.startswith("X") else C_Y_DTYPE
+            for begin in range(0, len(section), C_WRITE_CHUNK_NUM_ROWS):
+                rows = dense_rows(section[begin : begin + C_WRITE_CHUNK_NUM_ROWS], not_seen_value)
+                f.write(rows.astype(dtype, copy = False).tobytes())
+    return [(section_name, size) for section_name, (_, size) in zip(C_SECTION_NAMES, list_offsets_sizes)]
+
+def read_model_blob(model_blob_filename):
+    """
+    Maps the binary model file in memory and returns the dict with the
+    keys "version", "not_seen_value", "router_names", "class_names",
+    "X_train", "Y_train", "X_test" and "Y_test". The X and Y arrays are
+    read only views of the mapped file, without any copy.
+    """
+    blob = np.memmap(model_blob_filename, dtype = np.uint8, mode = "r")
+    header_size = struct.calcsize(C_HEADER_FORMAT)
+    if len(blob) < header_size or bytes(blob[ : len(C_MODEL_BLOB_MAGIC)]) != C_MODEL_BLOB_MAGIC:
+        raise ValueError("not a model blob file: " + model_blob_filename)
+    fields = struct.unpack(C_HEADER_FORMAT, bytes(blob[ : header_size]))
+    (_, version, _, num_features, num_classes, num_train, num_test,
+     not_seen_value, x_dtype_str) = fields[ : 9]
+    if version != C_MODEL_BLOB_VERSION:
+        raise ValueError("model blob version %d isn't supported, only %d" % (version, C_MODEL_BLOB_VERSION))
+    x_dtype = np.dtype(x_dtype_str.rstrip(b"\0").decode("ascii"))
+    dict_sections = {section_name: blob[fields[9 + 2 * i] : fields[9 + 2 * i] + fields[10 + 2 * i]]
+                         for i, section_name in enumerate(C_SECTION_NAMES)}
+
+    return {"version":        version,
+            "not_seen_value": not_seen_value,
+            "router_names":   read_string_table(dict_sections["routers"], num_features),
+            "class_names":    read_string_table(dict_sections["classes"], num_classes),
+            "X_train":        dict_sections["X_train"].view(x_dtype).reshape(num_train, num_features),
+            "Y_train":        dict_sections["Y_train"].view(C_Y_DTYPE),
+            "X_test":         dict_sections["X_test"].view(x_dtype).reshape(num_test, num_features),
+            "Y_test":         dict_sections["Y_test"].view(C_Y_DTYPE)}
@@ -0,0 +1,352 @@
+###############################################################################
+#                                                                             #
+# wifi_train_data_generator/pipeline.py                                       #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: The ingest and feature pipeline shared by all the .h targets.  #
+#              It reads the data files of each room once, builds the router   #
+# vocabulary, the X features matrix and the Y targets, and shuffles them.     #
+# Then for each target the dataset is limited, split in train and test and    #
+# optionally condensed, before it is written by the emitter of the target.    #
+###############################################################################
+
+import os
+import random
+
+import numpy as np
+
+# The data files are parsed as a stream by the shared parser.
+from wifi_data_parser import read_all_files_to_memory, sorted_router_names
+from training_set_condensation import condense_and_report
+from sparse_fingerprints import sparse_fingerprints_from_readings
+from wifi_train_data_generator.splits import split_indexes, time_window_groups, C_SPLIT_SEED
+from wifi_train_data_generator.instrumentation import stage
+
+# Has to be the same value that in the component 6 of the project.
+C_NOT_SEEN_ROUTER_SIGNAL_VALUE = 0
+# The rare routers seen in less then C_MIN_ROUTER_FREQUENCY readings or in less
+# then C_MIN_ROUTER_NUM_ROOMS rooms aren't features, 1 and 1 keeps all routers.
+C_MIN_ROUTER_FREQUENCY = 1
+C_MIN_ROUTER_NUM_ROOMS = 1
+C_SHUFFLE_SEED = 42
+C_PERCENTAGE_OF_TRAIN_CASES = 80.0
+# Split strategy of splits.py, "shuffled" the first C_PERCENTAGE_OF_TRAIN_CASES of
+# the shuffled cases, "stratified" by room or "grouped" by room and time window of
+# C_SPLIT_WINDOW_S seconds of the timestamps of the JSON lines files, or of
+# C_SPLIT_WINDOW_NUM_SCANS consecutive scans (about a minute) of the .dat files
+# that don't have timestamps, never in both sides.
+C_SPLIT_STRATEGY = "shuffled"
+C_SPLIT_WINDOW_S = 60.0
+C_SPLIT_WINDOW_NUM_SCANS = 12
+# Condensation of the train dataset to at most C_CONDENSATION_BUDGET_PER_ROOM
+# representative fingerprints (medoids) of each room, None doesn't condense.
+# With C_CONDENSATION_EDIT the scans misclassified by their neighbors are removed first.
+C_CONDENSATION_BUDGET_PER_ROOM = None
+C_CONDENSATION_EDIT = False
+C_CONDENSATION_K = 5
+
+# List's all filenames in a directory.
+def files(path):
+    for file in os.listdir(path):
+        if os.path.isfile(os.path.join(path, file)):
+            yield file
+
+def create_router_name_to_index_map(list_unique_router_names):
+    # HashTable -> router_name to feature column index, built once.
+    return {router_name: index for index, router_name in enumerate(list_unique_router_names)}
+
+def collect_all_readings(list_unique_router_names, list_of_y_target, data_files_in_memory):
+    """
+    Returns the tuple of NumPy vectors (row_ids, column_ids, signal_values, Y),
+    the sample row, the feature column and the RSSI of each reading of a
+    not pruned router, and the Y target int of each sample. The readings
+    of each file are the arrays of its ScanReadings, the router index of
+    the file is remapped to the feature column with one take(), only the
+    unique router names of each file are looked up in Python.
+    """
+    map_router_name_to_index = create_router_name_to_index_map(list_unique_router_names)
+    map_y_target_name_to_int = dict(list_of_y_target)
+    num_samples = sum(len(data_file[1]) for data_file in data_files_in_memory)
+    Y = np.empty(num_samples, dtype = np.int32)
+    list_row_ids       = [np.empty(0, dtype = np.int64)]
+    list_column_ids    = [np.empty(0, dtype = np.int64)]
+    list_signal_values = [np.empty(0, dtype = np.int32)]
+    row = 0
+    for data_file in data_files_in_memory:
+        data_y_target_name = data_file[0]   # id
+        scan_readings = data_file[1]
+        num_file_samples = len(scan_readings)
+        Y[row : row + num_file_samples] = map_y_target_name_to_int[data_y_target_name]
+        # Feature column of each router of the file, -1 for the pruned rare routers.
+        file_router_columns = np.array([map_router_name_to_index.get(router_name, -1)
+                                            for router_name in scan_readings.router_names] + [-1],
+                                       dtype = np.int64)
+        column_ids = file_router_columns.take(scan_readings.reading_router_index)
+        row_ids = np.repeat(np.arange(row, row + num_file_samples, dtype = np.int64),
+                            np.diff(scan_readings.sample_offsets))
+        flag_kept = column_ids >= 0
+        list_row_ids.append(row_ids[flag_kept])
+        list_column_ids.append(column_ids[flag_kept])
+        list_signal_values.append(scan_readings.reading_signal[flag_kept])
+        row += num_file_samples
+    return (np.concatenate(list_row_ids), np.concatenate(list_column_ids),
+            np.concatenate(list_signal_values).astype(np.int32, copy = False), Y)
+
+def create_all_samples_dataset(list_unique_router_names, list_of_y_target,
+                               data_files_in_memory, flag_list_of_lists = False,
+                               dtype = np.uint8):
+    """
+    Returns the tuple (X, Y), X is a preallocated NumPy matrix of shape
+    (num_samples, num_unique_routers) filled with the abs(RSSI) of each
+    router in the column given by list_unique_router_names and
+    C_NOT_SEEN_ROUTER_SIGNAL_VALUE where the router wasn't seen, Y is the
+    vector of Y target int values. The default uint8 holds any abs(RSSI)
+    because the ESP32 RSSI is a int8.
+    With flag_list_of_lists = True returns the old format:
+        [ [y_target_name, y_target_int, [x_0, x_1, ...]], ... ]
+    """
+    num_features = len(list_unique_router_names)
+    row_ids, column_ids, signal_values, Y = collect_all_readings(list_unique_router_names, list_of_y_target,
+                                                                 data_files_in_memory)
+    X = np.full((len(Y), num_features), C_NOT_SEEN_ROUTER_SIGNAL_VALUE, dtype = dtype)
+
+    # The same router name can appear more then once in a scan, like before the
+    # first reading (the strongest) is the one that is used.
+    flat_positions = row_ids * num_features + column_ids
+    signal_values  = np.abs(signal_values)
+    flat_positions, first_index = np.unique(flat_positions, return_index = True)
+    X.ravel()[flat_positions] = signal_values[first_index]
+
+    if flag_list_of_lists:
+        list_of_y_target_names = [target[0] for target in sorted(list_of_y_target, key = lambda target: target[1])]
+        return [[list_of_y_target_names[y_value], y_value, x_data]
+                    for y_value, x_data in zip(Y.tolist(), X.tolist())]
+    return (X, Y)
+
+def create_all_samples_sparse_dataset(list_unique_router_names, list_of_y_target, data_files_in_memory):
+    """
+    Returns the tuple (X, Y) like create_all_samples_dataset(), but X is a
+    SparseFingerprints (CSR) with only the readings, its memory depends on
+    the number of readings and not on num_samples * num_unique_routers.
+    X.to_dense(C_NOT_SEEN_ROUTER_SIGNAL_VALUE) is the dense X.
+    """
+    row_ids, column_ids, signal_values, Y = collect_all_readings(list_unique_router_names, list_of_y_target,
+                                                                 data_files_in_memory)
+    X = sparse_fingerprints_from_readings(row_ids, column_ids, signal_values, len(Y),
+                                          len(list_unique_router_names))
+    return (X, Y)
+
+def split_train_test(all_samples_data_set, percentage_of_train_cases):
+    X_train = []
+    Y_train = []
+    X_test  = []
+    Y_test  = []
+    total_num_cases = len(all_samples_data_set)
+    devision_point = int((total_num_cases * percentage_of_train_cases) / 100.0)
+    index = 0
+    for case in all_samples_data_set:
+        x_values = case[2]
+        y_value = case[1]
+        if index < devision_point:
+            X_train.append(x_values)
+            Y_train.append(y_value)
+        else:
+            X_test.append(x_values)
+            Y_test.append(y_value)
+        index += 1
+    return (X_train, Y_train, X_test, Y_test)
+
+def split_train_test_arrays(X, Y, percentage_of_train_cases):
+    # Same division point as split_train_test() but returns views of the arrays.
+    total_num_cases = len(Y)
+    devision_point = int((total_num_cases * percentage_of_train_cases) / 100.0)
+    return (X[ : devision_point], Y[ : devision_point], X[devision_point : ], Y[devision_point : ])
+
+def read_dataset(data_files_path, flag_dedupe_across_files = False, num_workers = 1,
+                 data_files_cache_path = None, min_router_frequency = C_MIN_ROUTER_FREQUENCY,
+                 min_router_num_rooms = C_MIN_ROUTER_NUM_ROOMS, flag_scan_index = False,
+                 shuffle_seed = C_SHUFFLE_SEED, data_files = None):
+    """
+    Reads all the data files once and returns the tuple
+    (list_unique_router_names, list_of_y_target, X_all, Y_all) with the
+    samples shuffled with shuffle_seed, the same for all the targets.
+    X_all is a SparseFingerprints built directly from the readings, the
+    dense matrix is never allocated, the emitters densify only the chunks
+    of rows that they write.
+    With flag_scan_index the tuple also has scan_index_all, the index of
+    each sample in its data file, and scan_time_all, the timestamp of each
+    sample, NaN for the .dat files, for the time window groups.
+    data_files is the list of the data files, relative to data_files_path,
+    None are all the files of the directory. data_files_cache_path is the
+    directory of the parse cache of wifi_data_cache.py, None doesn't cache.
+    """
+    # List all files in directory data_files.
+    with stage("files") as record:
+        if data_files is None:
+            data_files = [file for file in files(data_files_path)]
+        record["num_items"] = len(data_files)
+
+    # Read all files line by line and create representation in memory.
+    dict_router_vocabulary = {}
+    # Remove equal data points, with flag_dedupe_across_files also the ones repeated between rooms.
+    set_seen_sample_keys = set() if flag_dedupe_across_files else None
+    # The files are independent, with more then one worker they are parsed in parallel.
+    # With a data_files_cache_path the parsed files are cached, only the new or modified
+    # files are parsed again. None doesn't cache, nothing is written in the data files path.
+    with stage("reads_file_to_memory") as record:
+        data_files_in_memory = read_all_files_to_memory(data_files_path, data_files, dict_router_vocabulary,
+                                                        set_seen_sample_keys, num_workers,
+                                                        data_files_cache_path)
+        record["num_items"] = sum(len(data_file[1]) for data_file in data_files_in_memory)
+    for data_file in data_files_in_memory:
+        print("room: ", data_file[0], " samples: ", data_file[2], " duplicates: ", data_file[3],
+              " duplicates across files: ", data_file[4])
+
+    # The vocabulary was built while parsing, the rare routers are pruned before the
+    # feature matrix is allocated.
+    with stage("vocabulary", len(dict_router_vocabulary)):
+        list_unique_router_names = sorted_router_names(dict_router_vocabulary,
+                                                       min_router_frequency, min_router_num_rooms)
+    print("sorted router_names len: ", str(len(list_unique_router_names)),
+          " pruned: ", str(len(dict_router_vocabulary) - len(list_unique_router_names)))
+    dict_router_vocabulary = None
+
+    # Join all the data in the X features sparse matrix, only the readings of the
+    # routers that are present, and the Y target int vector.
+    #
+    #  y_target_0 <= ['cozinha_data.dat' = 0, 'quartoA_data.dat' = 1, 'quartoB_data.dat' = 2, 'quartoC_data.dat'= 3, 'sala_data.dat'= 4]
+    list_of_y_target = [(target_name[0], target_int)
+                               for target_name, target_int
+                               in zip(data_files_in_memory, range( 0, len(data_files_in_memory)))]
+    print(list_of_y_target)
+    with stage("create_all_samples_sparse_dataset") as record:
+        X_all, Y_all = create_all_samples_sparse_dataset(list_unique_router_names, list_of_y_target,
+                                                         data_files_in_memory)
+        record["num_items"] = len(Y_all)
+
+    # Mix the data samples so we can split them next into train and test dataset's.
+    # random.shuffle() of a index list gives the same order as the shuffle of the samples list.
+    with stage("shuffle", len(Y_all)):
+        random.seed(shuffle_seed) # We seed so that it gives always the some result.
+        shuffled_index_list = list(range(len(Y_all)))
+        random.shuffle(shuffled_index_list)
+        X_all = X_all.take(shuffled_index_list)
+        Y_all = Y_all[shuffled_index_list]
+    print("len  all_samples_data_set: ", len(Y_all))
+    if flag_scan_index:
+        scan_index_all = np.concatenate([np.arange(len(data_file[1])) for data_file in data_files_in_memory]
+                                        + [np.empty(0, dtype = np.int64)])
+        scan_time_all = np.concatenate([data_file[1].sample_time for data_file in data_files_in_memory]
+                                       + [np.empty(0, dtype = np.float64)])
+        return (list_unique_router_names, list_of_y_target, X_all, Y_all, scan_index_all[shuffled_index_list],
+                scan_time_all[shuffled_index_list])
+    return (list_unique_router_names, list_of_y_target, X_all, Y_all)
+
+def check_condensation_budget(num_classes, max_num_cases, condensation_budget_per_room):
+    # The condensed train dataset has to fit in the max number of cases of the target.
+    if (condensation_budget_per_room is not None and max_num_cases is not None and
+        condensation_budget_per_room * num_classes > max_num_cases):
+        raise ValueError("the condensation budget of %d cases per room of %d rooms is more then the %d max cases"
+                         % (condensation_budget_per_room, num_classes, max_num_cases))
+
+def split_dataset(X_all, Y_all, num_classes, max_num_cases = None,
+                  percentage_of_train_cases = C_PERCENTAGE_OF_TRAIN_CASES,
+                  condensation_budget_per_room = C_CONDENSATION_BUDGET_PER_ROOM, scan_index_all = None,
+                  split_strategy = C_SPLIT_STRATEGY, split_seed = C_SPLIT_SEED, scan_time_all = None):
+    """
+    Returns the tuple (X_train, Y_train, X_test, Y_test) of the split, with
+    the train dataset condensed when condensation_budget_per_room isn't
+    None. max_num_cases limits the number of cases before the split, unless
+    the train dataset is condensed, then the split and the condensation
+    don't depend on the target and limit_condensed_dataset() applies the
+    limits of each target. The "grouped" split_strategy needs
+    scan_index_all and groups by the time of scan_time_all when it's given,
+    see time_window_groups(). split_seed is the seed of the "stratified"
+    and "grouped" splits.
+    """
+    if max_num_cases is not None and condensation_budget_per_room is None:
+        X_all = X_all[0 : max_num_cases]
+        Y_all = Y_all[0 : max_num_cases]
+        if scan_index_all is not None:
+            scan_index_all = scan_index_all[0 : max_num_cases]
+        if scan_time_all is not None:
+            scan_time_all = scan_time_all[0 : max_num_cases]
+        print("LIMITED %d cases len  all_samples_data_set: " % max_num_cases, len(Y_all))
+
+    # Split the data between Train and Test data.
+    with stage("split " + split_strategy, len(Y_all)):
+        if split_strategy == "shuffled":
+            X_train, Y_train, X_test, Y_test = split_train_test_arrays(X_all, Y_all, percentage_of_train_cases)
+        else:
+            groups = None
+            if split_strategy == "grouped":
+                groups = time_window_groups(Y_all, scan_index_all, C_SPLIT_WINDOW_NUM_SCANS, scan_time_all,
+                                            C_SPLIT_WINDOW_S)
+            train_indexes, test_indexes = split_indexes(split_strategy, Y_all, percentage_of_train_cases, groups,
+                                                        split_seed)
+            X_train, Y_train = X_all[train_indexes], Y_all[train_indexes]
+            X_test,  Y_test  = X_all[test_indexes],  Y_all[test_indexes]
+
+    if condensation_budget_per_room is not None:
+        with stage("condensation", len(Y_train)):
+            X_train, Y_train = condense_and_report(X_train, Y_train, X_test, Y_test, condensation_budget_per_room,
+                                                   C_NOT_SEEN_ROUTER_SIGNAL_VALUE, C_CONDENSATION_K,
+                                                   C_CONDENSATION_EDIT, num_classes)
+    return (X_train, Y_train, X_test, Y_test)
+
+def limit_condensed_dataset(X_train, Y_train, X_test, Y_test, max_num_cases = None,
+                            condensation_max_num_test_cases = None):
+    """
+    Returns the tuple (X_train, Y_train, X_test, Y_test) of one target from
+    the condensed dataset, the test dataset is limited to
+    condensation_max_num_test_cases and to the cases that still fit in
+    max_num_cases with the train dataset.
+    """
+    num_test_cases = len(Y_test)
+    if condensation_max_num_test_cases is not None:
+        num_test_cases = min(num_test_cases, condensation_max_num_test_cases)
+    if max_num_cases is not None:
+        if len(Y_train) > max_num_cases:
+            raise ValueError("the %d condensed train cases are more then the %d max cases"
+                             % (len(Y_train), max_num_cases))
+        num_test_cases = min(num_test_cases, max_num_cases - len(Y_train))
+    return (X_train, Y_train, X_test[0 : num_test_cases], Y_test[0 : num_test_cases])
+
+def prepare_target_dataset(X_all, Y_all, num_classes, max_num_cases = None,
+                           percentage_of_train_cases = C_PERCENTAGE_OF_TRAIN_CASES,
+                           condensation_budget_per_room = C_CONDENSATION_BUDGET_PER_ROOM,
+                           condensation_max_num_test_cases = None, scan_index_all = None,
+                           split_strategy = C_SPLIT_STRATEGY, split_seed = C_SPLIT_SEED, scan_time_all = None,
+                           dict_split_datasets = None):
+    """
+    Returns the tuple (X_train, Y_train, X_test, Y_test) of one target.
+    max_num_cases limits the number of cases before the split, unless the
+    train dataset is condensed, then the condensed train and the test
+    dataset, limited to condensation_max_num_test_cases, fit in
+    max_num_cases. Raises ValueError if the condensation budget of all the
+    rooms doesn't fit in max_num_cases. See split_dataset().
+    dict_split_datasets, the same dict for all the targets of one dataset
+    and the same arguments, keeps the split of each max_num_cases (only one
+    when the train dataset is condensed), so the targets with the same
+    limits share the split and the condensation is done once.
+    """
+    check_condensation_budget(num_classes, max_num_cases, condensation_budget_per_room)
+    if dict_split_datasets is None:
+        dict_split_datasets = {}
+    split_key = max_num_cases if condensation_budget_per_room is None else None
+    if split_key not in dict_split_datasets:
+        dict_split_datasets[split_key] = split_dataset(X_all, Y_all, num_classes, split_key,
+                                                       percentage_of_train_cases, condensation_budget_per_room,
+                                                       scan_index_all, split_strategy, split_seed, scan_time_all)
+    X_train, Y_train, X_test, Y_test = dict_split_datasets[split_key]
+    if condensation_budget_per_room is not None:
+        X_train, Y_train, X_test, Y_test = limit_condensed_dataset(X_train, Y_train, X_test, Y_test, max_num_cases,
+                                                                   condensation_max_num_test_cases)
+
+    print("len X_train: ", len(X_train), " Y_train: ", len(Y_train) )
+    print("len X_test: ",  len(X_test),  " Y_test: ",  len(Y_test) )
+    return (X_train, Y_train, X_test, Y_test)
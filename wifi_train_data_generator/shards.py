@@ -0,0 +1,169 @@
+###############################################################################
+#                                                                             #
+# wifi_train_data_generator/shards.py                                         #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Hierarchical datasets, for a campus with many buildings, with  #
+#              the data files in directories building/floor/room_data.dat:    #
+#     data_files/                                                             #
+#         main_building/                                                      #
+#             floor_0/   kitchen_data.dat  hall_data.dat                      #
+#             floor_1/   room_A_data.dat   room_B_data.dat                    #
+#         library/                                                            #
+#             floor_0/   reading_data.dat                                     #
+# Each shard, a building or a floor (shard_level), is a small model with its  #
+# own router vocabulary and its own .h files or blob, in the directory of the #
+# shard under the output path (out/main_building/floor_1/home_train_data.h).  #
+# In a building shard the room names have the floor, "floor_1/room_A".        #
+# The shard selector, shard_selector.json, picks the shard of a scan from its #
+# visible routers before the KNN, so a query only uses a small model. It's a  #
+# naive Bayes of the routers seen: the score of a shard is the sum of         #
+#     log( (num_scans_that_saw_router + 1) / (num_scans + 2) )                #
+# of the routers of the scan, the routers that no shard has are ignored.      #
+# To generate the shards of all the floors do in a terminal                   #
+#     "python -m wifi_train_data_generator --shard-level floor                #
+#          --output-path ./shards/"                                           #
+###############################################################################
+
+import json
+import math
+import os
+
+from wifi_data_parser import C_FILE_SUFIX, C_JSON_LINES_FILE_SUFIX
+from wifi_train_data_generator.emitters import DICT_EMITTERS
+from wifi_train_data_generator.generator import generate_targets
+
+C_SHARD_LEVELS = ("building", "floor")
+C_SHARD_SELECTOR_FILENAME = "shard_selector.json"
+C_SHARD_SELECTOR_VERSION = 1
+
+def is_data_file(file):
+    return file.endswith(C_FILE_SUFIX) or file.endswith(C_JSON_LINES_FILE_SUFIX)
+
+def directory_data_files(dirname):
+    # The sorted data files of the directory, without the sub directories.
+    return sorted(file for file in os.listdir(dirname)
+                      if is_data_file(file) and os.path.isfile(os.path.join(dirname, file)))
+
+def sub_directories(dirname):
+    # The sorted sub directories, without the hidden ones.
+    return sorted(name for name in os.listdir(dirname)
+                      if not name.startswith(".") and os.path.isdir(os.path.join(dirname, name)))
+
+def find_shards(data_files_path, shard_level):
+    """
+    Returns the list of tuples (shard_name, shard_path, data_files) of the
+    hierarchical dataset, the shard_name is "building" or
+    "building/floor" and the data_files are relative to the shard_path.
+    A building shard has the files of all its floors ("floor/room_data.dat")
+    and the ones directly in the building directory, a building without
+    floor directories is also a floor shard.
+    """
+    if shard_level not in C_SHARD_LEVELS:
+        raise ValueError("unknown shard level: " + str(shard_level))
+    list_shards = []
+    for building in sub_directories(data_files_path):
+        building_path = os.path.join(data_files_path, building, "")
+        list_floor_shards = [(building + "/" + floor, os.path.join(building_path, floor, ""),
+                              directory_data_files(os.path.join(building_path, floor)))
+                                 for floor in sub_directories(building_path)]
+        list_floor_shards = [shard for shard in list_floor_shards if len(shard[2]) != 0]
+        building_data_files = directory_data_files(building_path)
+        if shard_level == "building":
+            data_files = building_data_files + [floor_shard[0][len(building) + 1 : ] + "/" + file
+                                                    for floor_shard in list_floor_shards for file in floor_shard[2]]
+            if len(data_files) != 0:
+                list_shards.append((building, building_path, data_files))
+        else:
+            if len(building_data_files) != 0:
+                list_shards.append((building, building_path, building_data_files))
+            list_shards.extend(list_floor_shards)
+    return list_shards
+
+def generate_shards(data_files_path, shard_level, list_target_names, output_path = "",
+                    dict_dot_H_code_filenames = None, instrumentation_filename = None, **kwargs):
+    """
+    Writes the targets of each shard in output_path/shard_name/ and the
+    shard selector in output_path/shard_selector.json. The filenames of
+    dict_dot_H_code_filenames (by default the ones of DICT_EMITTERS) are
+    relative to the directory of each shard. The kwargs are the split,
+    seed, workers and parse cache options of generate_targets(), all the
+    shards share the same parse cache directory, so the building and the
+    floor shards of the same data files use the same cache entries.
+    Returns the shard selector dict.
+    """
+    if dict_dot_H_code_filenames is None:
+        dict_dot_H_code_filenames = {}
+    list_shards = find_shards(data_files_path, shard_level)
+    if len(list_shards) == 0:
+        raise ValueError("no %s directories with data files in %s" % (shard_level, data_files_path))
+    list_shard_summaries = []
+    for shard_name, shard_path, data_files in list_shards:
+        shard_output_path = os.path.join(output_path, *shard_name.split("/"))
+        print("\nshard: ", shard_name, " data files: ", len(data_files), " output: ", shard_output_path)
+        summary = generate_targets(
+            list_target_names, shard_path,
+            {target_name: os.path.join(shard_output_path, dict_dot_H_code_filenames.get(
+                 target_name, DICT_EMITTERS[target_name]["dot_H_code_filename"]))
+                 for target_name in list_target_names},
+            instrumentation_filename = (None if instrumentation_filename is None else
+                                        os.path.join(shard_output_path, os.path.basename(instrumentation_filename))),
+            data_files = data_files, **kwargs)
+        summary["name"] = shard_name
+        summary["output_path"] = shard_output_path
+        list_shard_summaries.append(summary)
+
+    shard_selector = create_shard_selector(list_shard_summaries, shard_level)
+    selector_filename = os.path.join(output_path, C_SHARD_SELECTOR_FILENAME)
+    write_shard_selector(selector_filename, shard_selector)
+    print("\nshards: ", len(list_shard_summaries), " selector: ", selector_filename)
+    return shard_selector
+
+def create_shard_selector(list_shard_summaries, shard_level):
+    # The selector dict, for each shard its name, output path, rooms, number of scans and routers.
+    return {"version":     C_SHARD_SELECTOR_VERSION,
+            "shard_level": shard_level,
+            "shards":      [{"name":        summary["name"],
+                             "output_path": summary["output_path"],
+                             "class_names": summary["class_names"],
+                             "num_scans":   summary["num_scans"],
+                             "routers":     dict(zip(summary["router_names"], summary["router_num_scans"]))}
+                                for summary in list_shard_summaries]}
+
+def write_shard_selector(selector_filename, shard_selector):
+    selector_dirname = os.path.dirname(selector_filename)
+    if selector_dirname != "":
+        os.makedirs(selector_dirname, exist_ok = True)
+    with open(selector_filename, "w", encoding = "utf-8") as f:
+        json.dump(shard_selector, f, indent = 1, ensure_ascii = False)
+
+def read_shard_selector(selector_filename):
+    with open(selector_filename, "r", encoding = "utf-8") as f:
+        shard_selector = json.load(f)
+    if shard_selector.get("version") != C_SHARD_SELECTOR_VERSION:
+        raise ValueError("shard selector version isn't supported: " + selector_filename)
+    return shard_selector
+
+def shard_scores(shard_selector, list_visible_router_names):
+    """
+    Returns the list of the score of each shard for the scan with the
+    visible routers, the naive Bayes log likelihood of the routers that
+    at least one shard has.
+    """
+    list_shards = shard_selector["shards"]
+    set_known_routers = set()
+    for shard in list_shards:
+        set_known_routers.update(shard["routers"])
+    list_routers = [router_name for router_name in set(list_visible_router_names) if router_name in set_known_routers]
+    return [sum(math.log((shard["routers"].get(router_name, 0) + 1) / (shard["num_scans"] + 2))
+                for router_name in list_routers)
+                for shard in list_shards]
+
+def select_shard(shard_selector, list_visible_router_names):
+    # Returns the index of the shard with the highest score, the first one for the ties.
+    list_scores = shard_scores(shard_selector, list_visible_router_names)
+    return max(range(len(list_scores)), key = lambda shard_index: (list_scores[shard_index], -shard_index))
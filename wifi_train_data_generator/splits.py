@@ -0,0 +1,130 @@
+###############################################################################
+#                                                                             #
+# wifi_train_data_generator/splits.py                                         #
+#                                                                             #
+###############################################################################
+# Author:  Joao Nuno Carvalho                                                 #
+# Data:    2019.09.22                                                         #
+# License: MIT Open Source License                                            #
+#                                                                             #
+# Description: Strategies to split the dataset in train and test, that work  #
+#              on the Y label array (and groups) and return index arrays, so  #
+# the X matrix is only indexed once and the evaluation can be repeated cheap. #
+#     "shuffled"   - The first percentage of the already shuffled cases, the  #
+#                    split of split_train_test_arrays().                      #
+#     "stratified" - The same percentage of the cases of each room.           #
+#     "grouped"    - Stratified by room, but the cases of a group, a time     #
+#                    window of consecutive scans, are all in train or all in  #
+#                    test. The scans of the same minute are almost equal, in  #
+#                    both sides they make the test accuracy too optimistic.   #
+# And k_fold_indexes() for the cross validation, stratified and grouped.      #
+# The time window of a scan of a JSON lines file is its timestamp "t" //      #
+# window_s. The legacy .dat files don't have timestamps, but the scans of a   #
+# data file are in the order of the capture and each scan takes some seconds, #
+# so for them scan_index // window_num_scans is the time window.              #
+###############################################################################
+
+import numpy as np
+
+C_SPLIT_SEED = 42
+C_SPLIT_STRATEGIES = ("shuffled", "stratified", "grouped")
+
+def time_window_groups(Y, scan_index, window_num_scans, scan_time = None, window_s = None):
+    """
+    Returns the group int of each case, the room (Y) and the time window.
+    With scan_time and window_s, the cases with a finite scan_time (the
+    timestamp in seconds of the JSON lines files) are grouped by windows
+    of window_s seconds. The other cases, the ones of the legacy .dat
+    files without timestamps, fall back to windows of window_num_scans
+    consecutive scans, scan_index is the index of the scan in its data
+    file. The two kinds of windows are never the same group.
+    """
+    Y = np.asarray(Y, dtype = np.int64)
+    windows = np.asarray(scan_index, dtype = np.int64) // window_num_scans
+    flag_time = np.zeros(len(Y), dtype = np.int64)
+    if scan_time is not None and window_s is not None:
+        scan_time = np.asarray(scan_time, dtype = np.float64)
+        flag_finite = np.isfinite(scan_time)
+        time_windows = np.floor(np.where(flag_finite, scan_time, 0.0) / window_s).astype(np.int64)
+        windows = np.where(flag_finite, time_windows, windows)
+        flag_time = flag_finite.astype(np.int64)
+    keys = np.stack((Y, flag_time, windows), axis = 1).reshape(-1, 3)
+    return np.unique(keys, axis = 0, return_inverse = True)[1].reshape(-1)
+
+def shuffled_split_indexes(num_cases, percentage_of_train_cases):
+    # Returns the tuple (train_indexes, test_indexes) of split_train_test_arrays().
+    devision_point = int((num_cases * percentage_of_train_cases) / 100.0)
+    return (np.arange(devision_point), np.arange(devision_point, num_cases))
+
+def room_groups(Y, groups):
+    """
+    Returns the tuple (case_group, group_y, group_sizes), the groups of
+    different rooms are different groups: the group int of each case, the
+    room of each group and the number of cases of each group.
+    """
+    Y = np.asarray(Y, dtype = np.int64)
+    groups = np.arange(len(Y)) if groups is None else np.asarray(groups, dtype = np.int64)
+    pairs, case_group = np.unique(np.stack((Y, groups), axis = 1).reshape(-1, 2), axis = 0, return_inverse = True)
+    case_group = case_group.reshape(-1)
+    return (case_group, pairs[:, 0], np.bincount(case_group, minlength = len(pairs)))
+
+def grouped_split_indexes(Y, groups, percentage_of_train_cases, seed = C_SPLIT_SEED):
+    """
+    Returns the sorted tuple (train_indexes, test_indexes). The groups of
+    each room are shuffled and go to train until it has the percentage of
+    the cases of the room, at least one group goes to train and if the
+    room has more then one group at least one goes to test.
+    With groups = None each case is a group, stratified.
+    """
+    case_group, group_y, group_sizes = room_groups(Y, groups)
+    rng = np.random.RandomState(seed)
+    flag_train_group = np.zeros(len(group_y), dtype = bool)
+    for y_value in np.unique(group_y):
+        room_group_ids = rng.permutation(np.nonzero(group_y == y_value)[0])
+        room_group_sizes = group_sizes[room_group_ids]
+        num_train_cases = room_group_sizes.sum() * percentage_of_train_cases / 100.0
+        # Number of groups whose cumulative size doesn't pass the train cases.
+        num_train_groups = int(np.searchsorted(np.cumsum(room_group_sizes), num_train_cases, side = "right"))
+        num_train_groups = min(max(num_train_groups, 1), max(len(room_group_ids) - 1, 1))
+        flag_train_group[room_group_ids[ : num_train_groups]] = True
+    flag_train = flag_train_group[case_group]
+    return (np.nonzero(flag_train)[0], np.nonzero(~flag_train)[0])
+
+def stratified_split_indexes(Y, percentage_of_train_cases, seed = C_SPLIT_SEED):
+    # Returns the sorted tuple (train_indexes, test_indexes) with the percentage of the cases of each room.
+    return grouped_split_indexes(Y, None, percentage_of_train_cases, seed)
+
+def split_indexes(split_strategy, Y, percentage_of_train_cases, groups = None, seed = C_SPLIT_SEED):
+    # Returns the tuple (train_indexes, test_indexes) of one of the C_SPLIT_STRATEGIES.
+    if split_strategy == "shuffled":
+        return shuffled_split_indexes(len(Y), percentage_of_train_cases)
+    if split_strategy == "stratified":
+        return stratified_split_indexes(Y, percentage_of_train_cases, seed)
+    if split_strategy == "grouped":
+        if groups is None:
+            raise ValueError("the grouped split needs the groups of the cases")
+        return grouped_split_indexes(Y, groups, percentage_of_train_cases, seed)
+    raise ValueError("unknown split strategy: " + str(split_strategy))
+
+def k_fold_indexes(Y, num_folds, groups = None, seed = C_SPLIT_SEED):
+    """
+    Returns the list of num_folds tuples (train_indexes, test_indexes),
+    each case is in the test of exactly one fold. Stratified, the groups
+    of each room (each case if groups is None) are shuffled and each one
+    goes to the fold with less cases of the room, and of all the rooms
+    for the ties.
+    """
+    case_group, group_y, group_sizes = room_groups(Y, groups)
+    rng = np.random.RandomState(seed)
+    group_fold = np.zeros(len(group_y), dtype = np.int64)
+    total_fold_sizes = np.zeros(num_folds, dtype = np.int64)
+    for y_value in np.unique(group_y):
+        fold_sizes = np.zeros(num_folds, dtype = np.int64)
+        for group_id in rng.permutation(np.nonzero(group_y == y_value)[0]).tolist():
+            fold = int(np.argmin(fold_sizes * (len(case_group) + 1) + total_fold_sizes))
+            fold_sizes[fold] += group_sizes[group_id]
+            total_fold_sizes[fold] += group_sizes[group_id]
+            group_fold[group_id] = fold
+    fold_of_case = group_fold[case_group]
+    return [(np.nonzero(fold_of_case != fold)[0], np.nonzero(fold_of_case == fold)[0])
+                for fold in range(num_folds)]